@@ -0,0 +1,93 @@
+"""
+ID-switch benchmark for `PersonTracker` motion prediction at increasing frame skips.
+
+Simulates people walking across a 1080x1224 frame at 25 fps with smoothly turning headings,
+feeds every N-th frame to the tracker and counts how often a person's tracker ID changes,
+once with the constant-velocity Kalman prediction and once with `LastPosition`, which
+reproduces plain centroid matching against `MAX_DIST_PERSON`.
+
+Run from the repository root:
+    python -m benchmarks.bench_id_switches
+"""
+import contextlib
+import io
+import numpy as np
+from models.tracker import PersonTracker
+
+FPS = 25.0
+FRAME_WIDTH, FRAME_HEIGHT = 1080, 1224
+BOX_WIDTH, BOX_HEIGHT = 40, 90
+
+class LastPosition:
+    """Motion model without prediction: tracks are matched at their last centroid within `max_dist`."""
+    def initiate(self, store, slots, frame_time_sec):
+        pass
+
+    def predict(self, store, slots, frame_time_sec, max_dist):
+        return store.centroid[slots], np.full(len(slots), float(max_dist))
+
+    def update(self, store, slots, frame_time_sec):
+        pass
+
+def _make_walks(num_people, num_frames, seed=0):
+    """Returns (num_frames, num_people, 4) boxes of people walking at 60-160 px/s, bouncing off the frame edges."""
+    rng = np.random.default_rng(seed)
+    position = np.column_stack([
+        rng.uniform(0, FRAME_WIDTH - BOX_WIDTH, num_people),
+        rng.uniform(0, FRAME_HEIGHT - BOX_HEIGHT, num_people),
+    ])
+    speed = rng.uniform(60, 160, num_people)
+    heading = rng.uniform(0, 2 * np.pi, num_people)
+    upper = np.array([FRAME_WIDTH - BOX_WIDTH, FRAME_HEIGHT - BOX_HEIGHT])
+    boxes = np.empty((num_frames, num_people, 4))
+    for frame_idx in range(num_frames):
+        heading += rng.normal(0, 0.03, num_people) # Gentle turns
+        velocity = np.column_stack([np.cos(heading), np.sin(heading)]) * speed[:, None]
+        position += velocity / FPS
+        # Bounce off the edges by mirroring the heading
+        hit_x = (position[:, 0] < 0) | (position[:, 0] > upper[0])
+        hit_y = (position[:, 1] < 0) | (position[:, 1] > upper[1])
+        heading[hit_x] = np.pi - heading[hit_x]
+        heading[hit_y] = -heading[hit_y]
+        position = np.clip(position, 0, upper)
+        boxes[frame_idx] = np.concatenate([position, position + [BOX_WIDTH, BOX_HEIGHT]], axis=1)
+    return boxes.round()
+
+def count_id_switches(tracker, walks, frame_skip):
+    """
+    Runs `tracker` on every `frame_skip`-th frame of `walks`.
+
+    Returns:
+        int: Number of processed frames on which a person's ID differs from the one it had on
+             its previous processed frame.
+    """
+    switches = 0
+    last_ids = [None] * walks.shape[1]
+    for frame_idx in range(0, len(walks), frame_skip):
+        detections = [{'bbox': box.tolist(), 'confidence': 0.9} for box in walks[frame_idx]]
+        tracked_persons = tracker.update(detections, None, frame_idx / FPS)
+        # A matched or new track holds exactly its detection's box
+        ids_by_box = {tuple(p.bbox): p.id for p in tracked_persons if p.missing_frames == 0}
+        for person, box in enumerate(walks[frame_idx]):
+            person_id = ids_by_box.get(tuple(box.tolist()))
+            if last_ids[person] is not None and person_id != last_ids[person]:
+                switches += 1
+            last_ids[person] = person_id
+    return switches
+
+def run(frame_skips=(1, 2, 4, 8, 12, 16), num_people=8, duration_sec=60.0):
+    """Prints ID switches per frame skip with and without motion prediction."""
+    walks = _make_walks(num_people, int(duration_sec * FPS))
+    print(f"{num_people} people, {duration_sec:.0f}s at {FPS:.0f} fps")
+    print(f"{'frame skip':>10} {'kalman':>8} {'static':>8}")
+    results = {}
+    for frame_skip in frame_skips:
+        with contextlib.redirect_stdout(io.StringIO()):
+            kalman = count_id_switches(PersonTracker(), walks, frame_skip)
+            static = count_id_switches(PersonTracker(motion_model=LastPosition()), walks, frame_skip)
+        results[frame_skip] = {"kalman": kalman, "static": static}
+        print(f"{frame_skip:>10} {kalman:>8} {static:>8}")
+    return results
+
+if __name__ == "__main__":
+    run()
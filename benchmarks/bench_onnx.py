@@ -0,0 +1,113 @@
+"""
+Compares the ONNX Runtime backend (FP32 and INT8) with the PyTorch `YOLODetector`.
+
+Runs each backend on the same frames sampled from a video and reports per-frame latency
+(median and p95) and how well its boxes agree with PyTorch: the share of PyTorch boxes
+matched at IoU >= 0.5 (recall), the share of its own boxes matched (precision), and the
+mean IoU and confidence difference of matched boxes. Needs the YOLO weights, onnxruntime
+and onnx; the first run also exports and quantizes the models.
+
+Run from the repository root:
+    python -m benchmarks.bench_onnx --video sample_video/office_cctv_footage.mp4 --frames 100
+"""
+import argparse
+import time
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from config import VIDEO_PATH, YOLO_MODEL_PATH, DETECTION_IMGSZ
+from models.yolo_detector import YOLODetector
+from models.onnx_backend import ONNXDetector, sample_frames
+from models.tracker import _pairwise_iou
+
+MATCH_IOU = 0.5
+
+def _match(reference, candidate):
+    """Matches two (N, 6) box matrices one-to-one by IoU; returns matched (ref, cand) index arrays."""
+    if len(reference) == 0 or len(candidate) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    iou = _pairwise_iou(reference[:, :4].astype(np.float64), candidate[:, :4].astype(np.float64))
+    rows, cols = linear_sum_assignment(-iou)
+    valid = iou[rows, cols] >= MATCH_IOU
+    return rows[valid], cols[valid]
+
+def _time_detector(detector, frames, repeats, imgsz):
+    """Returns (per-frame latencies in ms, boxes of the last repeat)."""
+    detector.warmup((frames[0].shape[1], frames[0].shape[0]), imgsz)
+    latencies = []
+    for _ in range(repeats):
+        boxes = []
+        for frame in frames:
+            start = time.perf_counter()
+            boxes.append(detector.detect_batch([frame], imgsz)[0])
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.array(latencies), boxes
+
+def _agreement(reference_boxes, candidate_boxes):
+    """Box agreement of a backend with the PyTorch reference over all frames."""
+    matched = reference_total = candidate_total = 0
+    ious, confidence_deltas = [], []
+    for reference, candidate in zip(reference_boxes, candidate_boxes):
+        rows, cols = _match(reference, candidate)
+        matched += len(rows)
+        reference_total += len(reference)
+        candidate_total += len(candidate)
+        if len(rows):
+            iou = _pairwise_iou(reference[rows, :4].astype(np.float64), candidate[cols, :4].astype(np.float64))
+            ious.extend(np.diag(iou))
+            confidence_deltas.extend(np.abs(reference[rows, 4] - candidate[cols, 4]))
+    return {
+        "recall": matched / reference_total if reference_total else 1.0,
+        "precision": matched / candidate_total if candidate_total else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "mean_confidence_delta": float(np.mean(confidence_deltas)) if confidence_deltas else 0.0,
+    }
+
+def run(video_path=VIDEO_PATH, model_path=YOLO_MODEL_PATH, num_frames=100, imgsz=DETECTION_IMGSZ, repeats=1, int8=True):
+    """
+    Benchmarks PyTorch, ONNX FP32 and (optionally) ONNX INT8 on the same frames.
+
+    Returns:
+        dict: backend -> {"median_ms", "p95_ms", "fps"} plus the agreement metrics for ONNX backends.
+    """
+    frames = sample_frames(video_path, num_frames)
+    backends = {
+        "torch": YOLODetector(model_path, lazy=True),
+        "onnx_fp32": ONNXDetector(model_path, lazy=True, imgsz=imgsz, int8=False),
+    }
+    if int8:
+        backends["onnx_int8"] = ONNXDetector(model_path, lazy=True, imgsz=imgsz, int8=True, calibration_video=video_path)
+
+    results, reference_boxes = {}, None
+    for name, detector in backends.items():
+        # Every backend, the PyTorch reference included, runs at the same input size
+        latencies, boxes = _time_detector(detector, frames, repeats, imgsz)
+        results[name] = {
+            "median_ms": float(np.median(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "fps": 1000.0 / float(np.median(latencies)),
+        }
+        if reference_boxes is None:
+            reference_boxes = boxes
+        else:
+            results[name].update(_agreement(reference_boxes, boxes))
+
+    print(f"\n{len(frames)} frames from '{video_path}' at {imgsz}x{imgsz}, {repeats} repeat(s)")
+    print(f"{'backend':<10} {'median ms':>10} {'p95 ms':>8} {'FPS':>7} {'recall':>7} {'precision':>9} {'IoU':>6} {'conf diff':>9}")
+    for name, r in results.items():
+        line = f"{name:<10} {r['median_ms']:>10.1f} {r['p95_ms']:>8.1f} {r['fps']:>7.1f}"
+        if "recall" in r:
+            line += f" {r['recall']:>7.1%} {r['precision']:>9.1%} {r['mean_iou']:>6.3f} {r['mean_confidence_delta']:>9.3f}"
+        print(line)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ONNX Runtime and PyTorch detection latency and boxes.")
+    parser.add_argument("--video", default=VIDEO_PATH, help="Footage to sample frames from (also the INT8 calibration set).")
+    parser.add_argument("--model", default=YOLO_MODEL_PATH, help="YOLO weights path.")
+    parser.add_argument("--frames", type=int, default=100, help="Frames sampled evenly from the video.")
+    parser.add_argument("--imgsz", type=int, default=DETECTION_IMGSZ, help="Inference size for every backend.")
+    parser.add_argument("--repeats", type=int, default=1, help="Passes over the frames per backend.")
+    parser.add_argument("--no-int8", dest="int8", action="store_false", help="Skip the INT8 model.")
+    args = parser.parse_args()
+    run(args.video, args.model, args.frames, args.imgsz, args.repeats, args.int8)
@@ -0,0 +1,84 @@
+"""
+Microbenchmark for `PersonTracker.update` association cost.
+
+Simulates N people drifting around a 1080x1224 frame and times one tracker update per
+frame, next to the old per-pair greedy matching loop for reference. A warm-up tracker runs
+one association first, so no one-off import or first-call cost ends up in the timings.
+
+Run from the repository root:
+    python -m benchmarks.bench_tracker
+"""
+import contextlib
+import io
+import time
+import numpy as np
+from config import MAX_DIST_PERSON
+from models.tracker import PersonTracker
+
+FRAME_WIDTH, FRAME_HEIGHT = 1080, 1224
+BOX_WIDTH, BOX_HEIGHT = 40, 90
+
+def _make_trajectories(num_people, num_frames, seed=0):
+    """Returns (num_frames, num_people, 4) boxes of people on small random walks."""
+    rng = np.random.default_rng(seed)
+    start = np.column_stack([
+        rng.uniform(0, FRAME_WIDTH - BOX_WIDTH, num_people),
+        rng.uniform(0, FRAME_HEIGHT - BOX_HEIGHT, num_people),
+    ])
+    steps = rng.normal(0, 3, size=(num_frames, num_people, 2))
+    top_left = start[None] + np.cumsum(steps, axis=0)
+    boxes = np.concatenate([top_left, top_left + [BOX_WIDTH, BOX_HEIGHT]], axis=2)
+    return boxes.astype(np.int32)
+
+def _greedy_reference(track_centroids, detections):
+    """The original per-pair greedy matching loop, kept here as a baseline."""
+    matched = [False] * len(detections)
+    for centroid in track_centroids:
+        min_dist, best = float('inf'), -1
+        for j, det in enumerate(detections):
+            if not matched[j]:
+                x1, y1, x2, y2 = det['bbox']
+                dist = np.linalg.norm(np.array(centroid) - np.array(((x1 + x2) // 2, (y1 + y2) // 2)))
+                if dist < min_dist and dist < MAX_DIST_PERSON:
+                    min_dist, best = dist, j
+        if best != -1:
+            matched[best] = True
+
+def _warm_up(frames):
+    """Runs two updates on a throwaway tracker, the second of which associates tracks with detections."""
+    tracker = PersonTracker()
+    tracker.update(frames[0], None, 0.0)
+    tracker.update(frames[1], None, 1 / 25.0)
+
+def run(track_counts=(1, 10, 50, 100, 500), num_frames=50):
+    """Times the tracker at each track count and prints ms per update."""
+    print(f"{'tracks':>8} {'update ms':>12} {'greedy ms':>12}")
+    results = {}
+    for num_people in track_counts:
+        trajectories = _make_trajectories(num_people, num_frames)
+        frames = [[{'bbox': box.tolist(), 'confidence': 0.9} for box in frame_boxes] for frame_boxes in trajectories]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            _warm_up(frames)
+            tracker = PersonTracker()
+            tracker.update(frames[0], None, 0.0)
+
+        start = time.perf_counter()
+        for frame_idx, detections in enumerate(frames[1:], start=1):
+            tracker.update(detections, None, frame_idx / 25.0)
+        update_ms = (time.perf_counter() - start) / (num_frames - 1) * 1000.0
+
+        # The greedy loop is quadratic in Python; time fewer frames at large counts
+        greedy_frames = frames[1:min(num_frames, 5 if num_people >= 500 else num_frames)]
+        centroids = [p.centroid for p in tracker.tracked_persons]
+        start = time.perf_counter()
+        for detections in greedy_frames:
+            _greedy_reference(centroids, detections)
+        greedy_ms = (time.perf_counter() - start) / len(greedy_frames) * 1000.0
+
+        results[num_people] = {"update_ms": update_ms, "greedy_ms": greedy_ms, "tracks": len(tracker.tracked_persons)}
+        print(f"{num_people:>8} {update_ms:>12.3f} {greedy_ms:>12.3f}")
+    return results
+
+if __name__ == "__main__":
+    run()
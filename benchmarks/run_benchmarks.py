@@ -0,0 +1,343 @@
+"""
+Benchmark suite for the per-frame hot path, built on `benchmarks.synthetic_video` and the
+weight-free `BlobDetector`, so it runs without the sample video or YOLO weights.
+
+Measures `OCRExtractor.extract_time`, `PersonTracker.update`, `ActivityClassifier.classify`,
+`VideoProcessor.draw_annotations`, `DataLogger` and the end-to-end frame loop. Every metric
+is a time per operation (lower is better); each is the median over `--repeats` runs. The
+end-to-end runs also count the logged events; with `--compare`, a count that differs from the
+baseline fails the run just like a slowdown, since a faster but different result is a bug.
+The OCR benchmark checks every reading against the overlay's true time; any wrong reading
+fails the run, with or without `--compare`.
+
+Run from the repository root, save a baseline, and compare a later commit against it:
+    python -m benchmarks.run_benchmarks --json baseline.json
+    python -m benchmarks.run_benchmarks --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from benchmarks.synthetic_video import (
+    FPS, iter_frames, overlay_text, person_boxes, render_background, render_frame, write_video
+)
+from benchmarks.stub_detector import BlobDetector
+from models.tracker import PersonTracker, TrackedPerson
+from models.activity_classifier import ActivityClassifier
+from utils.ocr_extractor import OCRExtractor
+from utils.video_processor import VideoProcessor
+from utils.data_logger import DataLogger
+from utils.cctv_time import parse_cctv_time
+
+# Event types counted by the end-to-end benchmarks
+COUNTED_EVENTS = ("IN", "WORKING_START", "WORKING_END", "OUT")
+# Full OCR reads are slow; the uncached benchmark only reads this many seconds of video
+UNCACHED_OCR_DURATION_SEC = 10.0
+# CCTV time of the first frame; sessions in the annotation and logger benchmarks start here
+SESSION_START = parse_cctv_time(overlay_text(0))
+
+@contextlib.contextmanager
+def _quiet():
+    """Silences the components' console output while they are being timed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def _median(run, repeats):
+    """Calls `run()` `repeats` times and returns the median of its results."""
+    return statistics.median(run() for _ in range(repeats))
+
+def _trained_ocr_extractor(cache_enabled=True):
+    """
+    Returns a glyph-engine `OCRExtractor` whose templates were learned from the generator's
+    known overlay text, so no Tesseract read is needed to bootstrap it.
+    """
+    extractor = OCRExtractor("glyph")
+    extractor.cache_enabled = cache_enabled
+    background = render_background()
+    for second in range(12):
+        frame = render_frame(background, float(second))
+        mask = extractor._text_mask(extractor._crop_roi(frame), smooth=False)
+        extractor.glyph_engine.learn(mask, overlay_text(second))
+    return extractor
+
+def bench_ocr(duration_sec, repeats):
+    """
+    Times `extract_time` with the change cache (normal operation) and without it (a full read
+    per frame), and counts the readings that differ from the time the overlay shows.
+    """
+    results = {}
+    for name, cache_enabled in (("cached", True), ("uncached", False)):
+        read_duration_sec = duration_sec if cache_enabled else min(duration_sec, UNCACHED_OCR_DURATION_SEC)
+        wrong_times = []
+        def run():
+            with _quiet():
+                extractor = _trained_ocr_extractor(cache_enabled)
+                elapsed, frames, wrong = 0.0, 0, 0
+                for video_time_sec, frame in iter_frames(read_duration_sec):
+                    start = time.perf_counter()
+                    cctv_time = extractor.extract_time(frame, video_time_sec)
+                    elapsed += time.perf_counter() - start
+                    frames += 1
+                    wrong += cctv_time != parse_cctv_time(overlay_text(video_time_sec))
+            wrong_times.append(wrong)
+            return elapsed / frames * 1e6
+        results[f"extract_time_{name}_us"] = _median(run, repeats)
+        results[f"wrong_times_{name}"] = max(wrong_times)
+    return results
+
+def bench_tracker(duration_sec, repeats):
+    """Times `PersonTracker.update` on the scene's ground-truth boxes."""
+    detections = [
+        [{'bbox': bbox, 'confidence': 0.9} for bbox, _ in person_boxes(index / FPS)]
+        for index in range(int(duration_sec * FPS))
+    ]
+    def run():
+        with _quiet():
+            tracker = PersonTracker()
+            start = time.perf_counter()
+            for index, frame_detections in enumerate(detections):
+                tracker.update(frame_detections, None, index / FPS)
+            return (time.perf_counter() - start) / len(detections) * 1e6
+    return {"update_us": _median(run, repeats)}
+
+def bench_classifier(duration_sec, repeats):
+    """Times `ActivityClassifier.classify` on the scene's ground-truth boxes."""
+    boxes = [bbox for index in range(int(duration_sec * FPS)) for bbox, _ in person_boxes(index / FPS)]
+    with _quiet():
+        classifier = ActivityClassifier()
+    def run():
+        start = time.perf_counter()
+        for bbox in boxes:
+            classifier.classify(bbox)
+        return (time.perf_counter() - start) / len(boxes) * 1e6
+    return {"classify_us": _median(run, repeats)}
+
+def bench_annotation(video_path, duration_sec, repeats):
+    """Times `draw_annotations` in place and into the reusable render buffer."""
+    results = {}
+    for name, in_place in (("draw_in_place_us", True), ("draw_copy_us", False)):
+        def run():
+            with _quiet():
+                video_processor = VideoProcessor(video_path)
+                elapsed, frames = 0.0, 0
+                for video_time_sec, frame in iter_frames(duration_sec):
+                    persons = []
+                    for i, (bbox, posture) in enumerate(person_boxes(video_time_sec)):
+                        person = TrackedPerson(f"Person {i + 1}", bbox, SESSION_START, 0.0)
+                        if posture == "sitting":
+                            person.update_activity("working", SESSION_START, video_time_sec)
+                        persons.append(person)
+                    ocr_time = parse_cctv_time(overlay_text(video_time_sec))
+                    start = time.perf_counter()
+                    video_processor.draw_annotations(frame, persons, ocr_time, in_place=in_place)
+                    elapsed += time.perf_counter() - start
+                    frames += 1
+                video_processor.release()
+            return elapsed / frames * 1e6
+        results[name] = _median(run, repeats)
+    return results
+
+def bench_data_logger(work_dir, repeats, num_events=5000, num_persons=200):
+    """Times `log_event` on the caller's thread, the drain on `close`, and the report export."""
+    persons = []
+    for i in range(num_persons):
+        person = TrackedPerson(f"Person {i + 1}", [0, 0, 10, 10], SESSION_START, 0.0)
+        person.total_working_seconds = 3600.0 + i
+        persons.append(person)
+    event_types = ("IN", "WORKING_START", "WORKING_END", "ACTIVITY_CHANGE", "OUT")
+
+    def run():
+        with _quiet():
+            data_logger = DataLogger(os.path.join(work_dir, "bench.log"), os.path.join(work_dir, "bench.csv"))
+            start = time.perf_counter()
+            for i in range(num_events):
+                data_logger.log_event(f"Person {i % num_persons + 1}", event_types[i % len(event_types)],
+                                      SESSION_START + int(i / FPS), i / FPS, "Benchmark event.")
+            log_event_us = (time.perf_counter() - start) / num_events * 1e6
+            start = time.perf_counter()
+            data_logger.export_to_csv(persons)
+            export_ms = (time.perf_counter() - start) * 1000.0
+            start = time.perf_counter()
+            data_logger.close()
+            close_ms = (time.perf_counter() - start) * 1000.0
+        return log_event_us, export_ms, close_ms
+
+    runs = [run() for _ in range(repeats)]
+    return {
+        "log_event_us": statistics.median(r[0] for r in runs),
+        "export_ms": statistics.median(r[1] for r in runs),
+        "close_ms": statistics.median(r[2] for r in runs),
+    }
+
+def bench_end_to_end(video_path, work_dir, repeats, render):
+    """
+    Runs the whole frame loop (`main.process_stream`) over the synthetic video with the blob
+    detector. With `render`, frames are also annotated and encoded to a video file.
+
+    Returns:
+        dict: ms per frame, and the number of events of each expected type.
+    """
+    from main import process_stream # Deferred: only needed here
+    from pipeline import TrackingPipeline
+    from utils.frame_prefetcher import FramePrefetcher
+    from config import PREFETCH_QUEUE_SIZE, DETECTION_BATCH_SIZE, VIDEO_WRITER_QUEUE_SIZE
+
+    def run():
+        with _quiet():
+            output_path = os.path.join(work_dir, "e2e_output.mp4") if render else None
+            video_processor = VideoProcessor(video_path, output_path)
+            data_logger = DataLogger(os.path.join(work_dir, "e2e.log"), os.path.join(work_dir, "e2e.csv"))
+            person_tracker = PersonTracker()
+            pipeline = TrackingPipeline(person_tracker, ActivityClassifier(), _trained_ocr_extractor(), data_logger)
+            frame_prefetcher = FramePrefetcher(
+                video_processor, PREFETCH_QUEUE_SIZE,
+                pool_size=PREFETCH_QUEUE_SIZE + DETECTION_BATCH_SIZE + VIDEO_WRITER_QUEUE_SIZE + 2
+            )
+            start = time.perf_counter()
+            frame_prefetcher.start()
+            frames, last_video_time_sec = process_stream(
+                frame_prefetcher, video_processor, BlobDetector(), pipeline, 1, DETECTION_BATCH_SIZE,
+                render_annotations=render, headless=True
+            )
+            frame_prefetcher.stop()
+            pipeline.finalize(last_video_time_sec)
+            video_processor.release()
+            elapsed = time.perf_counter() - start
+            data_logger.close()
+        counts = {event_type: sum(e["event_type"] == event_type for e in data_logger.events) for event_type in COUNTED_EVENTS}
+        return elapsed / frames * 1000.0, counts
+
+    runs = [run() for _ in range(repeats)]
+    result = {"frame_ms": statistics.median(r[0] for r in runs)}
+    result.update({f"events_{event_type.lower()}": count for event_type, count in runs[-1][1].items()})
+    return result
+
+def _environment():
+    """Describes the machine and commit, so results are only compared like for like."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or "unknown",
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+def run(duration_sec=60.0, repeats=3, only=None):
+    """
+    Runs the suite.
+
+    Args:
+        duration_sec (float): Synthetic video length. The default covers every event window.
+        repeats (int): Runs per benchmark; the median is reported.
+        only (list, optional): Names of the benchmarks to run (default: all).
+
+    Returns:
+        dict: {"environment": {...}, "results": {"group.metric": value}}
+    """
+    work_dir = tempfile.mkdtemp(prefix="cctv_bench_")
+    results = {}
+    try:
+        video_path = os.path.join(work_dir, "synthetic.mp4")
+        with _quiet():
+            write_video(video_path, duration_sec)
+        benchmarks = {
+            "ocr": lambda: bench_ocr(duration_sec, repeats),
+            "tracker": lambda: bench_tracker(duration_sec, repeats),
+            "classifier": lambda: bench_classifier(duration_sec, repeats),
+            "annotation": lambda: bench_annotation(video_path, duration_sec, repeats),
+            "data_logger": lambda: bench_data_logger(work_dir, repeats),
+            "e2e_headless": lambda: bench_end_to_end(video_path, work_dir, repeats, render=False),
+            "e2e_render": lambda: bench_end_to_end(video_path, work_dir, repeats, render=True),
+        }
+        for name, bench in benchmarks.items():
+            if only and name not in only:
+                continue
+            for metric, value in bench().items():
+                results[f"{name}.{metric}"] = value
+                print(f"{name + '.' + metric:<40} {value:>12.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"environment": _environment(), "results": results}
+
+def compare(baseline, current, tolerance):
+    """
+    Prints every metric next to the baseline and returns the regressions.
+
+    Args:
+        baseline (dict): An earlier output of `run`.
+        current (dict): The output of this run.
+        tolerance (float): Allowed slowdown as a fraction (0.15 = 15%).
+
+    Returns:
+        list: Timings slower than the baseline by more than `tolerance`, event counts that
+              differ from it, and wrong OCR readings.
+    """
+    if baseline["environment"].get("platform") != current["environment"]["platform"]:
+        print("Warning: baseline was recorded on a different platform; timings may not be comparable.")
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, value in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        if ".events_" in key:
+            regressed = value != old
+        elif ".wrong_" in key:
+            regressed = value > 0
+        else:
+            regressed = old > 0 and (value - old) / old > tolerance
+        change = (value - old) / old if old else 0.0
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<40} {old:>12.3f} {value:>12.3f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tracking hot path on synthetic footage.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic video length in seconds.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per benchmark (median reported).")
+    parser.add_argument("--only", nargs="+", help="Run only these benchmarks (e.g. ocr tracker e2e_headless).")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file.")
+    parser.add_argument("--compare", dest="baseline_path", help="Baseline results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before a metric is flagged.")
+    args = parser.parse_args(argv)
+
+    current = run(args.duration, args.repeats, args.only)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to '{args.json_path}'")
+
+    wrong = [key for key, value in current["results"].items() if ".wrong_" in key and value > 0]
+    failed = bool(wrong)
+    if wrong:
+        print(f"\nWrong OCR readings against the overlay's true time: {', '.join(wrong)}")
+    if args.baseline_path:
+        with open(args.baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed (tolerance {args.tolerance:.0%}): {', '.join(regressions)}")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
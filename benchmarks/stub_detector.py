@@ -0,0 +1,48 @@
+"""
+Weight-free stand-in for `YOLODetector` that finds the flat-coloured people drawn by
+`benchmarks.synthetic_video`, so the pipeline can be benchmarked without a model.
+"""
+import cv2
+import numpy as np
+from benchmarks.synthetic_video import PERSON_COLOR
+
+class BlobDetector:
+    """
+    Detects person blobs by colour thresholding and connected components. Has the same
+    `detect_batch` / `boxes_to_detections` interface as `YOLODetector`.
+    """
+    def __init__(self, color=PERSON_COLOR, tolerance=40, min_area=400, nms_threshold=0.4):
+        """
+        Args:
+            color (tuple): BGR colour the people are drawn in.
+            tolerance (int): Per-channel tolerance around `color` (compression shifts colours).
+            min_area (int): Smallest blob, in pixels, reported as a person.
+            nms_threshold (float): Kept for interface parity with `YOLODetector` (used by `ROIDetector`).
+        """
+        self.lower = np.clip(np.array(color) - tolerance, 0, 255).astype(np.uint8)
+        self.upper = np.clip(np.array(color) + tolerance, 0, 255).astype(np.uint8)
+        self.min_area = min_area
+        self.nms_threshold = nms_threshold
+
+    def detect_batch(self, frames, imgsz=None):
+        """
+        Returns one (N, 6) float32 array [x1, y1, x2, y2, confidence, class_id] per frame.
+        `imgsz` is accepted for interface parity and ignored.
+        """
+        batch_boxes = []
+        for frame in frames:
+            mask = cv2.inRange(frame, self.lower, self.upper)
+            _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            rows = [[x, y, x + w, y + h, 0.9, 0] for x, y, w, h, area in stats[1:] if area >= self.min_area]
+            batch_boxes.append(np.array(rows, dtype=np.float32).reshape(-1, 6))
+        return batch_boxes
+
+    @staticmethod
+    def boxes_to_detections(boxes):
+        """Same conversion as `YOLODetector.boxes_to_detections`."""
+        return [
+            {'bbox': bbox, 'confidence': confidence, 'class_id': class_id}
+            for bbox, confidence, class_id in zip(boxes[:, :4].astype(np.int32).tolist(),
+                                                  boxes[:, 4].tolist(),
+                                                  boxes[:, 5].astype(np.int32).tolist())
+        ]
@@ -0,0 +1,140 @@
+"""
+Synthetic office CCTV footage for benchmarks and smoke runs without the real sample video.
+
+Renders a static office background, person-shaped blobs that walk in through the IN zone,
+sit at desks, stand up and leave through the OUT zone, and a burned-in
+`DD/MM/YYYY HH:MM:SS AM/PM` timestamp at `OCR_ROI` that ticks once per video second.
+People are drawn in a flat green no background pixel uses, so `BlobDetector` can find them
+without model weights. Output is deterministic for a given size, frame rate and duration.
+
+Write a video from the repository root:
+    python -m benchmarks.synthetic_video out.mp4 --duration 60
+"""
+import argparse
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+from config import OCR_ROI
+
+FRAME_SIZE = (1080, 1224) # (width, height) the default zones and OCR_ROI are set up for
+FPS = 25.0
+START_TIME = datetime(2025, 8, 16, 14, 41, 0) # First overlay reading: 16/08/2025 02:41:00 PM
+PERSON_COLOR = (40, 170, 40) # BGR
+
+STANDING_SIZE = (60, 170) # (width, height): height/width ratio well above the sitting threshold
+SITTING_SIZE = (110, 115) # Ratio about 1.05, below the sitting threshold
+
+# Per person: (time_sec, centre_x, centre_y, posture) keyframes. Between keyframes people walk
+# in a straight line; their posture switches at a keyframe. Times fit the default IN window
+# (first 16 s) and OUT window (from 43 s), so a 60 s video produces IN, working and OUT events.
+PERSON_SCRIPTS = (
+    ((0.0, 120, 320, "standing"), (8.0, 500, 320, "standing"), (8.5, 500, 320, "sitting"),
+     (30.0, 500, 320, "sitting"), (30.5, 500, 320, "standing"), (46.0, 940, 320, "standing")),
+    ((2.0, 150, 700, "standing"), (11.0, 460, 740, "standing"), (11.5, 460, 740, "sitting"),
+     (40.0, 460, 740, "sitting"), (40.5, 460, 740, "standing"), (50.0, 930, 700, "standing")),
+    ((4.0, 90, 1000, "standing"), (13.0, 620, 1000, "standing"), (13.5, 620, 1000, "sitting")),
+)
+
+def overlay_text(video_time_sec):
+    """Returns the timestamp overlay text shown at `video_time_sec`."""
+    return (START_TIME + timedelta(seconds=int(video_time_sec))).strftime('%d/%m/%Y %I:%M:%S %p')
+
+def person_boxes(video_time_sec):
+    """
+    Returns the ground truth at `video_time_sec`.
+
+    Returns:
+        list: One (bbox, posture) pair per visible person, bbox as [x1, y1, x2, y2].
+    """
+    boxes = []
+    for script in PERSON_SCRIPTS:
+        if video_time_sec < script[0][0]:
+            continue # Not arrived yet
+        for (t0, x0, y0, posture), (t1, x1, y1, _) in zip(script, script[1:]):
+            if t0 <= video_time_sec < t1:
+                progress = (video_time_sec - t0) / (t1 - t0)
+                cx, cy = x0 + (x1 - x0) * progress, y0 + (y1 - y0) * progress
+                break
+        else:
+            _, cx, cy, posture = script[-1] # Stays at the last keyframe
+        width, height = SITTING_SIZE if posture == "sitting" else STANDING_SIZE
+        x, y = int(cx) - width // 2, int(cy) - height // 2
+        boxes.append(([x, y, x + width, y + height], posture))
+    return boxes
+
+def render_background(frame_size=FRAME_SIZE):
+    """Renders the static office: floor gradient, desks and a wall strip, all in greys."""
+    width, height = frame_size
+    shade = np.linspace(150, 200, height, dtype=np.float32)[:, None]
+    background = np.repeat(np.repeat(shade, width, axis=1)[:, :, None], 3, axis=2).astype(np.uint8)
+    cv2.rectangle(background, (0, 0), (width, 60), (110, 110, 110), -1)
+    for desk_x, desk_y in ((500, 400), (460, 820), (620, 1080)):
+        cv2.rectangle(background, (desk_x - 90, desk_y), (desk_x + 90, desk_y + 40), (90, 90, 90), -1)
+    return background
+
+def render_frame(background, video_time_sec, out=None):
+    """
+    Draws the frame at `video_time_sec`.
+
+    Args:
+        background (numpy.ndarray): Output of `render_background`.
+        video_time_sec (float): Video time of the frame.
+        out (numpy.ndarray, optional): Buffer to draw into; allocated if None.
+
+    Returns:
+        numpy.ndarray: The BGR frame.
+    """
+    if out is None:
+        out = np.empty_like(background)
+    np.copyto(out, background)
+    for (x1, y1, x2, y2), posture in person_boxes(video_time_sec):
+        head_radius = (x2 - x1) // 4
+        cv2.circle(out, ((x1 + x2) // 2, y1 + head_radius), head_radius, PERSON_COLOR, -1)
+        cv2.rectangle(out, (x1, y1 + 2 * head_radius), (x2, y2), PERSON_COLOR, -1)
+
+    # White timestamp on a black box filling OCR_ROI, scaled to fit
+    rx1, ry1, rx2, ry2 = OCR_ROI
+    text = overlay_text(video_time_sec)
+    cv2.rectangle(out, (rx1, ry1), (rx2, ry2), (0, 0, 0), -1)
+    (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)
+    scale = min((rx2 - rx1 - 8) / text_width, (ry2 - ry1 - 8) / text_height)
+    text_y = ry1 + (ry2 - ry1 + int(text_height * scale)) // 2
+    cv2.putText(out, text, (rx1 + 4, text_y), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 2)
+    return out
+
+def iter_frames(duration_sec=60.0, fps=FPS, frame_size=FRAME_SIZE):
+    """Yields (video_time_sec, frame) for every frame; the frame buffer is reused between yields."""
+    background = render_background(frame_size)
+    buffer = np.empty_like(background)
+    for index in range(int(round(duration_sec * fps))):
+        video_time_sec = index / fps
+        yield video_time_sec, render_frame(background, video_time_sec, buffer)
+
+def write_video(path, duration_sec=60.0, fps=FPS, frame_size=FRAME_SIZE):
+    """
+    Writes the synthetic footage to `path` (mp4v).
+
+    Returns:
+        int: Number of frames written.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+    if not writer.isOpened():
+        raise IOError(f"Could not open video writer for {path}")
+    frames_written = 0
+    for _, frame in iter_frames(duration_sec, fps, frame_size):
+        writer.write(frame)
+        frames_written += 1
+    writer.release()
+    return frames_written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render synthetic office CCTV footage.")
+    parser.add_argument("output", help="Output .mp4 path.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Length in seconds.")
+    parser.add_argument("--fps", type=float, default=FPS, help="Frame rate.")
+    args = parser.parse_args(argv)
+    frames_written = write_video(args.output, args.duration, args.fps)
+    print(f"Wrote {frames_written} frames ({FRAME_SIZE[0]}x{FRAME_SIZE[1]}, {args.fps} FPS) to '{args.output}'")
+
+if __name__ == "__main__":
+    main()
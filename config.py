@@ -6,10 +6,29 @@ VIDEO_PATH = os.path.join(BASE_DIR, 'sample_video', 'office_cctv_footage.mp4')
 
 OUTPUT_VIDEO_PATH = os.path.join(BASE_DIR, 'logs', 'processed_office_video.mp4')
 
+VIDEO_WRITER_BACKEND = 'opencv' # 'opencv' (mp4v) or 'ffmpeg' (libx264 through an ffmpeg pipe, smaller files)
+
+VIDEO_WRITER_QUEUE_SIZE = 8 # Frames buffered for the encoder thread
+
+FFMPEG_PATH = 'ffmpeg'
+FFMPEG_PRESET = 'veryfast' # x264 speed/size trade-off
+FFMPEG_CRF = 23 # x264 quality; lower is better quality and larger files
+
+WRITE_SKIPPED_FRAMES = True # With FRAME_SKIP > 1, also write the unprocessed frames (keeps the full frame rate)
+
 
 FRAME_SKIP = 1 
 
 
+PREFETCH_QUEUE_SIZE = 4 # Decoded frames buffered ahead of the processing loop
+
+# --- Live streams (RTSP/HTTP camera URLs are always live; --live replays a local file as one) ---
+LIVE_MODE = False # Replay a local video file in real time at its native fps, dropping frames the processing loop cannot keep up with
+LIVE_RECONNECT_DELAY_SEC = 1.0 # First wait before reopening a dropped stream; doubled after every failed attempt
+LIVE_RECONNECT_MAX_DELAY_SEC = 30.0 # Upper bound of the reconnect backoff
+LIVE_DEFAULT_FPS = 25.0 # Frame rate assumed when a stream does not report one (output video)
+
+
 YOLO_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'yolo11m.pt') 
 
 CONFIDENCE_THRESHOLD = 0.5
@@ -17,19 +36,77 @@ CONFIDENCE_THRESHOLD = 0.5
 
 NMS_THRESHOLD = 0.4
 
+DETECTION_BATCH_SIZE = 4 # Frames sent through YOLO in a single inference call
+
+DETECTION_IMGSZ = 640 # Inference size (px, longest side, multiple of 32). 480 trades some accuracy on distant people for speed; boxes are rescaled exactly to frame pixels
+
+INFERENCE_MAX_WAIT_MS = 10.0 # Multi-camera: how long a detection request waits for other cameras to join its batch
+
+SUPERVISOR_REPORT_INTERVAL_SEC = 10.0 # Multi-camera: seconds between per-camera FPS/lag reports
+
 TARGET_CLASSES = [0]
 
+# Motion gate (opt-in, --motion-gate): skip YOLO on frames that barely differ from the last detected frame
+MOTION_GATE_ENABLED = False
+MOTION_GATE_WIDTH = 160 # Width (px) frames are downscaled to before differencing
+MOTION_GATE_PIXEL_THRESHOLD = 25 # Grey-level difference at which a downscaled pixel counts as changed
+MOTION_GATE_AREA_THRESHOLD = 0.002 # Changed-pixel fraction at or above which detection runs
+MOTION_GATE_REFRESH_INTERVAL = 25 # Run detection at least once every N processed frames
+
+# Detection mode: 'full' runs YOLO on whole frames; 'roi' only on square tiles around motion and existing tracks
+DETECTION_MODE = 'full'
+ROI_TILE_SIZE = 320 # Inference size (px) of each tile; larger regions are downscaled to it
+ROI_MARGIN_PX = 48 # Padding added around every motion region and track box before tiling
+ROI_MAX_TILES = 3 # Above this many tiles a frame costs about as much as a full pass, so run on the full frame
+ROI_FULL_FRAME_INTERVAL = 50 # Run a full-frame pass every N detected frames to catch anything the ROIs missed
+
 
 OCR_ROI = (750, 1180, 1070, 1210) # Estimated for a down-right timestamp in 1080x1224
 
 
 TESSERACT_CMD = 'tesseract'
 
+# OCR engine: 'tesseract', or 'glyph' (opt-in) for in-process template matching bootstrapped from Tesseract
+OCR_ENGINE = 'tesseract'
+OCR_GLYPH_VALIDATE_EVERY = 50 # Cross-check the glyph engine against Tesseract every N glyph reads
+
+# OCR change-detection cache: Tesseract only runs when the timestamp overlay changes
+OCR_CACHE_ENABLED = True
+OCR_CACHE_DIFF_THRESHOLD = 0.03 # Max fraction of changed text pixels still treated as "unchanged" (sensor noise), over the whole overlay and over the seconds digits alone
+OCR_CACHE_MAX_TICK_CHANGE = 0.12 # Max changed fraction accepted as a plain one-second tick
+OCR_CACHE_RESYNC_TICKS = 10 # Force a full OCR after this many predicted ticks
+
 
 MAX_DIST_PERSON = 70 
 
 MAX_MISSING_FRAMES = 15 
 
+TRACKER_IOU_WEIGHT = 0.5 # Weight of (1 - IoU) next to normalized centroid distance in the association cost
+
+# Constant-velocity Kalman prediction of track positions (association uses predicted centroids)
+KALMAN_MEASUREMENT_STD = 4.0 # Detector jitter of a box centroid, px
+KALMAN_VELOCITY_STD = 150.0 # Spread of a new track's unknown walking speed, px/s
+KALMAN_ACCELERATION_STD = 200.0 # How fast walking speed drifts, px/s per sqrt(s)
+KALMAN_GATE_SIGMAS = 3.0 # Association gate in standard deviations of the predicted position; never below MAX_DIST_PERSON
+
+TRACK_STORE_CAPACITY = 64 # Track slots preallocated by the tracker; reused as tracks die, doubled only if more people are tracked at once
+
+# --- Sharded processing (--workers) ---
+SHARD_OVERLAP_SEC = 5.0 # Lead-in each shard re-reads from the previous one, used to stitch identities
+SHARD_STITCH_IOU = 0.5 # Minimum box IoU for two shards' tracks to count as the same person in a frame
+WORKER_START_METHOD = 'forkserver' # 'forkserver' (modules imported once, workers forked from it; Unix only), 'spawn' or 'fork'
+WORKER_PRELOAD_MODEL = True # With 'forkserver', also load the YOLO weights in the fork server so workers inherit them
+
+DETECTOR_WARMUP = True # Run one dummy inference at startup so the first batch does not pay for lazy initialization
+
+DETECTOR_BACKEND = 'torch' # 'torch' (ultralytics/PyTorch) or 'onnx' (ONNX Runtime on the CPU; needs onnxruntime and onnx)
+ONNX_CACHE_DIR = os.path.join(BASE_DIR, 'models', 'onnx_cache') # Exported models, keyed by weights hash and input size
+ONNX_INT8 = False # Run the INT8 statically quantized ONNX model (calibrated on ONNX_CALIBRATION_VIDEO)
+ONNX_CALIBRATION_VIDEO = VIDEO_PATH # Our own footage, so the INT8 ranges match what the cameras see
+ONNX_CALIBRATION_FRAMES = 64 # Frames sampled evenly from the calibration video
+ONNX_INTRA_OP_THREADS = 0 # Threads per operator; 0 = one per physical core. Sharded workers use their share of the cores
+ONNX_INTER_OP_THREADS = 1 # Threads running independent operators in parallel (1 = sequential)
+
 
 SITTING_THRESHOLD_HEIGHT_RATIO = 1.4 
 
@@ -43,14 +120,36 @@ IN_TIME_WINDOW_END_SEC = 16
 OUT_TIME_WINDOW_START_SEC = 43 
 
 
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
+LOGS_DIR = os.path.join(BASE_DIR, 'logs') # Created by the components that write into it, not at import
 
 LOG_FILE_PATH = os.path.join(LOGS_DIR, 'office_tracking_log.txt')
 
 CSV_EXPORT_PATH = os.path.join(LOGS_DIR, 'person_activity_report.csv')
 
+EVENT_STORE_PATH = None # SQLite file that also receives every event (e.g. os.path.join(LOGS_DIR, 'events.db')); None disables it
+
+CAMERA_ID = 'default' # Camera name events are filed under in the event store
+
+REPORT_FORMATS = ('csv',) # Report outputs: 'csv' and/or 'parquet' (Parquet needs pyarrow)
+
+# --- Checkpoint / resume (single-video file runs; see utils/checkpoint.py) ---
+CHECKPOINT_PATH = None # Periodic job state for --resume; None disables checkpoints (enable per run with --checkpoint)
+CHECKPOINT_DEFAULT_PATH = os.path.join(LOGS_DIR, 'checkpoint.pkl.gz') # Used by --checkpoint and --resume when no file is given
+CHECKPOINT_INTERVAL_SEC = 60.0 # Wall-clock seconds between checkpoints
+
+LOG_QUEUE_SIZE = 10000 # Log lines buffered for the DataLogger writer thread
+
+LOG_FLUSH_EVERY = 50 # Flush the text log after this many lines...
+
+LOG_FLUSH_INTERVAL_SEC = 1.0 # ...or at least this often while lines are pending
+
+# Per-stage timing metrics (see utils/metrics.py)
+METRICS_JSON_PATH = None # Periodic JSON snapshot file; None disables it
+METRICS_PROMETHEUS_PATH = None # Prometheus text file (e.g. in node-exporter's textfile directory, named *.prom)
+METRICS_EXPORT_INTERVAL_SEC = 5.0 # Seconds between metric file writes
+METRICS_WINDOW = 1000 # Recent samples per stage used for the p50/p95/p99 percentiles
+METRICS_FPS_WINDOW_SEC = 10.0 # Time span of the rolling FPS
+
 
 DRAW_BBOX = True
 DRAW_LABELS = True
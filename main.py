@@ -1,37 +1,151 @@
+import argparse
+import os
+import signal
 import cv2
 import time
 from datetime import datetime
 
 # Import modules from your project structure
 from config import (
-    VIDEO_PATH, YOLO_MODEL_PATH, OCR_ROI, IN_ZONE, OUT_ZONE, 
-    IN_TIME_WINDOW_END_SEC, OUT_TIME_WINDOW_START_SEC,
+    VIDEO_PATH, YOLO_MODEL_PATH,
     LOG_FILE_PATH, CSV_EXPORT_PATH, FRAME_SKIP, OUTPUT_VIDEO_PATH,
-    DRAW_DEBUG_ZONES
+    PREFETCH_QUEUE_SIZE, DETECTION_BATCH_SIZE,
+    CONFIDENCE_THRESHOLD, NMS_THRESHOLD, MAX_DIST_PERSON, MAX_MISSING_FRAMES,
+    SITTING_THRESHOLD_HEIGHT_RATIO, OCR_ENGINE, REPORT_FORMATS, EVENT_STORE_PATH, CAMERA_ID,
+    VIDEO_WRITER_BACKEND, VIDEO_WRITER_QUEUE_SIZE, WRITE_SKIPPED_FRAMES, MOTION_GATE_ENABLED,
+    DETECTION_MODE, METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH, DETECTOR_WARMUP, DETECTOR_BACKEND, ONNX_INT8,
+    DETECTION_IMGSZ, LIVE_MODE, CHECKPOINT_PATH, CHECKPOINT_DEFAULT_PATH, CHECKPOINT_INTERVAL_SEC
 )
-from models.yolo_detector import YOLODetector
-from models.tracker import PersonTracker, TrackedPerson, _calculate_time_difference_in_seconds
+from models.yolo_detector import create_detector
+from models.motion_gate import MotionGate
+from models.roi_detector import ROIDetector
+from models.tracker import PersonTracker
 from models.activity_classifier import ActivityClassifier
 from utils.ocr_extractor import OCRExtractor
 from utils.video_processor import VideoProcessor
+from utils.frame_prefetcher import FramePrefetcher
+from utils.live_source import LiveFrameSource, is_stream_url
 from utils.data_logger import DataLogger
+from utils.event_store import SQLiteEventStore
+from utils.metrics import PipelineMetrics, MetricsExporter
+from utils.checkpoint import Checkpointer
+from pipeline import TrackingPipeline
 
-def run_office_tracking():
+def run_office_tracking(video_path=VIDEO_PATH, output_video_path=OUTPUT_VIDEO_PATH,
+                        log_file_path=LOG_FILE_PATH, csv_export_path=CSV_EXPORT_PATH,
+                        model_path=YOLO_MODEL_PATH, frame_skip=FRAME_SKIP,
+                        batch_size=DETECTION_BATCH_SIZE, confidence_threshold=CONFIDENCE_THRESHOLD,
+                        nms_threshold=NMS_THRESHOLD, max_dist_person=MAX_DIST_PERSON,
+                        max_missing_frames=MAX_MISSING_FRAMES,
+                        sitting_threshold=SITTING_THRESHOLD_HEIGHT_RATIO, ocr_engine=OCR_ENGINE,
+                        report_formats=REPORT_FORMATS, event_store_path=EVENT_STORE_PATH, camera_id=CAMERA_ID,
+                        recording_date=None, video_writer_backend=VIDEO_WRITER_BACKEND,
+                        write_skipped_frames=WRITE_SKIPPED_FRAMES, motion_gate=MOTION_GATE_ENABLED,
+                        detection_mode=DETECTION_MODE, metrics_json_path=METRICS_JSON_PATH,
+                        metrics_prometheus_path=METRICS_PROMETHEUS_PATH, detector_backend=DETECTOR_BACKEND,
+                        onnx_int8=ONNX_INT8, imgsz=DETECTION_IMGSZ, live=LIVE_MODE, checkpoint_path=CHECKPOINT_PATH,
+                        checkpoint_interval_sec=CHECKPOINT_INTERVAL_SEC, resume=False, headless=False, annotate=True):
     """
     Main function to run the CCTV office tracking system.
     This orchestrates video processing, person detection, tracking, activity classification,
     OCR time extraction, and comprehensive data logging based on the project requirements.
+
+    Every argument defaults to the corresponding value in `config.py`, so a run can override
+    individual settings (see `main()` for the command-line interface).
+
+    Args:
+        video_path (str): Input video file, or an RTSP/HTTP camera URL (always processed live).
+        output_video_path (str): Where to write the processed video. None disables encoding.
+        log_file_path (str): Text event log path.
+        csv_export_path (str): CSV report path.
+        model_path (str): YOLO weights path.
+        frame_skip (int): Process every N-th frame.
+        batch_size (int): Frames per batched YOLO inference call.
+        confidence_threshold (float): YOLO detection confidence threshold.
+        nms_threshold (float): YOLO NMS IoU threshold.
+        max_dist_person (float): Tracker association gate in pixels.
+        max_missing_frames (int): Frames a track may go undetected before it is dropped.
+        sitting_threshold (float): Height/width ratio below which a person counts as working.
+        ocr_engine (str): "tesseract" or "glyph".
+        report_formats (tuple): Report outputs, "csv" and/or "parquet".
+        event_store_path (str): SQLite event store file. None disables the store.
+        camera_id (str): Camera name events are filed under in the event store.
+        recording_date (str): ISO date of the footage for the event store, and for CCTV times read
+                              before the overlay's date. Defaults to today.
+        video_writer_backend (str): "opencv" (mp4v) or "ffmpeg" (libx264 through an ffmpeg pipe).
+        write_skipped_frames (bool): With `frame_skip > 1`, also write unprocessed frames. When False,
+                                     only processed frames are written, at a proportionally lower frame rate.
+        motion_gate (bool): Skip YOLO on frames with no significant motion since the last detection.
+        detection_mode (str): "full" runs YOLO on whole frames, "roi" only on tiles around motion and tracks.
+        metrics_json_path (str): Periodic JSON snapshot of the per-stage timings. None disables it.
+        metrics_prometheus_path (str): Periodic Prometheus text file of the same metrics. None disables it.
+        detector_backend (str): "torch" (ultralytics/PyTorch) or "onnx" (ONNX Runtime on the CPU).
+        onnx_int8 (bool): With the ONNX backend, run the INT8 quantized model.
+        imgsz (int): Detection inference size (longest side). Boxes are mapped back to frame pixels,
+                     so zones and `max_dist_person` stay in frame coordinates.
+        live (bool): Process `video_path` as a live feed (see `LiveFrameSource`): a file is replayed at
+                     its native fps and frames the loop cannot keep up with are dropped. Ctrl+C ends a
+                     live run and still writes the report.
+        checkpoint_path (str): File the job state is saved to periodically (see `utils.checkpoint`);
+                               deleted when the run finishes. None disables checkpoints. Not used for
+                               live feeds.
+        checkpoint_interval_sec (float): Wall-clock seconds between checkpoints.
+        resume (bool): Continue from the checkpoint at `checkpoint_path` instead of starting over:
+                       frames already done are skipped, and the output video (which cannot be
+                       appended to) is written to a new `<name>_resumed_<time>` file.
+        headless (bool): Never open a display window or poll the keyboard.
+        annotate (bool): Draw annotations on frames that are displayed or written. When False,
+                         raw frames are written.
     """
     print("\n--- Initializing Office Tracking System ---")
-    
+
+    live = live or is_stream_url(video_path)
+    recording_date = recording_date or datetime.now().date().isoformat() # One date for OCR and the event store
+    if resume and (live or not checkpoint_path):
+        print("CRITICAL ERROR: --resume needs a checkpoint file and a video file (live feeds cannot be resumed).")
+        return
+    if resume and output_video_path:
+        output_base, output_ext = os.path.splitext(output_video_path)
+        output_video_path = f"{output_base}_resumed_{datetime.now().strftime('%Y%m%d-%H%M%S')}{output_ext}"
+
     # 1. Initialize all necessary components
     try:
-        video_processor = VideoProcessor(VIDEO_PATH, OUTPUT_VIDEO_PATH)
-        yolo_detector = YOLODetector()
-        person_tracker = PersonTracker()
-        activity_classifier = ActivityClassifier()
-        ocr_extractor = OCRExtractor()
-        data_logger = DataLogger(LOG_FILE_PATH, CSV_EXPORT_PATH)
+        output_frame_step = 1 if write_skipped_frames else max(1, frame_skip)
+        metrics = PipelineMetrics(camera_id)
+        with metrics.startup_timer("video"):
+            video_processor = VideoProcessor(video_path, output_video_path, writer_backend=video_writer_backend,
+                                             output_frame_step=output_frame_step, metrics=metrics)
+        with metrics.startup_timer("detector"):
+            yolo_detector = create_detector(detector_backend, model_path, confidence_threshold, nms_threshold,
+                                            imgsz=imgsz, int8=onnx_int8)
+        if DETECTOR_WARMUP:
+            with metrics.startup_timer("detector_warmup"):
+                yolo_detector.warmup((video_processor.width, video_processor.height))
+        with metrics.startup_timer("tracker"):
+            person_tracker = PersonTracker(max_dist_person, max_missing_frames)
+            activity_classifier = ActivityClassifier(sitting_threshold)
+        with metrics.startup_timer("ocr"):
+            ocr_extractor = OCRExtractor(ocr_engine, recording_date=recording_date)
+        with metrics.startup_timer("logger"):
+            event_store = SQLiteEventStore(event_store_path, camera_id, recording_date) if event_store_path else None
+            data_logger = DataLogger(log_file_path, csv_export_path, report_formats=report_formats, event_store=event_store)
+        pipeline = TrackingPipeline(person_tracker, activity_classifier, ocr_extractor, data_logger, metrics=metrics)
+        frame_gate = MotionGate((video_processor.width, video_processor.height)) if motion_gate else None
+        detector = yolo_detector
+        if detection_mode == 'roi':
+            detector = ROIDetector(yolo_detector, person_tracker, (video_processor.width, video_processor.height))
+        # The pool must also cover every frame held in a pending detection batch or queued for encoding
+        keeps_skipped_frames = video_processor.writer and write_skipped_frames
+        frames_held_per_batch = batch_size * (max(1, frame_skip) if keeps_skipped_frames else 1)
+        frames_held_by_writer = VIDEO_WRITER_QUEUE_SIZE + 1 if video_processor.writer else 0
+        if live:
+            # Besides the held frames, one frame waits for the loop and one is being captured
+            frame_prefetcher = LiveFrameSource(video_processor, pool_size=frames_held_per_batch + frames_held_by_writer + 2,
+                                               metrics=metrics)
+        else:
+            frame_prefetcher = FramePrefetcher(video_processor, PREFETCH_QUEUE_SIZE,
+                                               pool_size=PREFETCH_QUEUE_SIZE + frames_held_per_batch + frames_held_by_writer + 1,
+                                               metrics=metrics)
     except Exception as e:
         print(f"CRITICAL ERROR: Failed to initialize one or more components. Please check configurations and file paths. Details: {e}")
         # Release resources if any were opened before exiting
@@ -39,141 +153,393 @@ def run_office_tracking():
             video_processor.release()
         return
 
-    frame_idx = 0
+    checkpointer = None
+    resume_position = None
+    if checkpoint_path and not live:
+        checkpointer = Checkpointer(checkpoint_path, video_path, person_tracker, ocr_extractor, data_logger,
+                                    checkpoint_interval_sec)
+        if resume:
+            try:
+                resume_position = checkpointer.restore()
+            except (IOError, OSError, ValueError) as e:
+                print(f"CRITICAL ERROR: Cannot resume. Details: {e}")
+                data_logger.close()
+                video_processor.release()
+                return
+            pipeline.tracked_persons = person_tracker.tracked_persons
+            # Frames already done are skipped, not decoded or run through detection
+            video_processor.seek_frame(resume_position[0])
+
+    # Annotated frames are only rendered when something consumes them
+    render_annotations = annotate and (not headless or video_processor.writer is not None)
+    if headless:
+        print(f"Headless mode: no display window. Annotation: {'on' if render_annotations else 'off'}, "
+              f"Video encoding: {'on' if video_processor.writer else 'off'}")
+
     start_processing_time = time.time() # For overall performance measurement
 
+    # Decode on a background thread so it overlaps with OCR and detection below
+    frame_prefetcher.start()
+    metrics_exporter = MetricsExporter([metrics], metrics_json_path, metrics_prometheus_path).start()
+
+    if live:
+        # A live feed has no end; Ctrl+C ends it like the end of a file, so the report is still written
+        previous_sigint_handler = signal.signal(signal.SIGINT, lambda signum, stack: frame_prefetcher.interrupt())
+        print("Live mode: press Ctrl+C to stop.")
+
+    # Kept current so a run that fails mid-stream can still close its sessions at the last processed frame
+    progress = list(resume_position or (0, 0.0))
+    def record_progress(frame_idx, video_time_sec):
+        progress[:] = [frame_idx, video_time_sec]
+
     print("\n--- Starting Video Processing Loop ---")
-    while True:
-        ret, frame = video_processor.read_frame()
-        if not ret:
-            print("End of video stream or failed to read frame. Exiting loop.")
-            break
-
-        frame_idx += 1
-        current_video_time_sec = video_processor.get_current_time_seconds()
-
-        # Skip frames if FRAME_SKIP is set to process video faster
-        if FRAME_SKIP > 1 and frame_idx % FRAME_SKIP != 0:
-            # If skipping frames, just write the original frame to maintain video length
-            video_processor.write_frame(frame) 
-            continue
-
-        # 2. Extract CCTV Time via OCR from a defined ROI
-        ocr_time = ocr_extractor.extract_time(frame)
-        if ocr_time == "N/A":
-            print(f"Warning: OCR failed to extract time at frame {frame_idx} (Video Time: {current_video_time_sec:.2f}s). Using last valid time if available, or 'N/A'.")
-            # If OCR fails, we'll try to use the last known OCR time for tracked persons.
-            # For new events (IN/OUT/START_WORKING), if OCR is N/A, these events might be missed or logged with N/A.
-
-        # 3. Detect Persons in the current frame using YOLO
-        detections = yolo_detector.detect(frame)
-        
-        # 4. Update Person Tracker with new detections
-        # This will match detections to existing persons, create new ones, or mark existing as missing.
-        tracked_persons = person_tracker.update(detections, ocr_time, current_video_time_sec)
-
-        # 5. Process Each Tracked Person for IN/OUT/Activity/Working Time
-        for person in tracked_persons:
-            # Always update the last known OCR time for this person if a valid one is available
-            if ocr_time != "N/A":
-                person.last_ocr_time = ocr_time
-            
-            # Calculate centroid of the person's bounding box
-            cx = (person.bbox[0] + person.bbox[2]) / 2
-            cy = (person.bbox[1] + person.bbox[3]) / 2
-
-            # --- IN Time Detection (First 20 seconds of video) ---
-            # A person's IN time is recorded if they are in the IN_ZONE during the first 20 seconds,
-            # and they don't already have an IN time recorded.
-            if current_video_time_sec <= IN_TIME_WINDOW_END_SEC and person.in_time is None and ocr_time != "N/A":
-                if IN_ZONE[0] <= cx <= IN_ZONE[2] and IN_ZONE[1] <= cy <= IN_ZONE[3]:
-                    person.in_time = ocr_time
-                    person.in_frame_time_sec = current_video_time_sec
-                    data_logger.log_event(person.id, "IN", ocr_time, current_video_time_sec, "Person entered office.")
-                    print(f"-> IN Event: {person.id} entered at {ocr_time}")
-
-            # --- Activity Classification (After the first 20 seconds) ---
-            # After the initial IN time window, classify activity (standing/working).
-            if current_video_time_sec > IN_TIME_WINDOW_END_SEC:
-                new_activity = activity_classifier.classify(person.bbox)
-                
-                # Check if activity has changed to manage working sessions
-                if person.activity != new_activity:
-                    prev_activity = person.activity
-                    person.update_activity(new_activity, ocr_time, current_video_time_sec) # This updates person.activity and manages session start/end
-                    
-                    # Log the activity change
-                    data_logger.log_event(
-                        person.id, "ACTIVITY_CHANGE", ocr_time, current_video_time_sec, 
-                        f"Changed from '{prev_activity}' to '{new_activity}'."
-                    )
-                    
-                    # Log explicit WORKING_START/WORKING_END events
-                    if new_activity == "working" and ocr_time != "N/A":
-                        data_logger.log_event(person.id, "WORKING_START", ocr_time, current_video_time_sec, "Person started working (sitting).")
-                        print(f"-> Working Event: {person.id} started working at {ocr_time}")
-                    elif prev_activity == "working" and new_activity == "standing" and ocr_time != "N/A":
-                        data_logger.log_event(person.id, "WORKING_END", ocr_time, current_video_time_sec, "Person stopped working (stood up).")
-                        print(f"-> Working Event: {person.id} stopped working at {ocr_time}")
-
-                # Accumulate total working seconds for currently active working sessions
-                # The `person.total_working_seconds` is cumulatively updated when a session *ends* (in `update_activity`).
-                # For *displaying* the current total, `VideoProcessor` will calculate the duration of the ongoing session
-                # and add it to `person.total_working_seconds`. So no direct update here.
-                pass 
-
-            # --- OUT Time Detection (After 30 seconds of video) ---
-            # A person's OUT time is recorded if they are in the OUT_ZONE after 30 seconds,
-            # have an IN time, and don't already have an OUT time recorded.
-            if current_video_time_sec >= OUT_TIME_WINDOW_START_SEC and \
-               person.in_time is not None and person.out_time is None and ocr_time != "N/A":
-                if OUT_ZONE[0] <= cx <= OUT_ZONE[2] and OUT_ZONE[1] <= cy <= OUT_ZONE[3]:
-                    person.out_time = ocr_time
-                    person.out_frame_time_sec = current_video_time_sec
-                    data_logger.log_event(person.id, "OUT", ocr_time, current_video_time_sec, "Person exited office.")
-                    print(f"-> OUT Event: {person.id} exited at {ocr_time}")
-
-                    # If the person was working when they exited, end their working session
-                    if person.is_working and person.current_working_session_start_time:
-                        duration = _calculate_time_difference_in_seconds(person.current_working_session_start_time, ocr_time)
-                        person.total_working_seconds += duration # Add remaining duration
-                        data_logger.log_event(person.id, "WORKING_END", ocr_time, current_video_time_sec, "Person stopped working (exited office).")
-                        person.current_working_session_start_time = None
-                        person.is_working = False
-
-
-        # 6. Visualize Results on the frame
-        annotated_frame = video_processor.draw_annotations(frame, tracked_persons, ocr_time)
-        
-        # Display the annotated frame
-        cv2.imshow("Office Tracking System - Press 'q' to quit", annotated_frame)
-        video_processor.write_frame(annotated_frame)
-
-        # Check for 'q' key press to quit the application
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            print("User requested to quit. Exiting loop.")
-            break
-
-    # 7. Finalize and Export Data after video processing loop ends
+    stream_error = None
+    try:
+        frame_idx, last_video_time_sec = process_stream(
+            frame_prefetcher, video_processor, detector, pipeline,
+            frame_skip, batch_size, render_annotations, headless,
+            on_frame_processed=record_progress,
+            write_skipped_frames=write_skipped_frames, motion_gate=frame_gate, metrics=metrics,
+            latency_clock=frame_prefetcher.clock if live else None, resume_position=resume_position,
+            on_batch_processed=checkpointer.maybe_save if checkpointer else None
+        )
+    except Exception as e:
+        # Still flush the log, write the report and release the video below; the error is reported last
+        stream_error = e
+        frame_idx, last_video_time_sec = progress
+    finally:
+        if live:
+            signal.signal(signal.SIGINT, previous_sigint_handler)
+
+    # 5. Finalize and Export Data after video processing loop ends
+    frame_prefetcher.stop()
     end_processing_time = time.time()
     total_processing_duration = end_processing_time - start_processing_time
     print(f"\n--- Video Processing Finished ---")
     print(f"Total frames processed: {frame_idx}")
     print(f"Total processing time: {total_processing_duration:.2f} seconds.")
-    
-    # Ensure any ongoing working sessions are finalized before exporting the report
-    for person in tracked_persons:
-        if person.is_working and person.current_working_session_start_time and person.last_ocr_time != "N/A":
-            duration = _calculate_time_difference_in_seconds(person.current_working_session_start_time, person.last_ocr_time)
-            person.total_working_seconds += duration
-            data_logger.log_event(person.id, "WORKING_END", person.last_ocr_time, video_processor.get_current_time_seconds(), "Person stopped working (video ended).")
+    decode_stats = frame_prefetcher.get_stats()
+    if live:
+        latency = metrics.snapshot()["stages"].get("latency")
+        print(f"Live capture: {decode_stats['frames_captured']} frames, {decode_stats['frames_dropped']} dropped "
+              f"({decode_stats['drop_rate']:.1%}), {decode_stats['reconnects']} reconnects, "
+              f"avg decode {decode_stats['avg_decode_ms']:.2f} ms/frame"
+              + (f", latency p50 {latency['p50_ms']:.1f} ms / p95 {latency['p95_ms']:.1f} ms." if latency else "."))
+    else:
+        print(f"Decode: {decode_stats['frames_decoded']} frames, avg {decode_stats['avg_decode_ms']:.2f} ms/frame, "
+              f"avg queue depth {decode_stats['avg_queue_depth']:.2f}, loop waited {decode_stats['consumer_wait_sec']:.2f}s on decoder.")
+    ocr_stats = ocr_extractor.get_cache_stats()
+    print(f"OCR cache: {ocr_stats['cache_hits']} hits, {ocr_stats['predicted_hits']} predicted ticks, "
+          f"{ocr_stats['cache_misses']} full OCR runs (hit rate {ocr_stats['hit_rate']:.1%}); "
+          f"{ocr_stats['glyph_reads']} glyph reads, {ocr_stats['tesseract_reads']} Tesseract reads, "
+          f"{ocr_stats['glyph_mismatches']} glyph/Tesseract mismatches.")
+    if frame_gate:
+        gate_stats = frame_gate.get_stats()
+        print(f"Motion gate: skipped detection on {gate_stats['frames_gated']}/{gate_stats['frames_seen']} frames "
+              f"({gate_stats['gated_fraction']:.1%} gated), {gate_stats['refreshes']} periodic refreshes, "
+              f"avg {gate_stats['avg_gate_ms']:.2f} ms/frame.")
+    if detector is not yolo_detector:
+        roi_stats = detector.get_stats()
+        print(f"ROI detection: {roi_stats['tiles_run']} tiles over {roi_stats['frames_detected']} frames "
+              f"(avg {roi_stats['avg_tiles_per_frame']:.2f} tiles/frame), {roi_stats['full_frame_passes']} full-frame passes, "
+              f"{roi_stats['empty_frames']} frames with nothing to detect.")
 
-    data_logger.export_to_csv(tracked_persons) # Pass tracked_persons for the final report
+    # Ensure any ongoing working sessions are finalized and export the report
+    pipeline.finalize(last_video_time_sec)
+    if checkpointer and stream_error is None:
+        checkpointer.discard() # The job is complete; only a crashed run leaves a checkpoint to resume
 
-    # 8. Release all resources (video capture, video writer, OpenCV windows)
+    # 6. Release all resources (event log, video capture, video writer, OpenCV windows)
+    data_logger.close()
     video_processor.release()
-    cv2.destroyAllWindows()
+    if video_processor.writer: # Stats after release, which drains the encode queue
+        encode_stats = video_processor.writer.get_stats()
+        print(f"Encode ({video_processor.writer_backend}): {encode_stats['frames_written']} frames, {encode_stats['frames_failed']} failed, "
+              f"avg {encode_stats['avg_encode_ms']:.2f} ms/frame (max {encode_stats['max_encode_ms']:.2f} ms), "
+              f"avg queue depth {encode_stats['avg_queue_depth']:.2f}, loop waited {encode_stats['producer_wait_sec']:.2f}s on encoder.")
+    metrics_exporter.stop() # After the encoder drained, so the final export includes every encode
+    metrics.print_summary()
+    if not headless:
+        cv2.destroyAllWindows()
     print("All resources released. Office Tracking System shut down.")
+    if stream_error is not None:
+        print(f"ERROR: Processing stopped early after {frame_idx} frames; the report covers those frames only. Details: {stream_error}")
+
+def process_stream(frame_prefetcher, video_processor, detector, pipeline, frame_skip, batch_size,
+                   render_annotations=True, headless=False, on_frame_processed=None, stop_event=None,
+                   write_skipped_frames=WRITE_SKIPPED_FRAMES, motion_gate=None, metrics=None, latency_clock=None,
+                   resume_position=None, on_batch_processed=None):
+    """
+    Runs the frame loop until the stream ends or the user quits: batched detection, the
+    per-frame tracking pipeline, annotation, video output and (unless headless) display.
+
+    Args:
+        frame_prefetcher (FramePrefetcher): Started prefetcher (or `LiveFrameSource`) supplying decoded frames.
+        video_processor (VideoProcessor): Draws annotations and writes the output video.
+        detector: Anything with `detect_batch` and `boxes_to_detections`, e.g. `YOLODetector`
+                  or `SharedInferenceWorker`.
+        pipeline (TrackingPipeline): Per-frame tracking and event logic.
+        frame_skip (int): Process every N-th frame.
+        batch_size (int): Frames per `detect_batch` call.
+        render_annotations (bool): Draw annotations on frames that are displayed or written.
+        headless (bool): Never open a display window or poll the keyboard.
+        on_frame_processed (callable, optional): Called as `(frame_idx, video_time_sec)` after
+                                                 each processed frame.
+        stop_event (threading.Event, optional): Ends the loop early once set.
+        write_skipped_frames (bool): With `frame_skip > 1`, also write the unprocessed frames.
+        motion_gate (MotionGate, optional): Skips detection on static frames; the tracker then
+                                            carries the last boxes forward.
+        metrics (PipelineMetrics, optional): Receives the "motion_gate", "detection" and "annotation"
+                                             stage timings and counts processed frames.
+        latency_clock (callable, optional): Current time on the clock frame times are stamped with
+                                            (`LiveFrameSource.clock`). When given, each processed frame's
+                                            time from arrival to the end of processing is recorded as
+                                            the "latency" stage.
+        resume_position (tuple, optional): (frames_read, last_video_time_sec) of a resumed run; the
+                                           source must already be positioned after those frames.
+        on_batch_processed (callable, optional): Called as `(frames_read, last_video_time_sec)` after
+                                                 each batch, when every frame read so far has been
+                                                 fully processed (see `Checkpointer.maybe_save`).
+
+    Returns:
+        tuple: (frames_read, last_video_time_sec)
+    """
+    frame_idx, last_video_time_sec = resume_position or (0, 0.0)
+    # Frames are gathered into small batches so YOLO runs once per `batch_size` frames.
+    # Skipped frames are kept in the batch (when a video is being written) so output order is preserved.
+    pending_frames = [] # (frame_idx, frame, video_time_sec, needs_processing, needs_detection)
+    pending_to_process = 0
+    stream_ended = False
+    user_quit = False
+    while not (stream_ended or user_quit):
+        ret, frame, current_video_time_sec = frame_prefetcher.read()
+        if ret and stop_event is not None and stop_event.is_set():
+            print("Stop requested. Exiting loop.")
+            frame_prefetcher.recycle(frame)
+            ret = False
+            user_quit = True
+        if ret:
+            frame_idx += 1
+            last_video_time_sec = current_video_time_sec
+
+            # Skip frames if frame_skip is set to process video faster
+            if frame_skip > 1 and frame_idx % frame_skip != 0:
+                if video_processor.writer and write_skipped_frames:
+                    # If skipping frames, just write the original frame to maintain video length
+                    pending_frames.append((frame_idx, frame, current_video_time_sec, False, False))
+                else:
+                    frame_prefetcher.recycle(frame)
+            else:
+                # Static frames skip YOLO but still go through OCR and tracking
+                gate_start = time.perf_counter()
+                needs_detection = motion_gate is None or motion_gate.needs_detection(frame)
+                if metrics is not None and motion_gate is not None:
+                    metrics.record("motion_gate", time.perf_counter() - gate_start)
+                pending_frames.append((frame_idx, frame, current_video_time_sec, True, needs_detection))
+                pending_to_process += 1
+
+            if pending_to_process < batch_size:
+                continue
+        elif not user_quit:
+            print("End of video stream or failed to read frame. Exiting loop.")
+            stream_ended = True
+
+        # 2. Detect Persons in all pending frames with one batched YOLO call
+        frames_to_detect = [f for _, f, _, _, needs_detection in pending_frames if needs_detection]
+        detection_start = time.perf_counter()
+        batch_boxes = iter(detector.detect_batch(frames_to_detect))
+        if metrics is not None and frames_to_detect:
+            # One sample per frame, so batch size does not skew the percentiles
+            detection_sec = (time.perf_counter() - detection_start) / len(frames_to_detect)
+            for _ in frames_to_detect:
+                metrics.record("detection", detection_sec)
+
+        for position, (frame_idx_in_batch, frame, current_video_time_sec, needs_processing, needs_detection) in enumerate(pending_frames):
+            if not needs_processing:
+                # The encoder hands the buffer back to the decoder once it is written
+                video_processor.write_frame(frame, release=frame_prefetcher.recycle)
+                continue
+            detections = detector.boxes_to_detections(next(batch_boxes)) if needs_detection else None
+
+            # 3. OCR, tracking, IN/OUT, activity and working-time logic for this frame
+            tracked_persons, ocr_time = pipeline.process_frame(frame, frame_idx_in_batch, current_video_time_sec, detections)
+
+            # 4. Visualize Results on the frame
+            output_frame = frame
+            if render_annotations:
+                # The raw frame is not needed after this, so annotate its buffer directly
+                annotation_start = time.perf_counter()
+                output_frame = video_processor.draw_annotations(frame, tracked_persons, ocr_time, in_place=True)
+                if metrics is not None:
+                    metrics.record("annotation", time.perf_counter() - annotation_start)
+
+            # Display the annotated frame
+            if not headless:
+                cv2.imshow("Office Tracking System - Press 'q' to quit", output_frame)
+
+            # Queue the frame for encoding; its buffer goes back to the decoder once it is written
+            video_processor.write_frame(output_frame, release=lambda _, raw_frame=frame: frame_prefetcher.recycle(raw_frame))
+            if metrics is not None:
+                metrics.frame_done()
+                if latency_clock is not None:
+                    metrics.record("latency", latency_clock() - current_video_time_sec)
+            if on_frame_processed is not None:
+                on_frame_processed(frame_idx_in_batch, current_video_time_sec)
+
+            # Check for 'q' key press to quit the application
+            if not headless and cv2.waitKey(1) & 0xFF == ord('q'):
+                print("User requested to quit. Exiting loop.")
+                # Hand back the buffers of frames that will not be processed
+                for _, unprocessed_frame, _, _, _ in pending_frames[position + 1:]:
+                    frame_prefetcher.recycle(unprocessed_frame)
+                user_quit = True
+                break
+
+        pending_frames = []
+        pending_to_process = 0
+        if on_batch_processed is not None and not user_quit:
+            on_batch_processed(frame_idx, last_video_time_sec)
+
+    return frame_idx, last_video_time_sec
+
+def build_arg_parser():
+    """
+    Builds the command-line interface. Every option overrides one value from `config.py`
+    for this run only; omitted options keep their configured defaults.
+    """
+    parser = argparse.ArgumentParser(
+        description="Track people in office CCTV footage and report IN/OUT and working times."
+    )
+    io_group = parser.add_argument_group("input/output")
+    io_group.add_argument("--video", dest="video_path", default=VIDEO_PATH,
+                          help="Input video file, or an RTSP/HTTP camera URL (processed live).")
+    io_group.add_argument("--live", action="store_true", default=LIVE_MODE,
+                          help="Process the video as a live feed: replayed at its native fps, frames the "
+                               "processing cannot keep up with are dropped, and per-frame latency is reported. "
+                               "Batching holds frames back; --batch-size 1 gives the lowest latency.")
+    io_group.add_argument("--output-video", dest="output_video_path", default=OUTPUT_VIDEO_PATH,
+                          help="Processed video output path.")
+    io_group.add_argument("--no-video", dest="output_video_path", action="store_const", const=None,
+                          help="Do not encode an output video.")
+    io_group.add_argument("--cameras", dest="cameras_path", default=None,
+                          help="JSON file listing several cameras to run concurrently (see supervisor.py). "
+                               "Overrides --video and the output paths.")
+    io_group.add_argument("--log-file", dest="log_file_path", default=LOG_FILE_PATH, help="Text event log path.")
+    io_group.add_argument("--csv", dest="csv_export_path", default=CSV_EXPORT_PATH, help="CSV report path.")
+    io_group.add_argument("--report-formats", nargs="+", choices=("csv", "parquet"), default=REPORT_FORMATS,
+                          help="Report outputs. Parquet files are written next to the CSV path (needs pyarrow).")
+    io_group.add_argument("--event-store", dest="event_store_path", default=EVENT_STORE_PATH,
+                          help="SQLite file that also stores every event for later queries (see utils/event_store.py).")
+    io_group.add_argument("--camera-id", default=CAMERA_ID, help="Camera name events are filed under in the event store.")
+    io_group.add_argument("--recording-date", default=None,
+                          help="Date of the footage (YYYY-MM-DD) for the event store and for times read before "
+                               "the overlay's date. Defaults to today.")
+    io_group.add_argument("--model", dest="model_path", default=YOLO_MODEL_PATH, help="YOLO weights path.")
+    io_group.add_argument("--backend", dest="detector_backend", choices=("torch", "onnx"), default=DETECTOR_BACKEND,
+                          help="Inference backend. 'onnx' exports the weights once and runs them with ONNX Runtime "
+                               "(needs onnxruntime and onnx).")
+    io_group.add_argument("--int8", dest="onnx_int8", action="store_true", default=ONNX_INT8,
+                          help="With --backend onnx, run an INT8 model calibrated on ONNX_CALIBRATION_VIDEO.")
+    io_group.add_argument("--video-backend", dest="video_writer_backend", choices=("opencv", "ffmpeg"),
+                          default=VIDEO_WRITER_BACKEND, help="Output video encoder (ffmpeg: libx264, smaller files).")
+    io_group.add_argument("--no-skipped-frames", dest="write_skipped_frames", action="store_false",
+                          default=WRITE_SKIPPED_FRAMES, help="With --frame-skip, write only processed frames (at a lower frame rate).")
+
+    io_group.add_argument("--metrics-json", dest="metrics_json_path", default=METRICS_JSON_PATH,
+                          help="Write per-stage timing percentiles and FPS to this JSON file periodically.")
+    io_group.add_argument("--metrics-prom", dest="metrics_prometheus_path", default=METRICS_PROMETHEUS_PATH,
+                          help="Write the same metrics in Prometheus text format (e.g. for node-exporter's textfile collector).")
+
+    processing_group = parser.add_argument_group("processing")
+    processing_group.add_argument("--frame-skip", type=int, default=FRAME_SKIP, help="Process every N-th frame.")
+    processing_group.add_argument("--batch-size", type=int, default=DETECTION_BATCH_SIZE,
+                                  help="Frames per batched YOLO inference call.")
+    processing_group.add_argument("--imgsz", type=int, default=DETECTION_IMGSZ,
+                                  help="Detection inference size in pixels (longest side, multiple of 32). "
+                                       "480 is faster on distant cameras; zones stay in frame pixels.")
+    processing_group.add_argument("--confidence", dest="confidence_threshold", type=float, default=CONFIDENCE_THRESHOLD,
+                                  help="YOLO detection confidence threshold.")
+    processing_group.add_argument("--nms", dest="nms_threshold", type=float, default=NMS_THRESHOLD,
+                                  help="YOLO NMS IoU threshold.")
+    processing_group.add_argument("--max-dist", dest="max_dist_person", type=float, default=MAX_DIST_PERSON,
+                                  help="Tracker association distance in pixels.")
+    processing_group.add_argument("--max-missing-frames", type=int, default=MAX_MISSING_FRAMES,
+                                  help="Frames a person may go undetected before the track is dropped.")
+    processing_group.add_argument("--sitting-ratio", dest="sitting_threshold", type=float, default=SITTING_THRESHOLD_HEIGHT_RATIO,
+                                  help="Height/width ratio below which a person counts as working.")
+    processing_group.add_argument("--motion-gate", dest="motion_gate", action="store_true", default=MOTION_GATE_ENABLED,
+                                  help="Skip detection on frames without significant motion since the last detected "
+                                       "frame; the tracker carries the last boxes forward.")
+    processing_group.add_argument("--no-motion-gate", dest="motion_gate", action="store_false",
+                                  help="Run detection on every processed frame.")
+    processing_group.add_argument("--detection-mode", choices=("full", "roi"), default=DETECTION_MODE,
+                                  help="'roi' runs YOLO only on tiles around motion and existing tracks "
+                                       "(single video and --workers; --cameras always uses full frames).")
+    processing_group.add_argument("--ocr-engine", choices=("tesseract", "glyph"), default=OCR_ENGINE,
+                                  help="OCR engine for the timestamp overlay. 'glyph' matches learned character "
+                                       "templates in-process and only runs Tesseract to learn and validate them.")
+
+    checkpoint_group = parser.add_argument_group("checkpoint")
+    checkpoint_group.add_argument("--checkpoint", dest="checkpoint_path", nargs="?", const=CHECKPOINT_DEFAULT_PATH,
+                                  default=CHECKPOINT_PATH,
+                                  help="Save the job state periodically, for --resume after a crash "
+                                       f"(default file: {CHECKPOINT_DEFAULT_PATH}). Deleted when the run finishes.")
+    checkpoint_group.add_argument("--no-checkpoint", dest="checkpoint_path", action="store_const", const=None,
+                                  help="Do not save checkpoints.")
+    checkpoint_group.add_argument("--checkpoint-interval", dest="checkpoint_interval_sec", type=float,
+                                  default=CHECKPOINT_INTERVAL_SEC, help="Seconds between checkpoints.")
+    checkpoint_group.add_argument("--resume", action="store_true",
+                                  help="Continue the job saved in the checkpoint instead of starting over "
+                                       "(single video file runs; implies --checkpoint).")
+
+    parallel_group = parser.add_argument_group("parallel")
+    parallel_group.add_argument("--workers", type=int, default=1,
+                                help="Worker processes. Above 1, the video is split into shards processed in parallel "
+                                     "(headless, no output video).")
+    parallel_group.add_argument("--shards", type=int, default=None,
+                                help="Number of shards for --workers (default: one per worker).")
+
+    display_group = parser.add_argument_group("display")
+    display_group.add_argument("--headless", action="store_true",
+                               help="Run without a display window or keyboard polling (for servers and batch jobs).")
+    display_group.add_argument("--no-annotate", dest="annotate", action="store_false",
+                               help="Skip drawing annotations; raw frames are written to the output video.")
+    return parser
+
+def main(argv=None):
+    """Command-line entry point: `python -m main [options]`."""
+    settings = vars(build_arg_parser().parse_args(argv))
+    num_workers = settings.pop("workers")
+    num_shards = settings.pop("shards")
+    cameras_path = settings.pop("cameras_path")
+    if settings["resume"] and (cameras_path or num_workers > 1):
+        print("CRITICAL ERROR: --resume only works for single-process runs (without --cameras or --workers).")
+        return
+    if settings["resume"] and (settings["live"] or is_stream_url(settings["video_path"])):
+        print("CRITICAL ERROR: --resume needs a video file; live feeds and stream URLs cannot be resumed.")
+        return
+    if settings["resume"] and not settings["checkpoint_path"]:
+        settings["checkpoint_path"] = CHECKPOINT_DEFAULT_PATH
+    if cameras_path:
+        if settings["detection_mode"] == "roi":
+            print("Warning: --detection-mode roi is not supported with --cameras; every camera runs full-frame detection.")
+        from supervisor import run_multi_camera
+        run_multi_camera(cameras_path, **{
+            key: settings[key] for key in (
+                "model_path", "frame_skip", "batch_size", "confidence_threshold", "nms_threshold",
+                "max_dist_person", "max_missing_frames", "sitting_threshold", "ocr_engine", "report_formats", "event_store_path",
+                "recording_date", "video_writer_backend", "write_skipped_frames", "motion_gate",
+                "metrics_json_path", "metrics_prometheus_path", "detector_backend", "onnx_int8", "imgsz", "annotate"
+            )
+        })
+    elif num_workers > 1 and (settings["live"] or is_stream_url(settings["video_path"])):
+        print("Warning: --workers needs a seekable video file; processing the live feed in one process.")
+        run_office_tracking(**settings)
+    elif num_workers > 1:
+        from sharding import run_sharded_tracking
+        run_sharded_tracking(settings, num_workers, num_shards)
+    else:
+        run_office_tracking(**settings)
 
 if __name__ == "__main__":
-    run_office_tracking()
+    main()
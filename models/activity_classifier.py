@@ -5,12 +5,15 @@ class ActivityClassifier:
     Classifies a person's activity as "standing" or "working" (which implies sitting in this context)
     based on the aspect ratio (height / width) of their bounding box.
     """
-    def __init__(self):
+    def __init__(self, sitting_threshold=SITTING_THRESHOLD_HEIGHT_RATIO):
         """
         Initializes the ActivityClassifier with the `SITTING_THRESHOLD_HEIGHT_RATIO`
-        defined in `config.py`.
+        defined in `config.py`, unless overridden.
+
+        Args:
+            sitting_threshold (float): Height/width ratio below which a person counts as sitting.
         """
-        self.sitting_threshold = SITTING_THRESHOLD_HEIGHT_RATIO
+        self.sitting_threshold = sitting_threshold
         print(f"Activity Classifier initialized. Sitting height/width aspect ratio threshold: {self.sitting_threshold}")
         print("Note: This classification is heuristic (rule-based) and may require tuning for different camera angles/body types.")
 
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+
+class _InferenceRequest:
+    """Frames submitted by one caller, and the slot its detections are returned in."""
+    def __init__(self, frames):
+        self.frames = frames
+        self.boxes = None
+        self.error = None
+        self.done = threading.Event()
+
+class SharedInferenceWorker:
+    """
+    Runs one `YOLODetector` on a background thread on behalf of many callers (e.g. one per
+    camera), so the model is loaded only once.
+
+    Callers use `detect_batch(frames)` exactly like `YOLODetector.detect_batch`. The worker
+    merges the frames of requests that arrive within `max_wait_ms` of each other into a single
+    inference call of up to `max_batch_size` frames, then hands every caller its own results.
+    """
+    def __init__(self, yolo_detector, max_batch_size=8, max_wait_ms=10.0):
+        """
+        Initializes the worker. Call `start()` to launch the inference thread.
+
+        Args:
+            yolo_detector (YOLODetector): The shared detector.
+            max_batch_size (int): Upper bound on frames per merged inference call. A single request
+                                  larger than this is still run as one call.
+            max_wait_ms (float): How long the first request of a batch waits for others to join.
+        """
+        self.yolo_detector = yolo_detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_sec = max_wait_ms / 1000.0
+
+        self._requests = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # --- Statistics ---
+        self.inference_calls = 0
+        self.frames_inferred = 0
+        self.total_inference_time_sec = 0.0
+
+        print(f"Shared Inference Worker initialized. Max batch size: {self.max_batch_size}, Max wait: {max_wait_ms:.1f} ms")
+
+    def start(self):
+        """Starts the background inference thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._inference_loop, name="SharedInferenceWorker", daemon=True)
+            self._thread.start()
+        return self
+
+    def detect_batch(self, frames):
+        """
+        Detects persons in `frames`, blocking until the shared worker has processed them.
+
+        Args:
+            frames (list): BGR frames (numpy.ndarray).
+
+        Returns:
+            list: One (N, 6) array per frame, as returned by `YOLODetector.detect_batch`.
+        """
+        if not frames:
+            return []
+        request = _InferenceRequest(frames)
+        self._requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.boxes
+
+    def boxes_to_detections(self, boxes):
+        """Same as `YOLODetector.boxes_to_detections`, so the worker can stand in for a detector."""
+        return self.yolo_detector.boxes_to_detections(boxes)
+
+    def _inference_loop(self):
+        """Inference thread body: gathers pending requests into batches and runs them."""
+        while not self._stop_event.is_set():
+            try:
+                first_request = self._requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Give other callers a short window to join this batch
+            batch = [first_request]
+            frames_in_batch = len(first_request.frames)
+            deadline = time.perf_counter() + self.max_wait_sec
+            while frames_in_batch < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                frames_in_batch += len(request.frames)
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        """Runs one inference call for all frames in `batch` and distributes the results."""
+        frames = [frame for request in batch for frame in request.frames]
+        inference_start = time.perf_counter()
+        try:
+            boxes = self.yolo_detector.detect_batch(frames)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        self.total_inference_time_sec += time.perf_counter() - inference_start
+        self.inference_calls += 1
+        self.frames_inferred += len(frames)
+
+        offset = 0
+        for request in batch:
+            request.boxes = boxes[offset:offset + len(request.frames)]
+            offset += len(request.frames)
+            request.done.set()
+
+    def get_stats(self):
+        """
+        Returns inference statistics.
+
+        Returns:
+            dict: Inference calls, frames inferred, average frames per call, average inference
+                  time per call (ms) and requests currently waiting.
+        """
+        return {
+            "inference_calls": self.inference_calls,
+            "frames_inferred": self.frames_inferred,
+            "avg_batch_size": (self.frames_inferred / self.inference_calls) if self.inference_calls else 0.0,
+            "avg_inference_ms": (self.total_inference_time_sec / self.inference_calls * 1000.0) if self.inference_calls else 0.0,
+            "pending_requests": self._requests.qsize(),
+        }
+
+    def stop(self):
+        """Stops the inference thread; requests still waiting are failed so no caller hangs."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            request.error = RuntimeError("Shared inference worker stopped.")
+            request.done.set()
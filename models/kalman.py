@@ -0,0 +1,103 @@
+import numpy as np
+from config import KALMAN_MEASUREMENT_STD, KALMAN_VELOCITY_STD, KALMAN_ACCELERATION_STD, KALMAN_GATE_SIGMAS
+
+class ConstantVelocityKalman:
+    """
+    Constant-velocity Kalman filter over track centroids, run on all tracks of a `TrackStore`
+    at once.
+
+    The state of a track is its centroid and velocity in pixels per second, so the filter
+    works in video time and is unaffected by `FRAME_SKIP`, the motion gate or missed
+    detections: a track is always predicted over exactly the time since it was last
+    corrected. Motion and noise are the same along both image axes, so a track's x and y
+    share one 2x2 (position, velocity) covariance.
+    """
+    def __init__(self, measurement_std=KALMAN_MEASUREMENT_STD, velocity_std=KALMAN_VELOCITY_STD,
+                 acceleration_std=KALMAN_ACCELERATION_STD, gate_sigmas=KALMAN_GATE_SIGMAS):
+        """
+        Args:
+            measurement_std (float): Detector jitter of a box centroid, in px.
+            velocity_std (float): Spread of the unknown velocity of a new track, in px/s.
+            acceleration_std (float): How fast a track's velocity may drift, in px/s per sqrt(s)
+                                      (white-noise acceleration).
+            gate_sigmas (float): Gate radius in standard deviations of the predicted position.
+        """
+        self.measurement_var = float(measurement_std) ** 2
+        self.velocity_var = float(velocity_std) ** 2
+        self.acceleration_var = float(acceleration_std) ** 2
+        self.gate_sigmas = gate_sigmas
+
+    def initiate(self, store, slots, frame_time_sec):
+        """
+        Starts the filter of new tracks at their current centroid, at rest.
+
+        Args:
+            store (TrackStore): The tracker's store.
+            slots (numpy.ndarray): Slots of the new tracks.
+            frame_time_sec (float): Video time of the detections.
+        """
+        store.kf_state[slots, :2] = store.centroid[slots]
+        store.kf_state[slots, 2:] = 0.0
+        store.kf_cov[slots] = [[self.measurement_var, 0.0], [0.0, self.velocity_var]]
+        store.kf_time[slots] = frame_time_sec
+
+    def _predict(self, store, slots, frame_time_sec):
+        """Returns the (N, 4) states and (N, 2, 2) covariances of `slots` predicted to `frame_time_sec`."""
+        dt = np.maximum(frame_time_sec - store.kf_time[slots], 0.0)
+        state = store.kf_state[slots]
+        state[:, :2] += state[:, 2:] * dt[:, None]
+
+        cov = store.kf_cov[slots]
+        p_pos, p_cross, p_vel = cov[:, 0, 0], cov[:, 0, 1], cov[:, 1, 1]
+        q = self.acceleration_var
+        predicted = np.empty_like(cov)
+        predicted[:, 0, 0] = p_pos + 2 * dt * p_cross + dt * dt * p_vel + q * dt ** 3 / 3
+        predicted[:, 0, 1] = predicted[:, 1, 0] = p_cross + dt * p_vel + q * dt ** 2 / 2
+        predicted[:, 1, 1] = p_vel + q * dt
+        return state, predicted
+
+    def predict(self, store, slots, frame_time_sec, max_dist):
+        """
+        Predicts where tracks are at `frame_time_sec`, without changing their filters.
+
+        Args:
+            store (TrackStore): The tracker's store.
+            slots (numpy.ndarray): Slots to predict.
+            frame_time_sec (float): Video time of the frame being associated.
+            max_dist (float): Smallest gate radius in px.
+
+        Returns:
+            tuple: ((N, 2) predicted centroids, (N,) gate radii). A radius is `gate_sigmas`
+                   standard deviations of the predicted measurement, so it widens with the time
+                   since the track was last seen and with how uncertain its velocity still is,
+                   but never drops below `max_dist`.
+        """
+        state, cov = self._predict(store, slots, frame_time_sec)
+        gates = np.maximum(max_dist, self.gate_sigmas * np.sqrt(cov[:, 0, 0] + self.measurement_var))
+        return state[:, :2], gates
+
+    def update(self, store, slots, frame_time_sec):
+        """
+        Predicts tracks to `frame_time_sec` and corrects them with their current centroids.
+
+        Args:
+            store (TrackStore): The tracker's store; `centroid` holds the new measurements.
+            slots (numpy.ndarray): Slots of the tracks observed at `frame_time_sec`.
+            frame_time_sec (float): Video time of the observation.
+        """
+        state, cov = self._predict(store, slots, frame_time_sec)
+        innovation = store.centroid[slots] - state[:, :2]
+        innovation_var = cov[:, 0, 0] + self.measurement_var
+        gain_pos = cov[:, 0, 0] / innovation_var
+        gain_vel = cov[:, 0, 1] / innovation_var
+
+        state[:, :2] += gain_pos[:, None] * innovation
+        state[:, 2:] += gain_vel[:, None] * innovation
+        corrected = np.empty_like(cov)
+        corrected[:, 0, 0] = (1.0 - gain_pos) * cov[:, 0, 0]
+        corrected[:, 0, 1] = corrected[:, 1, 0] = (1.0 - gain_pos) * cov[:, 0, 1]
+        corrected[:, 1, 1] = cov[:, 1, 1] - gain_vel * cov[:, 0, 1]
+
+        store.kf_state[slots] = state
+        store.kf_cov[slots] = corrected
+        store.kf_time[slots] = frame_time_sec
@@ -0,0 +1,112 @@
+import math
+import cv2
+import numpy as np
+
+def round_to_stride(imgsz, stride=32):
+    """Rounds an inference size up to the next multiple of the model stride."""
+    return int(math.ceil(imgsz / stride) * stride)
+
+class Letterboxer:
+    """
+    Resizes frames to the detector input size keeping their aspect ratio, and maps the detected
+    boxes back to exact source-frame coordinates.
+
+    Frames are drawn into a reusable batch buffer, so nothing is allocated per call once the
+    buffer has its size, and the grey border is only repainted when a slot's layout changes.
+    The per-axis scale of every frame is taken from the integer size it was actually resized
+    to, so boxes map back exactly and frame-space settings (zones, `MAX_DIST_PERSON`) keep
+    working at any inference size.
+    """
+    def __init__(self, imgsz, stride=32, rect=True, pad_value=114):
+        """
+        Args:
+            imgsz (int): Longest side of the model input; rounded up to a multiple of `stride`.
+            stride (int): Model stride; input sides must be multiples of it.
+            rect (bool): Pad only up to the next stride multiple (a 1080x1224 frame at 640 becomes
+                         576x640) instead of to a full `imgsz` square. Static-shape models (ONNX)
+                         need `rect=False`.
+            pad_value (int): Border grey level.
+        """
+        self.stride = stride
+        self.imgsz = round_to_stride(imgsz, stride)
+        self.rect = rect
+        self.pad_value = pad_value
+        self._layouts = {} # frame shape -> (new_width, new_height, left, top, canvas_width, canvas_height)
+        self._buffer = None # (slots, height, width, 3) uint8 batch buffer
+        self._slot_layouts = [] # Layout last drawn into each slot (None = border needs repainting)
+
+    def _layout(self, frame_shape):
+        """Computes (and caches) where a frame of `frame_shape` lands in the input canvas."""
+        layout = self._layouts.get(frame_shape[:2])
+        if layout is None:
+            height, width = frame_shape[:2]
+            gain = min(self.imgsz / height, self.imgsz / width)
+            new_width, new_height = max(1, int(round(width * gain))), max(1, int(round(height * gain)))
+            if self.rect:
+                canvas_width = int(math.ceil(new_width / self.stride) * self.stride)
+                canvas_height = int(math.ceil(new_height / self.stride) * self.stride)
+            else:
+                canvas_width = canvas_height = self.imgsz
+            left, top = (canvas_width - new_width) // 2, (canvas_height - new_height) // 2
+            layout = self._layouts[frame_shape[:2]] = (new_width, new_height, left, top, canvas_width, canvas_height)
+        return layout
+
+    def prepare(self, frames):
+        """
+        Letterboxes `frames` into the reusable buffer. Frames of different sizes share the
+        largest canvas of the batch, each centred in its own padding.
+
+        Returns:
+            tuple: (canvases, transforms). `canvases` are BGR uint8 views into the buffer, valid
+                   until the next call; `transforms` hold one entry per frame for `scale_boxes`.
+        """
+        layouts = [self._layout(frame.shape) for frame in frames]
+        canvas_width = max(layout[4] for layout in layouts)
+        canvas_height = max(layout[5] for layout in layouts)
+        if (self._buffer is None or len(self._buffer) < len(frames)
+                or self._buffer.shape[1:3] != (canvas_height, canvas_width)):
+            self._buffer = np.empty((len(frames), canvas_height, canvas_width, 3), dtype=np.uint8)
+            self._slot_layouts = [None] * len(frames)
+
+        transforms = []
+        for slot, (frame, layout) in enumerate(zip(frames, layouts)):
+            new_width, new_height, left, top, width, height = layout
+            # Centre within the batch canvas when it is larger than this frame's own canvas
+            left += (canvas_width - width) // 2
+            top += (canvas_height - height) // 2
+            canvas = self._buffer[slot]
+            if self._slot_layouts[slot] != (new_width, new_height, left, top):
+                canvas.fill(self.pad_value)
+                self._slot_layouts[slot] = (new_width, new_height, left, top)
+            frame_height, frame_width = frame.shape[:2]
+            if (new_width, new_height) == (frame_width, frame_height):
+                canvas[top:top + new_height, left:left + new_width] = frame
+            else:
+                canvas[top:top + new_height, left:left + new_width] = cv2.resize(
+                    frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+                )
+            transforms.append((frame_width / new_width, frame_height / new_height, left, top, frame_width, frame_height))
+        return [self._buffer[slot] for slot in range(len(frames))], transforms
+
+    @staticmethod
+    def to_tensor(canvases):
+        """Converts canvases from `prepare` to a (N, 3, H, W) float32 RGB tensor in [0, 1]."""
+        return cv2.dnn.blobFromImages(canvases, scalefactor=1.0 / 255.0, swapRB=True)
+
+    @staticmethod
+    def scale_boxes(boxes, transform):
+        """
+        Maps [x1, y1, x2, y2, ...] rows from canvas to source-frame coordinates, in place,
+        clipped to the frame.
+
+        Args:
+            boxes (numpy.ndarray): (N, >=4) float box matrix in canvas pixels.
+            transform (tuple): The frame's entry from `prepare`.
+
+        Returns:
+            numpy.ndarray: `boxes`.
+        """
+        scale_x, scale_y, left, top, frame_width, frame_height = transform
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - left) * scale_x, 0, frame_width)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - top) * scale_y, 0, frame_height)
+        return boxes
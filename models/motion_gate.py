@@ -0,0 +1,150 @@
+import time
+import cv2
+import numpy as np
+from config import (
+    OCR_ROI, MOTION_GATE_WIDTH, MOTION_GATE_PIXEL_THRESHOLD, MOTION_GATE_AREA_THRESHOLD,
+    MOTION_GATE_REFRESH_INTERVAL
+)
+
+class MotionGate:
+    """
+    Decides per frame whether person detection needs to run, by differencing a small
+    greyscale copy of the frame against the frame detection last ran on.
+
+    Office footage is static most of the time, so when the changed area stays below a
+    threshold the previous detections are still valid and YOLO can be skipped; the tracker
+    carries the last known boxes forward instead. Detection still runs at least every
+    `refresh_interval` frames so slow drift and missed motion are corrected. Regions such as
+    the burned-in CCTV clock are masked out, since they change every second.
+    """
+    def __init__(self, frame_size, ignore_regions=(OCR_ROI,), width=MOTION_GATE_WIDTH,
+                 pixel_threshold=MOTION_GATE_PIXEL_THRESHOLD, area_threshold=MOTION_GATE_AREA_THRESHOLD,
+                 refresh_interval=MOTION_GATE_REFRESH_INTERVAL):
+        """
+        Initializes the gate for frames of one stream.
+
+        Args:
+            frame_size (tuple): (width, height) of the full-resolution frames.
+            ignore_regions (tuple): (x1, y1, x2, y2) boxes in frame coordinates excluded from the difference.
+            width (int): Width the frames are downscaled to; the height keeps the aspect ratio.
+            pixel_threshold (int): Grey-level difference at which a downscaled pixel counts as changed.
+            area_threshold (float): Changed-pixel fraction at or above which detection runs.
+            refresh_interval (int): Maximum frames between two detections, regardless of motion.
+        """
+        frame_width, frame_height = frame_size
+        self.frame_width, self.frame_height = frame_width, frame_height
+        self.width = max(1, min(width, frame_width))
+        self.height = max(1, int(round(frame_height * self.width / frame_width)))
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.refresh_interval = max(1, refresh_interval)
+
+        # Mask of the pixels that take part in the difference, in downscaled coordinates
+        self._mask = np.full((self.height, self.width), 255, dtype=np.uint8)
+        scale_x, scale_y = self.width / frame_width, self.height / frame_height
+        for x1, y1, x2, y2 in ignore_regions:
+            # Regions outside the frame (e.g. an ROI set for another resolution) are clipped away
+            x1, x2 = max(0, int(x1 * scale_x)), min(self.width, int(np.ceil(x2 * scale_x)))
+            y1, y2 = max(0, int(y1 * scale_y)), min(self.height, int(np.ceil(y2 * scale_y)))
+            if x2 > x1 and y2 > y1:
+                self._mask[y1:y2, x1:x2] = 0
+        self._active_pixels = max(1, cv2.countNonZero(self._mask))
+
+        # Reused buffers: the current small frame and the one detection last ran on
+        self._small = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._grey = np.empty((self.height, self.width), dtype=np.uint8)
+        self._reference = np.empty_like(self._grey)
+        self._diff = np.empty_like(self._grey)
+        self._has_reference = False
+        self._has_diff = False # Whether `_diff` holds the changed-pixel mask of the last frame
+        self._frames_since_detection = 0
+
+        # --- Statistics ---
+        self.frames_seen = 0
+        self.frames_gated = 0
+        self.refreshes = 0 # Detections forced by `refresh_interval` rather than motion
+        self.total_gate_time_sec = 0.0
+        self.last_motion = 0.0 # Changed-pixel fraction of the last frame compared
+
+        print(f"Motion Gate initialized. {self.width}x{self.height} differencing, area threshold: "
+              f"{area_threshold:.2%}, refresh every {self.refresh_interval} frames")
+
+    def needs_detection(self, frame):
+        """
+        Decides whether detection must run on `frame`. Call once per processed frame, in order.
+
+        Args:
+            frame (numpy.ndarray): The full-resolution BGR frame (only read).
+
+        Returns:
+            bool: True to run detection, False if the last detections still hold.
+        """
+        gate_start = time.perf_counter()
+        self.frames_seen += 1
+        cv2.resize(frame, (self.width, self.height), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._grey)
+        # Blurring suppresses compression noise that would otherwise read as motion
+        cv2.GaussianBlur(self._grey, (5, 5), 0, dst=self._grey)
+
+        self._has_diff = self._has_reference
+        if not self._has_reference:
+            detect = True
+        else:
+            cv2.absdiff(self._grey, self._reference, dst=self._diff)
+            cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+            cv2.bitwise_and(self._diff, self._mask, dst=self._diff)
+            self.last_motion = cv2.countNonZero(self._diff) / self._active_pixels
+            detect = self.last_motion >= self.area_threshold
+            if not detect and self._frames_since_detection + 1 >= self.refresh_interval:
+                detect = True
+                self.refreshes += 1
+
+        if detect:
+            # This frame becomes the new reference; swap buffers instead of copying
+            self._grey, self._reference = self._reference, self._grey
+            self._has_reference = True
+            self._frames_since_detection = 0
+        else:
+            self._frames_since_detection += 1
+            self.frames_gated += 1
+        self.total_gate_time_sec += time.perf_counter() - gate_start
+        return detect
+
+    def changed_regions(self, min_area=4):
+        """
+        Returns the bounding boxes of the areas that changed in the last frame passed to
+        `needs_detection`, relative to the reference it was compared with.
+
+        Args:
+            min_area (int): Smallest changed blob kept, in downscaled pixels.
+
+        Returns:
+            list: [x1, y1, x2, y2] boxes in full-frame coordinates, or None if the last frame had
+                  no reference to compare with (the whole frame must then be treated as changed).
+        """
+        if not self._has_diff:
+            return None
+        _, _, stats, _ = cv2.connectedComponentsWithStats(self._diff, connectivity=8)
+        scale_x, scale_y = self.frame_width / self.width, self.frame_height / self.height
+        regions = []
+        for x, y, w, h, area in stats[1:]: # Label 0 is the unchanged background
+            if area >= min_area:
+                regions.append([int(x * scale_x), int(y * scale_y),
+                                int(np.ceil((x + w) * scale_x)), int(np.ceil((y + h) * scale_y))])
+        return regions
+
+    def get_stats(self):
+        """
+        Returns gating statistics.
+
+        Returns:
+            dict: Frames seen and gated, the gated fraction, forced refreshes and the
+                  average gate cost per frame (ms).
+        """
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_gated": self.frames_gated,
+            "gated_fraction": (self.frames_gated / self.frames_seen) if self.frames_seen else 0.0,
+            "refreshes": self.refreshes,
+            "avg_gate_ms": (self.total_gate_time_sec / self.frames_seen * 1000.0) if self.frames_seen else 0.0,
+        }
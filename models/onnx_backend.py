@@ -0,0 +1,261 @@
+import hashlib
+import os
+import time
+import cv2
+import numpy as np
+from config import (
+    YOLO_MODEL_PATH, CONFIDENCE_THRESHOLD, NMS_THRESHOLD, ONNX_CACHE_DIR, DETECTION_IMGSZ, ONNX_INT8,
+    ONNX_CALIBRATION_VIDEO, ONNX_CALIBRATION_FRAMES, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS
+)
+from models.yolo_detector import YOLODetector
+from models.letterbox import Letterboxer, round_to_stride
+from models.roi_detector import _nms
+
+_MAX_WH = 7680 # Per-class box offset for class-aware NMS, as in ultralytics
+
+def weights_hash(model_path, chunk_size=1 << 20):
+    """Returns the first 16 hex digits of the SHA-256 of the weights file."""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def sample_frames(video_path, count):
+    """Reads `count` frames spread evenly over the video (for INT8 calibration)."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open calibration video: {video_path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for position in np.linspace(0, max(0, frame_count - 1), num=max(1, count), dtype=np.int64):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(position))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    if not frames:
+        raise IOError(f"No frames could be read from calibration video: {video_path}")
+    return frames
+
+def export_onnx(model_path, imgsz, cache_dir=ONNX_CACHE_DIR):
+    """
+    Exports the ultralytics weights to a static-shape ONNX model, once. The artifact is cached
+    as `<name>-<weights hash>-<imgsz>.onnx`, so changed weights or another size export again.
+
+    Returns:
+        str: Path of the cached ONNX model.
+    """
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    onnx_path = os.path.join(cache_dir, f"{name}-{weights_hash(model_path)}-{imgsz}.onnx")
+    if os.path.exists(onnx_path):
+        return onnx_path
+    os.makedirs(cache_dir, exist_ok=True)
+    print(f"Exporting '{model_path}' to ONNX at {imgsz}x{imgsz} (one-off)...")
+    start = time.perf_counter()
+    from ultralytics import YOLO # Deferred: only needed to export
+    exported_path = YOLO(model_path).export(format='onnx', imgsz=imgsz, batch=1, dynamic=False, half=False)
+    os.replace(exported_path, onnx_path)
+    print(f"ONNX model cached at '{onnx_path}' ({time.perf_counter() - start:.1f}s)")
+    return onnx_path
+
+def quantize_int8(onnx_path, imgsz, calibration_video=ONNX_CALIBRATION_VIDEO, calibration_frames=ONNX_CALIBRATION_FRAMES):
+    """
+    Builds an INT8 statically quantized copy of `onnx_path`, calibrated on frames of our own
+    footage. Only convolutions and matrix multiplications are quantized (QDQ format, per-channel
+    weights); the box decoding after them stays in float, so coordinates keep their precision.
+    Cached next to the float model, keyed by the calibration video and frame count.
+
+    Returns:
+        str: Path of the cached INT8 model.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    calibration_key = hashlib.sha256(f"{os.path.abspath(calibration_video)}:{calibration_frames}".encode()).hexdigest()[:8]
+    int8_path = f"{os.path.splitext(onnx_path)[0]}-int8-{calibration_key}.onnx"
+    if os.path.exists(int8_path):
+        return int8_path
+
+    letterboxer = Letterboxer(imgsz, rect=False)
+    tensors = [letterboxer.to_tensor(letterboxer.prepare([frame])[0])
+               for frame in sample_frames(calibration_video, calibration_frames)]
+
+    class _FrameReader(CalibrationDataReader):
+        """Feeds the letterboxed calibration frames to the quantizer."""
+        def __init__(self, input_name):
+            self._inputs = iter([{input_name: tensor} for tensor in tensors])
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    import onnx
+    input_name = onnx.load(onnx_path, load_external_data=False).graph.input[0].name
+    print(f"Quantizing '{onnx_path}' to INT8 with {len(tensors)} calibration frames from '{calibration_video}'...")
+    start = time.perf_counter()
+    temp_path = f"{int8_path}.tmp"
+    prepared_path = f"{int8_path}.prep.onnx"
+    # Shape inference and graph cleanup ahead of quantization (shapes are static, no symbolic pass needed)
+    quant_pre_process(onnx_path, prepared_path, skip_symbolic_shape=True)
+    quantize_static(
+        prepared_path, temp_path, _FrameReader(input_name),
+        quant_format=QuantFormat.QDQ, per_channel=True,
+        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+        op_types_to_quantize=['Conv', 'MatMul'], calibrate_method=CalibrationMethod.MinMax,
+    )
+    os.replace(temp_path, int8_path)
+    os.remove(prepared_path)
+    print(f"INT8 model cached at '{int8_path}' ({time.perf_counter() - start:.1f}s)")
+    return int8_path
+
+def prepare_model(model_path, imgsz=DETECTION_IMGSZ, int8=ONNX_INT8, cache_dir=ONNX_CACHE_DIR,
+                  calibration_video=ONNX_CALIBRATION_VIDEO, calibration_frames=ONNX_CALIBRATION_FRAMES):
+    """
+    Returns the path of the ONNX model to run, exporting (and quantizing) it first if it is not
+    cached yet. Call once before starting worker processes, so they do not export concurrently.
+    """
+    imgsz = round_to_stride(imgsz)
+    onnx_path = export_onnx(model_path, imgsz, cache_dir)
+    if int8:
+        return quantize_int8(onnx_path, imgsz, calibration_video, calibration_frames)
+    return onnx_path
+
+class ONNXDetector(YOLODetector):
+    """
+    Drop-in replacement for `YOLODetector` that runs the same weights through ONNX Runtime on
+    the CPU. The model is exported (and optionally INT8-quantized) once and cached. Results have
+    the same format as `YOLODetector.detect_batch` / `detect`.
+    """
+    def __init__(self, model_path=YOLO_MODEL_PATH, confidence_threshold=CONFIDENCE_THRESHOLD, nms_threshold=NMS_THRESHOLD,
+                 lazy=False, imgsz=DETECTION_IMGSZ, int8=ONNX_INT8, cache_dir=ONNX_CACHE_DIR,
+                 calibration_video=ONNX_CALIBRATION_VIDEO, calibration_frames=ONNX_CALIBRATION_FRAMES,
+                 intra_op_threads=ONNX_INTRA_OP_THREADS, inter_op_threads=ONNX_INTER_OP_THREADS):
+        """
+        Args:
+            model_path (str): Path to the ultralytics weights the ONNX model is exported from.
+            confidence_threshold (float): Minimum detection confidence.
+            nms_threshold (float): IoU threshold used by non-maximum suppression.
+            lazy (bool): Defer export and session creation to `load`, `warmup` or the first detection.
+            imgsz (int): Square input size of the exported model (rounded up to a multiple of 32).
+                         Calls with another `imgsz` (e.g. ROI tiles) use a model exported at that size.
+            int8 (bool): Run the INT8 statically quantized model.
+            cache_dir (str): Directory of the exported models.
+            calibration_video (str): Footage the INT8 model is calibrated on.
+            calibration_frames (int): Frames sampled from it for calibration.
+            intra_op_threads (int): Threads used within one operator; 0 lets ONNX Runtime pick
+                                    one per physical core.
+            inter_op_threads (int): Threads running independent operators in parallel.
+        """
+        self.int8 = int8
+        self.cache_dir = cache_dir
+        self.calibration_video = calibration_video
+        self.calibration_frames = calibration_frames
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._sessions = {} # requested imgsz -> (session, input name, letterboxer of the model input size)
+        super().__init__(model_path, confidence_threshold, nms_threshold, lazy, imgsz)
+
+    def _create_session(self, imgsz):
+        """Exports the model for `imgsz` if needed and opens an ONNX Runtime session on it."""
+        import onnxruntime as ort # Deferred: optional dependency
+
+        onnx_path = prepare_model(self.model_path, imgsz, self.int8, self.cache_dir,
+                                  self.calibration_video, self.calibration_frames)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        # Idle threads sleep instead of spinning between frames, leaving the cores to the
+        # decode, OCR and encode threads (and to other workers)
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        # Static input shape: frames are always padded to the full square
+        self._sessions[imgsz] = (session, session.get_inputs()[0].name, Letterboxer(imgsz, rect=False))
+        return onnx_path
+
+    def load(self):
+        """
+        Exports/quantizes the model if it is not cached and opens the inference session.
+
+        Raises:
+            RuntimeError: If onnxruntime is missing or the model cannot be exported or loaded.
+        """
+        if self.model is not None:
+            return
+        start = time.perf_counter()
+        try:
+            onnx_path = self._create_session(self.imgsz)
+        except ImportError as e:
+            raise RuntimeError(f"Error: The ONNX backend requires onnxruntime (pip install onnxruntime onnx). Details: {e}")
+        except Exception as e:
+            raise RuntimeError(f"Error: Failed to prepare the ONNX model for '{self.model_path}'. Details: {e}")
+        self.model, _, letterboxer = self._sessions[self.imgsz]
+        self.load_time_sec = time.perf_counter() - start
+        print(f"ONNX Runtime model loaded from: '{onnx_path}' in {self.load_time_sec:.2f}s "
+              f"({'INT8' if self.int8 else 'FP32'}, {letterboxer.imgsz}x{letterboxer.imgsz}, "
+              f"threads intra={self.intra_op_threads or 'auto'} inter={self.inter_op_threads})")
+        print(f"Detection Confidence Threshold: {self.confidence_threshold}")
+        print(f"NMS (IOU) Threshold: {self.nms_threshold}")
+
+    def _postprocess(self, output, letterboxer, transform):
+        """
+        Turns the raw (4 + classes, anchors) model output of one frame into a (N, 6) box matrix
+        in frame coordinates: confidence and class filtering, class-aware NMS, rescaling.
+        """
+        predictions = output.T # (anchors, 4 + classes)
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = (confidences >= self.confidence_threshold) & np.isin(class_ids, self.target_classes)
+        if not keep.any():
+            return np.empty((0, 6), dtype=np.float32)
+
+        cx, cy, w, h = predictions[keep, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2,
+                          confidences[keep], class_ids[keep]], axis=1).astype(np.float32)
+        # Offsetting each class far apart makes one NMS pass class-aware; the last column
+        # carries each row's index through the NMS
+        offset_boxes = np.concatenate([boxes[:, :4] + boxes[:, 5:6] * _MAX_WH, boxes[:, 4:5],
+                                       np.arange(len(boxes), dtype=np.float32)[:, None]], axis=1)
+        boxes = boxes[_nms(offset_boxes, self.nms_threshold)[:, 5].astype(np.intp)]
+
+        return letterboxer.scale_boxes(boxes, transform)
+
+    def detect_batch(self, frames, imgsz=None):
+        """
+        Runs the ONNX model on each frame.
+
+        Args:
+            frames (list): A list of input video frames (H, W, 3 BGR images).
+            imgsz (int, optional): Inference size for this call. Defaults to `self.imgsz`.
+
+        Returns:
+            list: One (N, 6) float32 array [x1, y1, x2, y2, confidence, class_id] per frame,
+                  as from `YOLODetector.detect_batch`.
+        """
+        if len(frames) == 0:
+            return []
+        if self.model is None:
+            self.load()
+        imgsz = imgsz or self.imgsz
+        if imgsz not in self._sessions:
+            try:
+                self._create_session(imgsz)
+            except Exception as e:
+                print(f"Warning: No ONNX model at {imgsz}x{imgsz} ({e}); using the {self.imgsz}x{self.imgsz} model instead.")
+                self._sessions[imgsz] = self._sessions[self.imgsz]
+        batch_boxes = []
+        try:
+            session, input_name, letterboxer = self._sessions[imgsz]
+            for frame in frames:
+                # The exported model takes batch 1, so frames go through one at a time
+                canvases, transforms = letterboxer.prepare([frame])
+                output = session.run(None, {input_name: letterboxer.to_tensor(canvases)})[0][0]
+                batch_boxes.append(self._postprocess(output, letterboxer, transforms[0]))
+        except Exception as e:
+            print(f"Warning: Error during ONNX detection on {len(frames)} frames: {e}")
+            return [np.empty((0, 6), dtype=np.float32) for _ in frames]
+        return batch_boxes
@@ -0,0 +1,206 @@
+import numpy as np
+from config import ROI_TILE_SIZE, ROI_MARGIN_PX, ROI_MAX_TILES, ROI_FULL_FRAME_INTERVAL, OCR_ROI
+from models.motion_gate import MotionGate
+from models.tracker import _pairwise_iou
+
+def _merge_regions(regions):
+    """
+    Merges overlapping [x1, y1, x2, y2] regions into their union boxes until none overlap,
+    so a person spanning several motion blobs ends up in a single tile.
+    """
+    merged = [list(region) for region in regions]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(len(merged) - 1, i, -1):
+                a, b = merged[i], merged[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    merged[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del merged[j]
+                    changed = True
+    return merged
+
+def _nms(boxes, iou_threshold):
+    """
+    Greedy non-maximum suppression over a (N, 6) box matrix, highest confidence first.
+    Removes the duplicates produced where tiles overlap.
+    """
+    if len(boxes) < 2:
+        return boxes
+    order = np.argsort(-boxes[:, 4], kind='stable')
+    boxes = boxes[order]
+    iou = _pairwise_iou(boxes[:, :4].astype(np.float64), boxes[:, :4].astype(np.float64))
+    keep = np.ones(len(boxes), dtype=bool)
+    for i in range(len(boxes)):
+        if keep[i]:
+            keep[i + 1:] &= iou[i, i + 1:] < iou_threshold
+    return boxes[keep]
+
+class ROIDetector:
+    """
+    Runs a `YOLODetector` only on square tiles around moving areas and existing tracks instead
+    of the whole frame. All tiles of a batch go through the model in one call at `tile_size`,
+    their boxes are shifted back to frame coordinates and merged across tiles with NMS.
+
+    A frame with nothing moving and nobody tracked costs no inference at all. When the regions
+    need more than `max_tiles` tiles, when there is no previous frame to compare with, and every
+    `full_frame_interval` detected frames, the full frame is used instead.
+
+    Exposes `detect_batch` and `boxes_to_detections`, so it can stand in for the detector in
+    `process_stream`.
+    """
+    def __init__(self, yolo_detector, person_tracker, frame_size, ignore_regions=(OCR_ROI,),
+                 tile_size=ROI_TILE_SIZE, margin=ROI_MARGIN_PX, max_tiles=ROI_MAX_TILES,
+                 full_frame_interval=ROI_FULL_FRAME_INTERVAL):
+        """
+        Args:
+            yolo_detector (YOLODetector): The detector running the model.
+            person_tracker (PersonTracker): Tracker whose current boxes are always covered by a tile.
+            frame_size (tuple): (width, height) of the frames.
+            ignore_regions (tuple): Boxes excluded from motion detection (e.g. the CCTV clock).
+            tile_size (int): Tile side and inference size in pixels.
+            margin (int): Padding (px) around every motion region and track box.
+            max_tiles (int): Most tiles per frame before falling back to a full-frame pass.
+            full_frame_interval (int): Run a full-frame pass every N detected frames.
+        """
+        self.yolo_detector = yolo_detector
+        self.person_tracker = person_tracker
+        self.frame_width, self.frame_height = frame_size
+        self.tile_size = tile_size
+        self.margin = margin
+        self.max_tiles = max_tiles
+        self.full_frame_interval = max(1, full_frame_interval)
+        # Compares every frame with the previously detected one; it never gates
+        self._motion = MotionGate(frame_size, ignore_regions, area_threshold=0.0, refresh_interval=1)
+        self._frames_since_full = 0
+
+        # --- Statistics ---
+        self.frames_detected = 0
+        self.full_frame_passes = 0
+        self.tiles_run = 0
+        self.empty_frames = 0 # Frames with no region at all, skipped without inference
+
+        print(f"ROI Detector initialized. Tile size: {tile_size}px, margin: {margin}px, "
+              f"max tiles: {max_tiles}, full frame every {self.full_frame_interval} frames")
+
+    def _tiles_for_regions(self, regions):
+        """Turns regions into square tiles of at least `tile_size`, shifted to lie inside the frame."""
+        tiles = []
+        for x1, y1, x2, y2 in _merge_regions(regions):
+            side = int(min(max(self.tile_size, x2 - x1, y2 - y1), self.frame_width, self.frame_height))
+            cx, cy = int(x1 + x2) // 2, int(y1 + y2) // 2
+            tx1 = int(min(max(0, cx - side // 2), self.frame_width - side))
+            ty1 = int(min(max(0, cy - side // 2), self.frame_height - side))
+            tiles.append((tx1, ty1, tx1 + side, ty1 + side))
+        return tiles
+
+    def _boxes_to_frame(self, boxes, tile):
+        """
+        Shifts tile boxes to frame coordinates and drops boxes cut off by an inner tile edge.
+        Every region lies inside its tile with `margin` to spare, so such a box is only the
+        visible part of someone covered by another tile (or by the next full-frame pass).
+        """
+        x1, y1, x2, y2 = tile
+        edge = 2 # Tolerance in pixels
+        cut = np.zeros(len(boxes), dtype=bool)
+        if x1 > 0:
+            cut |= boxes[:, 0] <= edge
+        if y1 > 0:
+            cut |= boxes[:, 1] <= edge
+        if x2 < self.frame_width:
+            cut |= boxes[:, 2] >= (x2 - x1) - edge
+        if y2 < self.frame_height:
+            cut |= boxes[:, 3] >= (y2 - y1) - edge
+        boxes = boxes[~cut] # Boolean indexing copies, so the detector's arrays are untouched
+        boxes[:, [0, 2]] += x1
+        boxes[:, [1, 3]] += y1
+        return boxes
+
+    def _plan_frame(self, frame):
+        """
+        Returns the tiles to run on `frame`, or None for a full-frame pass.
+        """
+        self._motion.needs_detection(frame)
+        motion_regions = self._motion.changed_regions()
+        self._frames_since_full += 1
+        if motion_regions is None or self._frames_since_full >= self.full_frame_interval:
+            return None
+        regions = motion_regions + [list(person.bbox) for person in self.person_tracker.tracked_persons]
+        regions = [
+            [max(0, x1 - self.margin), max(0, y1 - self.margin),
+             min(self.frame_width, x2 + self.margin), min(self.frame_height, y2 + self.margin)]
+            for x1, y1, x2, y2 in regions
+        ]
+        tiles = self._tiles_for_regions(regions)
+        if len(tiles) > self.max_tiles:
+            return None
+        return tiles
+
+    def detect_batch(self, frames):
+        """
+        Detects persons in `frames` using tiles where possible.
+
+        Args:
+            frames (list): BGR frames, in stream order.
+
+        Returns:
+            list: One (N, 6) array per frame in frame coordinates, as from `YOLODetector.detect_batch`.
+        """
+        plans = [self._plan_frame(frame) for frame in frames]
+        self.frames_detected += len(frames)
+
+        # One model call for every tile of the batch, one for the frames that need a full pass
+        crops, crop_owners = [], []
+        for frame_index, (frame, tiles) in enumerate(zip(frames, plans)):
+            for tile in tiles or ():
+                x1, y1, x2, y2 = tile
+                crops.append(frame[y1:y2, x1:x2])
+                crop_owners.append((frame_index, tile))
+        full_frame_indices = [i for i, tiles in enumerate(plans) if tiles is None]
+
+        tile_boxes = self.yolo_detector.detect_batch(crops, imgsz=self.tile_size) if crops else []
+        full_boxes = self.yolo_detector.detect_batch([frames[i] for i in full_frame_indices])
+        self.tiles_run += len(crops)
+        self.full_frame_passes += len(full_frame_indices)
+        if full_frame_indices:
+            self._frames_since_full = 0
+
+        per_frame = [[] for _ in frames]
+        for (frame_index, tile), boxes in zip(crop_owners, tile_boxes):
+            if len(boxes):
+                per_frame[frame_index].append(self._boxes_to_frame(boxes, tile))
+        for frame_index, boxes in zip(full_frame_indices, full_boxes):
+            per_frame[frame_index].append(boxes)
+
+        batch_boxes = []
+        for frame_index, tiles in enumerate(plans):
+            if tiles is not None and not tiles:
+                self.empty_frames += 1
+            if per_frame[frame_index]:
+                boxes = np.concatenate(per_frame[frame_index], axis=0)
+                batch_boxes.append(_nms(boxes, self.yolo_detector.nms_threshold) if tiles else boxes)
+            else:
+                batch_boxes.append(np.empty((0, 6), dtype=np.float32))
+        return batch_boxes
+
+    def boxes_to_detections(self, boxes):
+        """Same as `YOLODetector.boxes_to_detections`."""
+        return self.yolo_detector.boxes_to_detections(boxes)
+
+    def get_stats(self):
+        """
+        Returns tiling statistics.
+
+        Returns:
+            dict: Frames detected, full-frame passes, tiles run, average tiles per tiled frame
+                  and frames skipped because nothing needed detecting.
+        """
+        tiled_frames = self.frames_detected - self.full_frame_passes
+        return {
+            "frames_detected": self.frames_detected,
+            "full_frame_passes": self.full_frame_passes,
+            "tiles_run": self.tiles_run,
+            "avg_tiles_per_frame": (self.tiles_run / tiled_frames) if tiled_frames else 0.0,
+            "empty_frames": self.empty_frames,
+        }
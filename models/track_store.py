@@ -0,0 +1,95 @@
+import numpy as np
+from config import TRACK_STORE_CAPACITY
+
+NO_TIME = -1 # Stands for None in the integer CCTV time columns
+
+# Column name -> (per-slot shape, dtype, value of a fresh slot)
+_COLUMNS = {
+    'bbox': ((4,), np.int32, 0), # [x1, y1, x2, y2], integer pixels like the detector's boxes
+    'centroid': ((2,), np.float64, 0.0), # Integer-rounded box centre, as used for association
+    'missing_frames': ((), np.int32, 0),
+    'is_working': ((), np.bool_, False),
+    'session_start': ((), np.int64, NO_TIME), # CCTV seconds the open working session started at
+    'working_seconds': ((), np.float64, 0.0), # Working time of closed sessions
+    'last_ocr_time': ((), np.int64, NO_TIME), # Last CCTV seconds the person was seen at
+    'last_frame_time_sec': ((), np.float64, np.nan), # Last video time the person was seen at
+    'kf_state': ((4,), np.float64, 0.0), # Kalman [cx, cy, vx, vy], px and px/s (see `ConstantVelocityKalman`)
+    'kf_cov': ((2, 2), np.float64, 0.0), # Kalman (position, velocity) covariance, shared by both axes
+    'kf_time': ((), np.float64, np.nan), # Video time the Kalman state refers to
+}
+
+class TrackStore:
+    """
+    Structure-of-arrays storage for the per-track state the tracker updates every frame.
+
+    Each column is one NumPy array indexed by slot, so marking every track missing, updating
+    the matched boxes or finding lost tracks is a single array operation instead of a loop over
+    Python objects. Slots of lost tracks go back to a free list and are reused by new tracks,
+    so track churn on long streams does not grow memory; the arrays only double when more
+    tracks are alive at once than ever before. `TrackedPerson` is a view onto one slot.
+    """
+    def __init__(self, capacity=TRACK_STORE_CAPACITY):
+        """
+        Args:
+            capacity (int): Slots to preallocate.
+        """
+        self.capacity = 0
+        for name, (shape, dtype, fill) in _COLUMNS.items():
+            setattr(self, name, np.full((0,) + shape, fill, dtype=dtype))
+        self._free_slots = [] # Stack of free slots; the lowest slot is handed out first
+        self._grow(max(1, capacity))
+
+    def __len__(self):
+        """Number of slots in use."""
+        return self.capacity - len(self._free_slots)
+
+    def _grow(self, capacity):
+        """Enlarges every column to `capacity` slots, keeping the existing rows."""
+        for name, (shape, dtype, fill) in _COLUMNS.items():
+            column = np.full((capacity,) + shape, fill, dtype=dtype)
+            column[:self.capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self._free_slots = list(range(capacity - 1, self.capacity - 1, -1)) + self._free_slots
+        self.capacity = capacity
+
+    def allocate(self):
+        """Returns a free slot reset to fresh values, growing the store if every slot is taken."""
+        if not self._free_slots:
+            self._grow(self.capacity * 2)
+        slot = self._free_slots.pop()
+        for name, (_, _, fill) in _COLUMNS.items():
+            getattr(self, name)[slot] = fill
+        return slot
+
+    def release(self, slots):
+        """Returns slots to the free list."""
+        self._free_slots.extend(sorted(slots, reverse=True))
+
+    def detach(self, slot):
+        """
+        Copies one slot into a new single-slot store and releases it here, so a view on it
+        keeps its final values after the slot is reused.
+
+        Returns:
+            tuple: (store, slot) the view should point at from now on.
+        """
+        store = TrackStore(1)
+        new_slot = store.allocate()
+        for name in _COLUMNS:
+            getattr(store, name)[new_slot] = getattr(self, name)[slot]
+        self.release([slot])
+        return store, new_slot
+
+    def set_boxes(self, slots, boxes):
+        """
+        Stores boxes and their centroids for several slots at once.
+
+        Args:
+            slots (numpy.ndarray): Slot indices.
+            boxes (numpy.ndarray): (N, 4) [x1, y1, x2, y2] boxes, one per slot; rounded to
+                                   integer pixels, since boxes are used to slice and draw frames.
+        """
+        boxes = np.rint(np.asarray(boxes, dtype=np.float64).reshape(-1, 4))
+        self.bbox[slots] = boxes
+        # Floor-divided like integer pixel coordinates, so centroids stay on the pixel grid
+        self.centroid[slots] = (boxes[:, :2] + boxes[:, 2:]) // 2
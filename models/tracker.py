@@ -1,53 +1,102 @@
 import numpy as np
-from collections import deque
-from config import MAX_DIST_PERSON, MAX_MISSING_FRAMES
+from config import MAX_DIST_PERSON, MAX_MISSING_FRAMES, TRACKER_IOU_WEIGHT, TRACK_STORE_CAPACITY
+from models.track_store import TrackStore, NO_TIME
+from models.kalman import ConstantVelocityKalman
+from utils.cctv_time import cctv_time_difference, format_cctv_time
 
-def _calculate_time_difference_in_seconds(start_time_str, end_time_str):
+def _pairwise_iou(boxes_a, boxes_b):
     """
-    Calculates the difference between two CCTV time strings in seconds.
-    Handles HH:MM:SS or HH:MM format.
-    Assumes times are within a 24-hour period.
+    Computes the IoU of every box in `boxes_a` against every box in `boxes_b`.
+
+    Args:
+        boxes_a (numpy.ndarray): (M, 4) array of [x1, y1, x2, y2] boxes.
+        boxes_b (numpy.ndarray): (N, 4) array of [x1, y1, x2, y2] boxes.
+
+    Returns:
+        numpy.ndarray: (M, N) IoU matrix.
+    """
+    ix1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    iy1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    ix2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    iy2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+def _associate(track_boxes, track_centroids, detection_boxes, max_dist, iou_weight=TRACKER_IOU_WEIGHT):
+    """
+    Optimally assigns detections to tracks using one vectorized cost matrix.
+
+    The cost of a (track, detection) pair is its centroid distance normalized by the track's
+    gate radius plus `iou_weight * (1 - IoU)`. Pairs whose centroids are the gate radius or
+    more apart are gated out. The assignment minimizing the total cost is found with the Hungarian
+    algorithm, so the result does not depend on the order of tracks or detections.
+
+    Args:
+        track_boxes (numpy.ndarray): (M, 4) current (or predicted) track boxes.
+        track_centroids (numpy.ndarray): (M, 2) current (or predicted) track centroids.
+        detection_boxes (numpy.ndarray): (N, 4) detection boxes.
+        max_dist (float or numpy.ndarray): Association gate in pixels, one for all tracks or (M,) per track.
+        iou_weight (float): Weight of the IoU term in the cost.
+
+    Returns:
+        tuple: (track_indices, detection_indices) arrays of matched pairs.
     """
-    def parse_time_to_seconds(time_str):
-        try:
-            parts = [int(p) for p in time_str.split(':')]
-            if len(parts) == 3: # HH:MM:SS
-                return parts[0] * 3600 + parts[1] * 60 + parts[2]
-            elif len(parts) == 2: # HH:MM
-                return parts[0] * 3600 + parts[1] * 60
-            return 0
-        except ValueError:
-            return 0
-    
-    start_sec = parse_time_to_seconds(start_time_str)
-    end_sec = parse_time_to_seconds(end_time_str)
-
-    # Handle time rollover (e.g., crossing midnight). Assume it's the next day.
-    if end_sec < start_sec:
-        end_sec += 24 * 3600 # Add 24 hours (86400 seconds)
-    
-    return end_sec - start_sec
+    if len(track_boxes) == 0 or len(detection_boxes) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    # Same integer centroid rounding as `TrackStore.set_boxes`
+    detection_centroids = np.stack([
+        (detection_boxes[:, 0] + detection_boxes[:, 2]) // 2,
+        (detection_boxes[:, 1] + detection_boxes[:, 3]) // 2,
+    ], axis=1)
+    distances = np.linalg.norm(track_centroids[:, None, :] - detection_centroids[None, :, :], axis=2)
+    max_dist = np.reshape(max_dist, (-1, 1))
+    gate = distances < max_dist
+
+    cost = distances / max_dist + iou_weight * (1.0 - _pairwise_iou(track_boxes, detection_boxes))
+    # Gated pairs get a cost no feasible assignment can reach, and are dropped afterwards
+    cost[~gate] = 1e6
+
+    from scipy.optimize import linear_sum_assignment # Deferred: loaded by `PersonTracker.__init__`
+    track_indices, detection_indices = linear_sum_assignment(cost)
+    valid = gate[track_indices, detection_indices]
+    return track_indices[valid], detection_indices[valid]
 
 class TrackedPerson:
     """
     Represents a single tracked person with their unique ID, current bounding box,
     activity status, and various timestamps related to their presence and work.
+
+    The per-frame state (box, centroid, missing count, working state, last sighting) lives in
+    one slot of a `TrackStore` and is read and written through properties; only the rarely
+    changing fields are kept on the object itself. A person created without a store gets a
+    private single-slot one, and a tracked person is detached into one when its track is lost,
+    so references held after that keep their final values.
     """
-    def __init__(self, id, bbox, initial_cctv_time=None, initial_frame_time_sec=None):
+    __slots__ = ('_store', '_slot', 'id', 'activity', 'in_time', 'in_frame_time_sec', 'out_time', 'out_frame_time_sec')
+
+    def __init__(self, id, bbox, initial_cctv_time=None, initial_frame_time_sec=None, store=None):
         """
         Initializes a new tracked person.
 
         Args:
             id (str): A unique identifier for this person (e.g., "Person 1").
             bbox (list): Initial bounding box coordinates [x1, y1, x2, y2].
-            initial_cctv_time (str, optional): The CCTV time when this person was first detected.
+            initial_cctv_time (int, optional): The CCTV time (see `utils.cctv_time`) when this
+                                               person was first detected.
             initial_frame_time_sec (float, optional): The video frame time (in seconds)
                                                       when this person was first detected.
+            store (TrackStore, optional): Store to take a slot from (the tracker's own).
         """
+        self._store = store if store is not None else TrackStore(1)
+        self._slot = self._store.allocate()
         self.id = id
-        self.bbox = bbox # Current bounding box [x1, y1, x2, y2]
-        self.centroid = self._get_centroid(bbox)
-        self.missing_frames = 0 # Counter for how many frames the person has not been detected
+        self.bbox = bbox # Current bounding box [x1, y1, x2, y2]; also sets the centroid
         self.activity = "standing" # Initial activity status
         
         # --- Time Logging ---
@@ -56,18 +105,84 @@ class TrackedPerson:
         self.out_time = None # CCTV time when person exited
         self.out_frame_time_sec = None # Video time when person exited
         
-        self.is_working = False # True if currently in a 'working' (sitting) state
-        self.current_working_session_start_time = None # CCTV time when the current working session started
-        self.total_working_seconds = 0.0 # Accumulates total working time across all sessions
-        
         self.last_ocr_time = initial_cctv_time # Last known CCTV time this person was seen
         self.last_frame_time_sec = initial_frame_time_sec # Last known video time this person was seen
 
+    def _detach(self):
+        """Moves this person's state out of the shared store into a private one (see `TrackStore.detach`)."""
+        self._store, self._slot = self._store.detach(self._slot)
+
+    @property
+    def bbox(self):
+        """Current bounding box [x1, y1, x2, y2]."""
+        return self._store.bbox[self._slot].tolist()
+
+    @bbox.setter
+    def bbox(self, bbox):
+        self._store.set_boxes([self._slot], [bbox])
+
+    @property
+    def centroid(self):
+        """Center point (cx, cy) of the bounding box."""
+        cx, cy = self._store.centroid[self._slot].tolist()
+        return (cx, cy)
+
+    @property
+    def missing_frames(self):
+        """Counter for how many frames the person has not been detected."""
+        return int(self._store.missing_frames[self._slot])
+
+    @missing_frames.setter
+    def missing_frames(self, value):
+        self._store.missing_frames[self._slot] = value
+
+    @property
+    def is_working(self):
+        """True if currently in a 'working' (sitting) state."""
+        return bool(self._store.is_working[self._slot])
+
+    @is_working.setter
+    def is_working(self, value):
+        self._store.is_working[self._slot] = value
+
+    @property
+    def current_working_session_start_time(self):
+        """CCTV time when the current working session started, or None."""
+        start = int(self._store.session_start[self._slot])
+        return None if start == NO_TIME else start
+
+    @current_working_session_start_time.setter
+    def current_working_session_start_time(self, value):
+        self._store.session_start[self._slot] = NO_TIME if value is None else value
+
+    @property
+    def total_working_seconds(self):
+        """Accumulated working time of all closed sessions."""
+        return float(self._store.working_seconds[self._slot])
+
+    @total_working_seconds.setter
+    def total_working_seconds(self, value):
+        self._store.working_seconds[self._slot] = value
+
+    @property
+    def last_ocr_time(self):
+        """Last known CCTV time this person was seen, or None."""
+        last = int(self._store.last_ocr_time[self._slot])
+        return None if last == NO_TIME else last
+
+    @last_ocr_time.setter
+    def last_ocr_time(self, value):
+        self._store.last_ocr_time[self._slot] = NO_TIME if value is None else value
 
-    def _get_centroid(self, bbox):
-        """Calculates the center point (centroid) of a bounding box."""
-        x1, y1, x2, y2 = bbox
-        return ((x1 + x2) // 2, (y1 + y2) // 2)
+    @property
+    def last_frame_time_sec(self):
+        """Last known video time this person was seen, or None."""
+        last = float(self._store.last_frame_time_sec[self._slot])
+        return None if np.isnan(last) else last
+
+    @last_frame_time_sec.setter
+    def last_frame_time_sec(self, value):
+        self._store.last_frame_time_sec[self._slot] = np.nan if value is None else value
 
     def update_bbox(self, new_bbox, ocr_time, frame_time_sec):
         """
@@ -76,13 +191,13 @@ class TrackedPerson:
 
         Args:
             new_bbox (list): The new bounding box coordinates.
-            ocr_time (str): The current CCTV time.
+            ocr_time (int): The current CCTV time (see `utils.cctv_time`), or None.
             frame_time_sec (float): The current video frame time in seconds.
         """
         self.bbox = new_bbox
-        self.centroid = self._get_centroid(new_bbox)
         self.missing_frames = 0 # Reset missing frames as person is detected
-        self.last_ocr_time = ocr_time
+        if ocr_time is not None:
+            self.last_ocr_time = ocr_time
         self.last_frame_time_sec = frame_time_sec
 
     def update_activity(self, new_activity, ocr_time, frame_time_sec):
@@ -92,18 +207,19 @@ class TrackedPerson:
 
         Args:
             new_activity (str): The newly classified activity ("standing" or "working").
-            ocr_time (str): The current CCTV timestamp.
+            ocr_time (int): The current CCTV time (see `utils.cctv_time`), or None.
             frame_time_sec (float): The current video frame time in seconds.
         """
         if self.activity != new_activity:
-            print(f"Person {self.id}: Activity changed from '{self.activity}' to '{new_activity}' at {ocr_time}")
+            print(f"Person {self.id}: Activity changed from '{self.activity}' to '{new_activity}' at {format_cctv_time(ocr_time)}")
 
             # If the person was previously working and now is not
-            if self.is_working and self.current_working_session_start_time:
+            if self.is_working and self.current_working_session_start_time is not None:
                 # End the current working session and add its duration to total
-                duration = _calculate_time_difference_in_seconds(self.current_working_session_start_time, ocr_time)
+                session_end_time = self.last_ocr_time if ocr_time is None else ocr_time
+                duration = cctv_time_difference(self.current_working_session_start_time, session_end_time)
                 self.total_working_seconds += duration
-                print(f"Person {self.id}: Ended working session at {ocr_time}. Session duration: {duration:.2f}s. Total work: {self.total_working_seconds:.2f}s")
+                print(f"Person {self.id}: Ended working session at {format_cctv_time(session_end_time)}. Session duration: {duration:.2f}s. Total work: {self.total_working_seconds:.2f}s")
                 self.current_working_session_start_time = None # Reset for next session
             
             self.activity = new_activity # Update to the new activity
@@ -117,43 +233,67 @@ class TrackedPerson:
         
         # If still working, continuously update the current session duration
         # This is not directly updated in total_working_seconds here,
-        # but `main.py` will use `_calculate_time_difference_in_seconds` 
+        # but `main.py` will use `cctv_time_difference` 
         # to update `total_working_seconds` for *currently active* sessions.
 
     def increment_missing(self):
         """Increments the count of frames the person has been missing."""
         self.missing_frames += 1
 
-    def is_too_old(self):
+    def is_too_old(self, max_missing_frames=MAX_MISSING_FRAMES):
         """Checks if the person has been missing for too many frames, indicating track loss."""
-        return self.missing_frames > MAX_MISSING_FRAMES
+        return self.missing_frames > max_missing_frames
 
 class PersonTracker:
     """
     Manages the assignment and persistence of unique IDs to detected persons across frames.
-    It uses a simple centroid-based tracking algorithm to associate new detections
-    with existing tracked persons.
+    New detections are associated with existing tracked persons by solving an optimal
+    assignment over a vectorized centroid-distance/IoU cost matrix.
+
+    Detections are matched against where each track is predicted to be by a constant-velocity
+    Kalman filter, and the association gate widens with the time since a track was last seen,
+    so people keep their IDs when `FRAME_SKIP` makes them move further than `max_dist` between
+    processed frames.
+
+    Track state is kept in a `TrackStore`, so the per-frame bookkeeping (missing counters,
+    matched boxes, track aging) runs as array operations over all tracks at once, and the
+    list of tracked persons is only rebuilt on frames where a track is born or lost.
     """
-    def __init__(self):
+    def __init__(self, max_dist=MAX_DIST_PERSON, max_missing_frames=MAX_MISSING_FRAMES, capacity=TRACK_STORE_CAPACITY,
+                 motion_model=None):
         """
         Initializes the PersonTracker with an empty list of currently tracked persons
         and a counter for assigning new unique IDs.
+
+        Args:
+            max_dist (float): Maximum centroid distance (px) for associating a detection with a person.
+            max_missing_frames (int): Processed frames a person may go undetected before the track is dropped.
+            capacity (int): Track slots to preallocate (see `TrackStore`).
+            motion_model (ConstantVelocityKalman, optional): Motion prediction; defaults to one
+                                                             configured from `config`.
         """
+        self.store = TrackStore(capacity)
+        self.motion_model = motion_model if motion_model is not None else ConstantVelocityKalman()
         self.tracked_persons = []
+        self._slots = np.empty(0, dtype=np.intp) # Store slot of each entry in `tracked_persons`
         self.next_person_id = 1 # Starts with "Person 1"
-        print(f"Person Tracker initialized. Max association distance: {MAX_DIST_PERSON}px, Max missing frames before loss: {MAX_MISSING_FRAMES}")
-
-    def _get_distance(self, centroid1, centroid2):
-        """Calculates Euclidean distance between two 2D centroids."""
-        return np.linalg.norm(np.array(centroid1) - np.array(centroid2))
+        self.max_dist = max_dist
+        self.max_missing_frames = max_missing_frames
+        # Deferred: scipy.optimize takes ~0.3 s to import. Loaded here rather than on the first
+        # association, so it counts as tracker startup and not as the first update
+        import scipy.optimize
+        print(f"Person Tracker initialized. Max association distance: {max_dist}px, Max missing frames before loss: {max_missing_frames}")
 
     def update(self, detections, ocr_time, frame_time_sec):
         """
         Updates the tracker with new detections from the current frame.
         It performs the following steps:
         1. Marks all existing tracked persons as potentially missing.
-        2. Tries to match new detections with existing tracked persons based on centroid distance.
-        3. Updates matched persons with new bounding boxes and resets their missing frame count.
+        2. Matches new detections to existing tracked persons with an optimal assignment
+           over a centroid-distance/IoU cost matrix against their predicted positions, gated
+           by `max_dist` or more for tracks whose position has become uncertain.
+        3. Updates matched persons with new bounding boxes, corrects their motion filters and
+           resets their missing frame count.
         4. Creates new `TrackedPerson` objects for any unmatched detections.
         5. Removes persons whose tracks have been lost (missing for too many frames).
         6. Manages the `total_working_seconds` for persons whose working sessions might end
@@ -161,74 +301,125 @@ class PersonTracker:
 
         Args:
             detections (list): A list of new detections (each a dict with 'bbox', 'confidence').
-            ocr_time (str): The current CCTV timestamp from OCR.
+            ocr_time (int): The current CCTV time (see `utils.cctv_time`), or None if OCR failed.
             frame_time_sec (float): The current video frame time in seconds.
 
         Returns:
-            list: The updated list of `TrackedPerson` objects currently being tracked.
+            list: The updated list of `TrackedPerson` objects currently being tracked. The list
+                  is replaced, never modified, when persons are added or removed.
         """
-        # Step 1: Mark all existing persons as missing by default for this frame
-        for person in self.tracked_persons:
-            person.increment_missing()
+        store = self.store
+        slots = self._slots
 
-        # Keep track of which new detections have been matched
-        matched_detection_indices = [False] * len(detections)
+        # Step 1: Mark all existing persons as missing by default for this frame
+        store.missing_frames[slots] += 1
 
-        # Step 2: Try to match existing persons with new detections
-        for i, person in enumerate(self.tracked_persons):
-            min_dist = float('inf')
-            best_match_idx = -1
+        # Step 2: Solve the track/detection assignment on the whole cost matrix at once,
+        # with every track's box moved to its predicted position
+        detection_boxes = np.array([det['bbox'] for det in detections], dtype=np.float64).reshape(-1, 4)
+        predicted_centroids, gates = self.motion_model.predict(store, slots, frame_time_sec, self.max_dist)
+        shift = predicted_centroids - store.centroid[slots]
+        predicted_boxes = store.bbox[slots] + np.concatenate([shift, shift], axis=1)
+        matched_tracks, matched_detections = _associate(predicted_boxes, predicted_centroids, detection_boxes, gates)
 
-            for j, det in enumerate(detections):
-                if not matched_detection_indices[j]: # Only consider detections not yet matched
-                    det_centroid = person._get_centroid(det['bbox'])
-                    dist = self._get_distance(person.centroid, det_centroid)
+        # Keep track of which new detections have been matched
+        matched_detection_indices = np.zeros(len(detections), dtype=bool)
+        matched_detection_indices[matched_detections] = True
+        matched_track_indices = np.zeros(len(slots), dtype=bool)
+        matched_track_indices[matched_tracks] = True
 
-                    if dist < min_dist and dist < MAX_DIST_PERSON:
-                        min_dist = dist
-                        best_match_idx = j
-            
-            if best_match_idx != -1:
-                # Step 3: Match found, update the person's state
-                person.update_bbox(detections[best_match_idx]['bbox'], ocr_time, frame_time_sec)
-                matched_detection_indices[best_match_idx] = True
-            else:
-                # No match for this person in the current frame.
-                # If they were working and now disappeared, finalize their working session.
-                if person.is_working and person.current_working_session_start_time:
-                    # End working session using the *last known* OCR time if current is N/A
-                    session_end_time = person.last_ocr_time if ocr_time == "N/A" else ocr_time
-                    duration = _calculate_time_difference_in_seconds(person.current_working_session_start_time, session_end_time)
-                    person.total_working_seconds += duration
-                    print(f"Person {person.id}: Ended working session due to disappearance at {session_end_time}. Duration: {duration:.2f}s. Total work: {person.total_working_seconds:.2f}s")
-                    self.current_working_session_start_time = None
-                    person.is_working = False
+        # Step 3: Match found, update the persons' state in one pass over the store
+        matched_slots = slots[matched_tracks]
+        store.set_boxes(matched_slots, detection_boxes[matched_detections])
+        store.missing_frames[matched_slots] = 0
+        if ocr_time is not None:
+            store.last_ocr_time[matched_slots] = ocr_time
+        store.last_frame_time_sec[matched_slots] = frame_time_sec
+        self.motion_model.update(store, matched_slots, frame_time_sec)
 
+        # No match for these persons in the current frame.
+        # If they were working and now disappeared, finalize their working session.
+        ending = ~matched_track_indices & store.is_working[slots] & (store.session_start[slots] != NO_TIME)
+        for i in np.flatnonzero(ending).tolist():
+            person = self.tracked_persons[i]
+            # End working session using the *last known* OCR time if current is N/A
+            session_end_time = person.last_ocr_time if ocr_time is None else ocr_time
+            duration = cctv_time_difference(person.current_working_session_start_time, session_end_time)
+            person.total_working_seconds += duration
+            print(f"Person {person.id}: Ended working session due to disappearance at {format_cctv_time(session_end_time)}. Duration: {duration:.2f}s. Total work: {person.total_working_seconds:.2f}s")
+            person.current_working_session_start_time = None
+            person.is_working = False
 
         # Step 4: Create new `TrackedPerson` objects for un-matched detections
-        for j, det in enumerate(detections):
-            if not matched_detection_indices[j]:
-                new_person = TrackedPerson(f"Person {self.next_person_id}", det['bbox'], ocr_time, frame_time_sec)
-                self.tracked_persons.append(new_person)
-                self.next_person_id += 1
+        new_persons = []
+        for j in np.flatnonzero(~matched_detection_indices).tolist():
+            new_persons.append(TrackedPerson(f"Person {self.next_person_id}", detection_boxes[j], ocr_time, frame_time_sec, store))
+            self.next_person_id += 1
+        new_slots = np.array([p._slot for p in new_persons], dtype=np.intp)
+        self.motion_model.initiate(store, new_slots, frame_time_sec)
+
+        # Step 5: Remove persons that have been missing for too many frames (track lost).
+        # New persons were just seen, so only existing tracks can be lost.
+        lost = store.missing_frames[slots] > self.max_missing_frames
+        if not new_persons and not lost.any():
+            return self.tracked_persons
 
-        # Step 5: Remove persons that have been missing for too many frames (track lost)
         # Before removing, ensure any ongoing working session is finalized
-        persons_to_keep = []
-        for person in self.tracked_persons:
-            if not person.is_too_old():
-                persons_to_keep.append(person)
-            else:
-                # If a person's track is being lost and they were working, finalize their session
-                if person.is_working and person.current_working_session_start_time:
-                    # Use the last known OCR time for the session end
-                    session_end_time = person.last_ocr_time 
-                    duration = _calculate_time_difference_in_seconds(person.current_working_session_start_time, session_end_time)
-                    person.total_working_seconds += duration
-                    print(f"Person {person.id}: Track lost and working session ended at {session_end_time}. Duration: {duration:.2f}s. Total work: {person.total_working_seconds:.2f}s")
-                    self.current_working_session_start_time = None
-                    person.is_working = False
-        
-        self.tracked_persons = persons_to_keep
+        for i in np.flatnonzero(lost).tolist():
+            person = self.tracked_persons[i]
+            if person.is_working and person.current_working_session_start_time is not None:
+                # Use the last known OCR time for the session end
+                session_end_time = person.last_ocr_time 
+                duration = cctv_time_difference(person.current_working_session_start_time, session_end_time)
+                person.total_working_seconds += duration
+                print(f"Person {person.id}: Track lost and working session ended at {format_cctv_time(session_end_time)}. Duration: {duration:.2f}s. Total work: {person.total_working_seconds:.2f}s")
+                person.current_working_session_start_time = None
+                person.is_working = False
+            person._detach() # Frees the slot for reuse
+
+        kept = np.flatnonzero(~lost).tolist()
+        self.tracked_persons = [self.tracked_persons[i] for i in kept] + new_persons
+        self._slots = np.concatenate([slots[kept], new_slots])
+
+        return self.tracked_persons
+
+    def get_state(self):
+        """
+        Returns everything needed to continue tracking later: the store (which the tracked
+        persons point into), the tracked persons and the next ID (see `utils.checkpoint`). The
+        state shares objects with the tracker, so it must be serialized right away.
+        """
+        return {
+            "store": self.store,
+            "tracked_persons": self.tracked_persons,
+            "slots": self._slots,
+            "next_person_id": self.next_person_id,
+        }
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state` (after it was saved and loaded again)."""
+        self.store = state["store"]
+        self.tracked_persons = state["tracked_persons"]
+        self._slots = state["slots"]
+        self.next_person_id = state["next_person_id"]
 
-        return self.tracked_persons
\ No newline at end of file
+    def carry_forward(self, ocr_time, frame_time_sec):
+        """
+        Advances the tracker by one frame on which detection was skipped (see `MotionGate`).
+        The scene has not changed, so every person detected on the last detected frame keeps
+        their bounding box and counts as seen again, standing still; missing counters are left
+        as they are.
+
+        Args:
+            ocr_time (int): The current CCTV time (see `utils.cctv_time`), or None.
+            frame_time_sec (float): The current video frame time in seconds.
+
+        Returns:
+            list: The unchanged list of `TrackedPerson` objects currently being tracked.
+        """
+        visible = self._slots[self.store.missing_frames[self._slots] == 0]
+        if ocr_time is not None:
+            self.store.last_ocr_time[visible] = ocr_time
+        self.store.last_frame_time_sec[visible] = frame_time_sec
+        self.motion_model.update(self.store, visible, frame_time_sec)
+        return self.tracked_persons
@@ -0,0 +1,29 @@
+"""
+Preload module for the fork server that starts sharded worker processes (see
+`sharding._worker_context`). The fork server imports this module once; every worker is then
+forked from it with the pipeline modules, ultralytics/torch and, if `yolo_detector.PRELOAD_MODEL_ENV` names
+a weights file, the loaded YOLO model already in memory, instead of importing and loading
+them again in each worker.
+
+Importing this module is deliberately expensive; nothing else should import it.
+"""
+import os
+# Imported for their side effect: everything a shard worker uses is in memory before the fork
+import pipeline
+from models import yolo_detector, motion_gate, roi_detector
+from utils import ocr_extractor, video_processor, frame_prefetcher, data_logger
+import scipy.optimize # Loaded by the tracker when it is constructed
+
+_model_path = os.environ.get(yolo_detector.PRELOAD_MODEL_ENV)
+if _model_path:
+    try:
+        _, _load_time_sec = yolo_detector.load_model(_model_path)
+        print(f"Worker fork server: preloaded '{_model_path}' in {_load_time_sec:.2f}s")
+    except Exception as e:
+        # Workers load the model themselves if the preload fails
+        print(f"Warning: Worker fork server could not preload '{_model_path}': {e}")
+else:
+    try:
+        import ultralytics # The import (torch) is most of the load cost
+    except ImportError:
+        pass
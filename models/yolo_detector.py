@@ -1,22 +1,194 @@
-from ultralytics import YOLO
+import time
 import cv2 # Not directly used for detection, but good to have for potential image ops
 import numpy as np
-from config import YOLO_MODEL_PATH, CONFIDENCE_THRESHOLD, NMS_THRESHOLD, TARGET_CLASSES
+from config import (
+    YOLO_MODEL_PATH, CONFIDENCE_THRESHOLD, NMS_THRESHOLD, TARGET_CLASSES, DETECTION_IMGSZ, DETECTOR_BACKEND, ONNX_INT8
+)
+from models.letterbox import Letterboxer
+
+_loaded_models = {} # model_path -> YOLO model; one load per process, inherited by forked workers
+PRELOAD_MODEL_ENV = "OFFICE_TRACKING_PRELOAD_MODEL" # Weights the worker fork server loads (see `models/worker_preload.py`)
+
+def load_model(model_path):
+    """
+    Returns the YOLO model at `model_path`, loading it on the first call in this process.
+    Ultralytics (and with it torch) is only imported here, so importing this module stays cheap.
+
+    Returns:
+        tuple: (model, load_time_sec); the load time is 0 when the model was already loaded.
+    """
+    model = _loaded_models.get(model_path)
+    if model is not None:
+        return model, 0.0
+    start = time.perf_counter()
+    from ultralytics import YOLO # Deferred: pulls in torch
+    model = _loaded_models[model_path] = YOLO(model_path)
+    return model, time.perf_counter() - start
+
+def create_detector(backend=DETECTOR_BACKEND, model_path=YOLO_MODEL_PATH, confidence_threshold=CONFIDENCE_THRESHOLD,
+                    nms_threshold=NMS_THRESHOLD, lazy=False, imgsz=DETECTION_IMGSZ, int8=ONNX_INT8, **onnx_options):
+    """
+    Builds the detector for an inference backend.
+
+    Args:
+        backend (str): "torch" for `YOLODetector`, "onnx" for `ONNXDetector` (ONNX Runtime).
+        model_path (str): Path to the YOLO weights (the ONNX model is exported from them).
+        confidence_threshold (float): Minimum detection confidence.
+        nms_threshold (float): IoU threshold used by non-maximum suppression.
+        lazy (bool): Defer loading the model.
+        imgsz (int): Inference size (longest side).
+        int8 (bool): ONNX only: run the INT8 quantized model.
+        **onnx_options: Further `ONNXDetector` arguments (e.g. `intra_op_threads`).
+
+    Returns:
+        YOLODetector: The detector; `ONNXDetector` is a subclass with the same interface.
+    """
+    if backend == 'onnx':
+        from models.onnx_backend import ONNXDetector # Deferred: circular import, optional dependency
+        return ONNXDetector(model_path, confidence_threshold, nms_threshold, lazy, imgsz, int8=int8, **onnx_options)
+    if backend != 'torch':
+        raise ValueError(f"Unknown detector backend '{backend}'. Expected 'torch' or 'onnx'.")
+    return YOLODetector(model_path, confidence_threshold, nms_threshold, lazy, imgsz)
 
 class YOLODetector:
    
-    def __init__(self):
-   
+    def __init__(self, model_path=YOLO_MODEL_PATH, confidence_threshold=CONFIDENCE_THRESHOLD, nms_threshold=NMS_THRESHOLD,
+                 lazy=False, imgsz=DETECTION_IMGSZ):
+        """
+        Loads the YOLO model. Defaults come from `config.py` and can be overridden per run.
+
+        Args:
+            model_path (str): Path to the YOLO weights.
+            confidence_threshold (float): Minimum detection confidence.
+            nms_threshold (float): IoU threshold used by non-maximum suppression.
+            lazy (bool): Defer loading the model to `load`, `warmup` or the first detection.
+            imgsz (int): Inference size (longest side, rounded up to a multiple of 32). Frames
+                         are letterboxed to it here and boxes are mapped back to frame pixels.
+        """
+        self.model_path = model_path
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        self.target_classes = np.asarray(TARGET_CLASSES, dtype=np.float32)
+        self.imgsz = imgsz
+        self._letterboxers = {} # imgsz -> Letterboxer (each keeps its own reusable input buffer)
+        self.model = None
+        self.load_time_sec = 0.0
+        self.warmup_time_sec = 0.0
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """
+        Loads the model if it is not loaded yet. A model already loaded in this process
+        (e.g. preloaded by the worker fork server) is reused.
+
+        Raises:
+            RuntimeError: If the weights cannot be loaded.
+        """
+        if self.model is not None:
+            return
         try:
-            self.model = YOLO(YOLO_MODEL_PATH)
-            print(f"YOLOv8 model loaded successfully from: '{YOLO_MODEL_PATH}'")
-            print(f"Detection Confidence Threshold: {CONFIDENCE_THRESHOLD}")
-            print(f"NMS (IOU) Threshold: {NMS_THRESHOLD}")
-            print(f"Target classes for detection: {TARGET_CLASSES} (0 usually means 'person' in COCO dataset)")
+            self.model, self.load_time_sec = load_model(self.model_path)
         except Exception as e:
             # Raise a RuntimeError to indicate a critical failure in loading the model
-            raise RuntimeError(f"Error: Failed to load YOLO model from '{YOLO_MODEL_PATH}'. "
+            raise RuntimeError(f"Error: Failed to load YOLO model from '{self.model_path}'. "
                                f"Please ensure the path is correct and the file exists. Details: {e}")
+        source = f"in {self.load_time_sec:.2f}s" if self.load_time_sec else "(already in memory)"
+        print(f"YOLOv8 model loaded successfully from: '{self.model_path}' {source}")
+        print(f"Detection Confidence Threshold: {self.confidence_threshold}")
+        print(f"NMS (IOU) Threshold: {self.nms_threshold}")
+        print(f"Inference size: {self._letterboxer(None).imgsz}px (longest side)")
+        print(f"Target classes for detection: {TARGET_CLASSES} (0 usually means 'person' in COCO dataset)")
+
+    def warmup(self, frame_size=(640, 640), imgsz=None):
+        """
+        Loads the model if needed and runs one inference on a blank frame, so one-off
+        initialization (layer fusion, memory allocation, kernel selection) happens before
+        the first real batch.
+
+        Args:
+            frame_size (tuple): (width, height) of the frames that will be processed.
+            imgsz (int, optional): Inference size, as passed to `detect_batch`.
+
+        Returns:
+            float: Seconds spent in the warmup inference.
+        """
+        self.load()
+        width, height = frame_size
+        start = time.perf_counter()
+        self.detect_batch([np.zeros((height, width, 3), dtype=np.uint8)], imgsz)
+        self.warmup_time_sec = time.perf_counter() - start
+        print(f"Detector warmed up in {self.warmup_time_sec:.2f}s.")
+        return self.warmup_time_sec
+
+    def _letterboxer(self, imgsz):
+        """Returns the `Letterboxer` for `imgsz` (defaults to `self.imgsz`), creating it on first use."""
+        imgsz = imgsz or self.imgsz
+        letterboxer = self._letterboxers.get(imgsz)
+        if letterboxer is None:
+            letterboxer = self._letterboxers[imgsz] = Letterboxer(imgsz)
+        return letterboxer
+
+    def detect_batch(self, frames, imgsz=None):
+        """
+        Runs the model on several frames in a single inference call.
+
+        Each frame is letterboxed once into a reused buffer at the inference size; ultralytics
+        receives canvases that already have its input shape, so its own preprocessing has no
+        resizing left to do, and the boxes are mapped back to frame pixels here. Class filtering
+        is applied as a NumPy mask over the whole result matrix rather than per box in Python.
+
+        Args:
+            frames (list): A list of input video frames (H, W, 3 BGR images).
+            imgsz (int, optional): Inference size for this call. Defaults to `self.imgsz`.
+
+        Returns:
+            list: One `numpy.ndarray` of shape (N, 6) per input frame, with columns
+                  [x1, y1, x2, y2, confidence, class_id] (float32) in frame coordinates. A frame
+                  with no detections (or a failed batch) yields an empty (0, 6) array.
+        """
+        if len(frames) == 0:
+            return []
+        if self.model is None:
+            self.load()
+        letterboxer = self._letterboxer(imgsz)
+        try:
+            canvases, transforms = letterboxer.prepare(frames)
+            results = self.model(canvases, verbose=False, conf=self.confidence_threshold, iou=self.nms_threshold,
+                                 imgsz=letterboxer.imgsz)
+        except Exception as e:
+            print(f"Warning: Error during batched YOLO detection on {len(frames)} frames: {e}")
+            return [np.empty((0, 6), dtype=np.float32) for _ in frames]
+
+        batch_boxes = []
+        for result, transform in zip(results, transforms):
+            if result.boxes is None or len(result.boxes) == 0:
+                batch_boxes.append(np.empty((0, 6), dtype=np.float32))
+                continue
+            # `boxes.data` holds [x1, y1, x2, y2, conf, cls] for every box in one tensor
+            data = result.boxes.data.cpu().numpy().astype(np.float32, copy=False)
+            batch_boxes.append(letterboxer.scale_boxes(data[np.isin(data[:, 5], self.target_classes)], transform))
+        return batch_boxes
+
+    @staticmethod
+    def boxes_to_detections(boxes):
+        """
+        Converts a (N, 6) box matrix from `detect_batch` into the list-of-dicts
+        format returned by `detect`.
+
+        Args:
+            boxes (numpy.ndarray): Box matrix with columns [x1, y1, x2, y2, confidence, class_id].
+
+        Returns:
+            list: A list of dictionaries with 'bbox', 'confidence' and 'class_id' keys.
+        """
+        bboxes = boxes[:, :4].astype(np.int32).tolist()
+        confidences = boxes[:, 4].tolist()
+        class_ids = boxes[:, 5].astype(np.int32).tolist()
+        return [
+            {'bbox': bbox, 'confidence': confidence, 'class_id': class_id}
+            for bbox, confidence, class_id in zip(bboxes, confidences, class_ids)
+        ]
 
     def detect(self, frame):
         """
@@ -30,28 +202,4 @@ class YOLODetector:
                   and contains their 'bbox' (x1, y1, x2, y2 coordinates), 'confidence' score,
                   and 'class_id'. Returns an empty list if no persons are detected or if an error occurs.
         """
-        detections = []
-        try:
-       
-            results = self.model(frame, verbose=False, conf=CONFIDENCE_THRESHOLD, iou=NMS_THRESHOLD)[0]
-            
-            if results.boxes is not None:
-                for box in results.boxes:
-                    class_id = int(box.cls.item())
-                    confidence = float(box.conf.item())
-                    
-                    # Only include detections that belong to our `TARGET_CLASSES` (i.e., 'person')
-                    if class_id in TARGET_CLASSES:
-                        # Extract bounding box coordinates (x1, y1, x2, y2)
-                        # `xyxy` returns [x1, y1, x2, y2] format
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist()) 
-                        detections.append({
-                            'bbox': [x1, y1, x2, y2],
-                            'confidence': confidence,
-                            'class_id': class_id
-                        })
-        except Exception as e:
-            print(f"Warning: Error during YOLO detection on a frame: {e}")
-            # Continue processing even if detection fails for a frame
-        
-        return detections
\ No newline at end of file
+        return self.boxes_to_detections(self.detect_batch([frame])[0])
@@ -0,0 +1,170 @@
+import time
+from config import IN_ZONE, OUT_ZONE, IN_TIME_WINDOW_END_SEC, OUT_TIME_WINDOW_START_SEC
+from utils.cctv_time import cctv_time_difference, format_cctv_time
+
+class TrackingPipeline:
+    """
+    Per-frame office tracking logic, independent of where frames come from and of any
+    display or video output: OCR time extraction, person tracking, IN/OUT zone events,
+    activity classification and working-time accounting. CCTV times are integers that keep
+    the overlay's date (None when OCR failed); see `utils.cctv_time`.
+    """
+    def __init__(self, person_tracker, activity_classifier, ocr_extractor, data_logger,
+                 in_zone=IN_ZONE, out_zone=OUT_ZONE,
+                 in_time_window_end_sec=IN_TIME_WINDOW_END_SEC,
+                 out_time_window_start_sec=OUT_TIME_WINDOW_START_SEC, metrics=None):
+        """
+        Initializes the pipeline with already constructed components.
+
+        Args:
+            person_tracker (PersonTracker): Tracker assigning IDs to detections.
+            activity_classifier (ActivityClassifier): Standing/working classifier.
+            ocr_extractor (OCRExtractor): CCTV time extractor.
+            data_logger (DataLogger): Event logger and report exporter.
+            in_zone (tuple): (x1, y1, x2, y2) zone where IN events are recorded.
+            out_zone (tuple): (x1, y1, x2, y2) zone where OUT events are recorded.
+            in_time_window_end_sec (float): Video time until which IN events are recorded.
+            out_time_window_start_sec (float): Video time from which OUT events are recorded.
+            metrics (PipelineMetrics, optional): Receives the "ocr", "tracking", "classification"
+                                                 and "zones" stage timings.
+        """
+        self.person_tracker = person_tracker
+        self.activity_classifier = activity_classifier
+        self.ocr_extractor = ocr_extractor
+        self.data_logger = data_logger
+        self.in_zone = in_zone
+        self.out_zone = out_zone
+        self.in_time_window_end_sec = in_time_window_end_sec
+        self.out_time_window_start_sec = out_time_window_start_sec
+        self.metrics = metrics
+        self.tracked_persons = []
+
+    def process_frame(self, frame, frame_idx, current_video_time_sec, detections):
+        """
+        Runs OCR, tracking and event logic for one frame.
+
+        Args:
+            frame (numpy.ndarray): The video frame (only read, never modified).
+            frame_idx (int): 1-based index of the frame in the video.
+            current_video_time_sec (float): Video time of the frame in seconds.
+            detections (list): Person detections for this frame (see `YOLODetector.detect`), or
+                               None if detection was skipped and the last boxes are carried forward.
+
+        Returns:
+            tuple: (tracked_persons, ocr_time) after processing this frame, `ocr_time` a CCTV
+                   time or None.
+        """
+        # 1. Extract CCTV Time via OCR from a defined ROI
+        stage_start = time.perf_counter()
+        ocr_time = self.ocr_extractor.extract_time(frame, current_video_time_sec)
+        ocr_done = time.perf_counter()
+        if ocr_time is None:
+            print(f"Warning: OCR failed to extract time at frame {frame_idx} (Video Time: {current_video_time_sec:.2f}s). Using last valid time if available, or 'N/A'.")
+            # If OCR fails, we'll try to use the last known OCR time for tracked persons.
+            # For new events (IN/OUT/START_WORKING), if OCR is N/A, these events might be missed or logged with N/A.
+
+        # 2. Update Person Tracker with new detections
+        # This will match detections to existing persons, create new ones, or mark existing as missing.
+        tracking_start = time.perf_counter()
+        if detections is None:
+            tracked_persons = self.person_tracker.carry_forward(ocr_time, current_video_time_sec)
+        else:
+            tracked_persons = self.person_tracker.update(detections, ocr_time, current_video_time_sec)
+        tracking_done = time.perf_counter()
+        classification_sec = 0.0 # Classification runs inside the per-person loop; timed separately from the zone logic
+
+        # 3. Process Each Tracked Person for IN/OUT/Activity/Working Time
+        for person in tracked_persons:
+            # Always update the last known OCR time for this person if a valid one is available
+            if ocr_time is not None:
+                person.last_ocr_time = ocr_time
+    
+            # Calculate centroid of the person's bounding box
+            cx = (person.bbox[0] + person.bbox[2]) / 2
+            cy = (person.bbox[1] + person.bbox[3]) / 2
+
+            # --- IN Time Detection (First 20 seconds of video) ---
+            # A person's IN time is recorded if they are in the IN zone during the first 20 seconds,
+            # and they don't already have an IN time recorded.
+            if current_video_time_sec <= self.in_time_window_end_sec and person.in_time is None and ocr_time is not None:
+                if self.in_zone[0] <= cx <= self.in_zone[2] and self.in_zone[1] <= cy <= self.in_zone[3]:
+                    person.in_time = ocr_time
+                    person.in_frame_time_sec = current_video_time_sec
+                    self.data_logger.log_event(person.id, "IN", ocr_time, current_video_time_sec, "Person entered office.")
+                    print(f"-> IN Event: {person.id} entered at {format_cctv_time(ocr_time)}")
+
+            # --- Activity Classification (After the first 20 seconds) ---
+            # After the initial IN time window, classify activity (standing/working).
+            if current_video_time_sec > self.in_time_window_end_sec:
+                classify_start = time.perf_counter()
+                new_activity = self.activity_classifier.classify(person.bbox)
+                classification_sec += time.perf_counter() - classify_start
+        
+                # Check if activity has changed to manage working sessions
+                if person.activity != new_activity:
+                    prev_activity = person.activity
+                    person.update_activity(new_activity, ocr_time, current_video_time_sec) # This updates person.activity and manages session start/end
+            
+                    # Log the activity change
+                    self.data_logger.log_event(
+                        person.id, "ACTIVITY_CHANGE", ocr_time, current_video_time_sec, 
+                        f"Changed from '{prev_activity}' to '{new_activity}'."
+                    )
+            
+                    # Log explicit WORKING_START/WORKING_END events
+                    if new_activity == "working" and ocr_time is not None:
+                        self.data_logger.log_event(person.id, "WORKING_START", ocr_time, current_video_time_sec, "Person started working (sitting).")
+                        print(f"-> Working Event: {person.id} started working at {format_cctv_time(ocr_time)}")
+                    elif prev_activity == "working" and new_activity == "standing" and ocr_time is not None:
+                        self.data_logger.log_event(person.id, "WORKING_END", ocr_time, current_video_time_sec, "Person stopped working (stood up).")
+                        print(f"-> Working Event: {person.id} stopped working at {format_cctv_time(ocr_time)}")
+
+                # Accumulate total working seconds for currently active working sessions
+                # The `person.total_working_seconds` is cumulatively updated when a session *ends* (in `update_activity`).
+                # For *displaying* the current total, `VideoProcessor` will calculate the duration of the ongoing session
+                # and add it to `person.total_working_seconds`. So no direct update here.
+                pass 
+
+            # --- OUT Time Detection (After 30 seconds of video) ---
+            # A person's OUT time is recorded if they are in the OUT zone after 30 seconds,
+            # have an IN time, and don't already have an OUT time recorded.
+            if current_video_time_sec >= self.out_time_window_start_sec and \
+               person.in_time is not None and person.out_time is None and ocr_time is not None:
+                if self.out_zone[0] <= cx <= self.out_zone[2] and self.out_zone[1] <= cy <= self.out_zone[3]:
+                    person.out_time = ocr_time
+                    person.out_frame_time_sec = current_video_time_sec
+                    self.data_logger.log_event(person.id, "OUT", ocr_time, current_video_time_sec, "Person exited office.")
+                    print(f"-> OUT Event: {person.id} exited at {format_cctv_time(ocr_time)}")
+
+                    # If the person was working when they exited, end their working session
+                    if person.is_working and person.current_working_session_start_time is not None:
+                        duration = cctv_time_difference(person.current_working_session_start_time, ocr_time)
+                        person.total_working_seconds += duration # Add remaining duration
+                        self.data_logger.log_event(person.id, "WORKING_END", ocr_time, current_video_time_sec, "Person stopped working (exited office).")
+                        person.current_working_session_start_time = None
+                        person.is_working = False
+
+        if self.metrics is not None:
+            self.metrics.record("ocr", ocr_done - stage_start)
+            self.metrics.record("tracking", tracking_done - tracking_start)
+            self.metrics.record("classification", classification_sec)
+            self.metrics.record("zones", time.perf_counter() - tracking_done - classification_sec)
+
+        self.tracked_persons = tracked_persons
+        return tracked_persons, ocr_time
+
+    def finalize(self, last_video_time_sec):
+        """
+        Closes any ongoing working sessions and exports the final report.
+
+        Args:
+            last_video_time_sec (float): Video time of the last frame read.
+        """
+        # Ensure any ongoing working sessions are finalized before exporting the report
+        for person in self.tracked_persons:
+            if person.is_working and person.current_working_session_start_time is not None and person.last_ocr_time is not None:
+                duration = cctv_time_difference(person.current_working_session_start_time, person.last_ocr_time)
+                person.total_working_seconds += duration
+                self.data_logger.log_event(person.id, "WORKING_END", person.last_ocr_time, last_video_time_sec, "Person stopped working (video ended).")
+
+        self.data_logger.export_to_csv(self.tracked_persons) # Pass tracked_persons for the final report
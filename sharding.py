@@ -0,0 +1,437 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from config import (
+    PREFETCH_QUEUE_SIZE, SHARD_OVERLAP_SEC, SHARD_STITCH_IOU, WORKER_START_METHOD, WORKER_PRELOAD_MODEL,
+    DETECTOR_WARMUP
+)
+from models.yolo_detector import create_detector, PRELOAD_MODEL_ENV
+from models.motion_gate import MotionGate
+from models.roi_detector import ROIDetector
+from models.tracker import PersonTracker, TrackedPerson, _pairwise_iou
+from models.activity_classifier import ActivityClassifier
+from utils.ocr_extractor import OCRExtractor
+from utils.video_processor import VideoProcessor
+from utils.frame_prefetcher import FramePrefetcher
+from utils.data_logger import DataLogger
+from utils.event_store import SQLiteEventStore
+from utils.cctv_time import cctv_time_difference
+from utils.metrics import PipelineMetrics
+from pipeline import TrackingPipeline
+
+def plan_shards(frame_count, num_shards, overlap_frames):
+    """
+    Splits a video into contiguous frame-range shards.
+
+    Each shard owns frames [start, end) and additionally reads `overlap_frames` frames before
+    `start` (its lead-in). The lead-in warms up the tracker and overlaps the tail of the previous
+    shard, which is what lets identities be stitched across the boundary.
+
+    Args:
+        frame_count (int): Total number of frames in the video.
+        num_shards (int): Number of shards to create.
+        overlap_frames (int): Lead-in length in frames.
+
+    Returns:
+        list: Shard dicts with 'index', 'read_start', 'start' and 'end' (0-based frame positions).
+    """
+    num_shards = max(1, min(num_shards, frame_count))
+    bounds = np.linspace(0, frame_count, num_shards + 1).astype(int)
+    return [
+        {
+            'index': i,
+            'read_start': max(0, int(bounds[i]) - overlap_frames),
+            'start': int(bounds[i]),
+            'end': int(bounds[i + 1]),
+        }
+        for i in range(num_shards)
+    ]
+
+def _person_state(person):
+    """Captures the fields of a `TrackedPerson` needed to merge shards, as a plain dict."""
+    return {
+        'bbox': list(person.bbox),
+        'activity': person.activity,
+        'in_time': person.in_time,
+        'out_time': person.out_time,
+        'is_working': person.is_working,
+        'current_working_session_start_time': person.current_working_session_start_time,
+        'total_working_seconds': person.total_working_seconds,
+        'last_ocr_time': person.last_ocr_time,
+    }
+
+def _person_number(person_id):
+    """Sort key for tracker IDs of the form "Person N"."""
+    return int(person_id.rsplit(" ", 1)[-1])
+
+def _visible_tracks(tracked_persons):
+    """Returns {person_id: bbox} for the persons detected in the current frame."""
+    return {p.id: list(p.bbox) for p in tracked_persons if p.missing_frames == 0}
+
+_threads_per_worker = 0 # Set in each worker by `_init_worker`; 0 = no limit
+
+def _init_worker(threads_per_worker):
+    """Process pool initializer: keeps each worker from claiming every core for itself."""
+    global _threads_per_worker
+    _threads_per_worker = threads_per_worker
+    cv2.setNumThreads(threads_per_worker)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+def _worker_context(model_path, start_method=WORKER_START_METHOD, preload_model=WORKER_PRELOAD_MODEL):
+    """
+    Returns the multiprocessing context for the worker pool. With 'forkserver', the fork server
+    imports `models.worker_preload` (the pipeline modules, ultralytics/torch and, with
+    `preload_model`, the YOLO weights) once, and every worker is forked from it instead of
+    importing and loading everything itself.
+    """
+    if start_method not in multiprocessing.get_all_start_methods():
+        print(f"Warning: Worker start method '{start_method}' is not available on this platform; using the default.")
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context(start_method)
+    if start_method == 'forkserver':
+        if preload_model:
+            os.environ[PRELOAD_MODEL_ENV] = model_path # Read by the fork server when it starts
+        else:
+            os.environ.pop(PRELOAD_MODEL_ENV, None)
+        context.set_forkserver_preload(['models.worker_preload'])
+    return context
+
+def _process_shard(shard, settings, overlap_frames, work_dir):
+    """
+    Worker entry point: processes one shard with its own detector, OCR extractor and tracker.
+
+    Returns:
+        dict: The shard's owned events, per-person states at the shard boundary and at the end,
+              the boxes seen in the lead-in and tail overlap windows, and the startup time of
+              each component.
+    """
+    shard_index = shard['index']
+    startup = PipelineMetrics(f"shard {shard_index}")
+    with startup.startup_timer("video"):
+        video_processor = VideoProcessor(settings['video_path'])
+    with startup.startup_timer("detector"):
+        detector_options = {'imgsz': settings['imgsz'], 'int8': settings['onnx_int8']}
+        if settings['detector_backend'] == 'onnx':
+            detector_options['intra_op_threads'] = _threads_per_worker
+        yolo_detector = create_detector(settings['detector_backend'], settings['model_path'],
+                                        settings['confidence_threshold'], settings['nms_threshold'], **detector_options)
+    if DETECTOR_WARMUP:
+        with startup.startup_timer("detector_warmup"):
+            yolo_detector.warmup((video_processor.width, video_processor.height))
+    with startup.startup_timer("logger"):
+        # Each shard logs to a scratch file; the merged events are written to the real log afterwards
+        data_logger = DataLogger(os.path.join(work_dir, f"shard_{shard_index:04d}.log"),
+                                 os.path.join(work_dir, f"shard_{shard_index:04d}.csv"))
+    with startup.startup_timer("tracker"):
+        person_tracker = PersonTracker(settings['max_dist_person'], settings['max_missing_frames'])
+        activity_classifier = ActivityClassifier(settings['sitting_threshold'])
+    with startup.startup_timer("ocr"):
+        ocr_extractor = OCRExtractor(settings['ocr_engine'], recording_date=settings['recording_date'])
+    pipeline = TrackingPipeline(person_tracker, activity_classifier, ocr_extractor, data_logger)
+
+    frame_skip = settings['frame_skip']
+    batch_size = settings['batch_size']
+    frame_size = (video_processor.width, video_processor.height)
+    motion_gate = MotionGate(frame_size) if settings['motion_gate'] else None
+    detector = yolo_detector
+    if settings['detection_mode'] == 'roi':
+        detector = ROIDetector(yolo_detector, person_tracker, frame_size)
+    video_processor.seek_frame(shard['read_start'])
+    frame_prefetcher = FramePrefetcher(video_processor, PREFETCH_QUEUE_SIZE,
+                                       pool_size=PREFETCH_QUEUE_SIZE + batch_size + 1).start()
+
+    lead_in_tracks = {} # frame position -> {person_id: bbox}, frames before `start`
+    tail_tracks = {} # frame position -> {person_id: bbox}, last `overlap_frames` frames
+    boundary_states = None
+    owned_start_time_sec = None
+    last_video_time_sec = 0.0
+    frames_processed = 0
+
+    position = shard['read_start']
+    pending_frames = [] # (position, frame, video_time_sec, needs_detection)
+    stream_ended = False
+    while not stream_ended:
+        if position < shard['end']:
+            ret, frame, video_time_sec = frame_prefetcher.read()
+        else:
+            ret = False
+        if ret:
+            frame_idx = position + 1 # 1-based, as in `run_office_tracking`
+            if frame_skip > 1 and frame_idx % frame_skip != 0:
+                frame_prefetcher.recycle(frame)
+            else:
+                needs_detection = motion_gate is None or motion_gate.needs_detection(frame)
+                pending_frames.append((position, frame, video_time_sec, needs_detection))
+            last_video_time_sec = video_time_sec
+            position += 1
+            if len(pending_frames) < batch_size:
+                continue
+        else:
+            stream_ended = True
+
+        batch_boxes = iter(detector.detect_batch([f for _, f, _, needs_detection in pending_frames if needs_detection]))
+        for frame_position, frame, video_time_sec, needs_detection in pending_frames:
+            if frame_position >= shard['start'] and boundary_states is None:
+                # State right after the lead-in: everything before this belongs to the previous shard
+                boundary_states = {p.id: _person_state(p) for p in pipeline.tracked_persons}
+                owned_start_time_sec = video_time_sec
+
+            detections = detector.boxes_to_detections(next(batch_boxes)) if needs_detection else None
+            tracked_persons, _ = pipeline.process_frame(frame, frame_position + 1, video_time_sec, detections)
+            frames_processed += 1
+            frame_prefetcher.recycle(frame)
+
+            if frame_position < shard['start']:
+                lead_in_tracks[frame_position] = _visible_tracks(tracked_persons)
+            if frame_position >= shard['end'] - overlap_frames:
+                tail_tracks[frame_position] = _visible_tracks(tracked_persons)
+        pending_frames = []
+
+    frame_prefetcher.stop()
+    data_logger.close()
+    video_processor.release()
+
+    if owned_start_time_sec is None:
+        boundary_states, owned_start_time_sec = {}, float('inf')
+    owned_events = [e for e in data_logger.events if e['video_frame_time_sec'] >= owned_start_time_sec]
+
+    return {
+        'index': shard_index,
+        'events': owned_events,
+        'boundary_states': boundary_states,
+        'final_states': {p.id: _person_state(p) for p in pipeline.tracked_persons},
+        'lead_in_tracks': lead_in_tracks,
+        'tail_tracks': tail_tracks,
+        'last_video_time_sec': last_video_time_sec,
+        'frames_processed': frames_processed,
+        'frames_gated': motion_gate.frames_gated if motion_gate else 0,
+        'startup_sec': dict(startup.startup),
+    }
+
+def _stitch_identities(prev_tail_tracks, next_lead_in_tracks, iou_threshold=SHARD_STITCH_IOU):
+    """
+    Matches the previous shard's track IDs to the next shard's IDs over the overlap window.
+
+    Every frame seen by both shards votes for (previous ID, next ID) pairs whose boxes overlap
+    with IoU >= `iou_threshold`. IDs are then paired by an optimal assignment on the votes. A pair
+    is kept only if it agreed on at least half of the frames where both IDs were visible.
+
+    Returns:
+        dict: {next_shard_id: prev_shard_id}
+    """
+    votes = {}
+    co_visible = {}
+    for position in set(prev_tail_tracks) & set(next_lead_in_tracks):
+        prev_frame, next_frame = prev_tail_tracks[position], next_lead_in_tracks[position]
+        if not prev_frame or not next_frame:
+            continue
+        prev_ids, next_ids = list(prev_frame), list(next_frame)
+        iou = _pairwise_iou(np.array([prev_frame[i] for i in prev_ids], dtype=np.float64),
+                            np.array([next_frame[i] for i in next_ids], dtype=np.float64))
+        for a, prev_id in enumerate(prev_ids):
+            for b, next_id in enumerate(next_ids):
+                co_visible[(prev_id, next_id)] = co_visible.get((prev_id, next_id), 0) + 1
+                if iou[a, b] >= iou_threshold:
+                    votes[(prev_id, next_id)] = votes.get((prev_id, next_id), 0) + 1
+
+    if not votes:
+        return {}
+    prev_ids = sorted({p for p, _ in votes})
+    next_ids = sorted({n for _, n in votes})
+    vote_matrix = np.zeros((len(prev_ids), len(next_ids)))
+    for (prev_id, next_id), count in votes.items():
+        vote_matrix[prev_ids.index(prev_id), next_ids.index(next_id)] = count
+
+    from scipy.optimize import linear_sum_assignment # Deferred, as in `models.tracker`
+    rows, cols = linear_sum_assignment(-vote_matrix)
+    mapping = {}
+    for r, c in zip(rows, cols):
+        prev_id, next_id = prev_ids[r], next_ids[c]
+        if vote_matrix[r, c] > 0 and vote_matrix[r, c] >= 0.5 * co_visible[(prev_id, next_id)]:
+            mapping[next_id] = prev_id
+    return mapping
+
+def _merge_person_state(prev, boundary, final):
+    """
+    Combines a person's state from the previous shard with their state in the next shard.
+
+    `final['total_working_seconds'] - boundary['total_working_seconds']` is the working time
+    the next shard accumulated in its own frames. A session that was open at the end of the
+    previous shard and is still open after the lead-in is treated as one continuous session
+    that started in the previous shard.
+    """
+    merged = dict(final)
+    merged['in_time'] = prev['in_time'] if prev['in_time'] is not None else final['in_time']
+    merged['out_time'] = final['out_time'] if final['out_time'] is not None else prev['out_time']
+    contribution = final['total_working_seconds'] - (boundary['total_working_seconds'] if boundary else 0.0)
+    total = prev['total_working_seconds'] + contribution
+
+    prev_open = prev['is_working'] and prev['current_working_session_start_time'] is not None
+    boundary_open = boundary and boundary['is_working'] and boundary['current_working_session_start_time'] is not None
+    if prev_open and boundary_open:
+        same_session_still_open = (
+            final['is_working'] and
+            final['current_working_session_start_time'] == boundary['current_working_session_start_time']
+        )
+        if same_session_still_open:
+            merged['current_working_session_start_time'] = prev['current_working_session_start_time']
+        else:
+            # The next shard closed the session; add the part that ran before its lead-in ended
+            total += cctv_time_difference(
+                prev['current_working_session_start_time'], boundary['current_working_session_start_time'])
+    elif prev_open:
+        # The next shard did not see the person working after the boundary: close at last sighting
+        total += cctv_time_difference(prev['current_working_session_start_time'], prev['last_ocr_time'])
+
+    merged['total_working_seconds'] = total
+    return merged
+
+def merge_shard_results(results):
+    """
+    Stitches per-shard results into one set of global identities and one event stream.
+
+    Returns:
+        tuple: (events, person_states) where `events` uses global person IDs in video order and
+               `person_states` maps global ID -> merged state for persons tracked at the end.
+    """
+    results = sorted(results, key=lambda r: r['index'])
+    next_global_id = 1
+    merged_events = []
+    global_states = {} # global id -> state, for persons alive at the end of the latest shard
+    prev_local_to_global = {}
+    prev_result = None
+
+    for result in results:
+        id_links = _stitch_identities(prev_result['tail_tracks'], result['lead_in_tracks']) if prev_result else {}
+        local_to_global = {}
+
+        def global_id_for(local_id):
+            nonlocal next_global_id
+            if local_id not in local_to_global:
+                prev_local_id = id_links.get(local_id)
+                if prev_local_id is not None and prev_local_id in prev_local_to_global:
+                    local_to_global[local_id] = prev_local_to_global[prev_local_id]
+                else:
+                    local_to_global[local_id] = f"Person {next_global_id}"
+                    next_global_id += 1
+            return local_to_global[local_id]
+
+        # Hand out global IDs in the shard's own creation order ("Person 1", "Person 2", ...)
+        seen_local_ids = {e['person_id'] for e in result['events']} | set(result['final_states'])
+        for frame_tracks in list(result['lead_in_tracks'].values()) + list(result['tail_tracks'].values()):
+            seen_local_ids.update(frame_tracks)
+        for local_id in sorted(seen_local_ids, key=_person_number):
+            global_id_for(local_id)
+
+        for event in result['events']:
+            merged_events.append(dict(event, person_id=global_id_for(event['person_id'])))
+
+        new_states = {}
+        for local_id, final in result['final_states'].items():
+            global_id = global_id_for(local_id)
+            prev = global_states.get(global_id)
+            if prev is not None:
+                new_states[global_id] = _merge_person_state(prev, result['boundary_states'].get(local_id), final)
+            else:
+                new_states[global_id] = dict(final)
+        global_states = new_states
+        prev_local_to_global = local_to_global
+        prev_result = result
+
+    return merged_events, global_states
+
+def run_sharded_tracking(settings, num_workers, num_shards=None):
+    """
+    Processes one long recording as frame-range shards in a pool of worker processes, then
+    merges the per-shard events and tracker identities into a single report.
+
+    Args:
+        settings (dict): Keyword arguments of `run_office_tracking`.
+        num_workers (int): Number of worker processes.
+        num_shards (int, optional): Number of shards. Defaults to `num_workers`.
+    """
+    cap = cv2.VideoCapture(settings['video_path'])
+    if not cap.isOpened():
+        print(f"CRITICAL ERROR: Cannot open video file: {settings['video_path']}")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    overlap_frames = int(round(SHARD_OVERLAP_SEC * fps))
+    shards = plan_shards(frame_count, num_shards or num_workers, overlap_frames)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+    print(f"\n--- Sharded Processing: {frame_count} frames in {len(shards)} shards on {num_workers} workers "
+          f"({threads_per_worker} threads each), overlap {overlap_frames} frames ---")
+    if settings.get('output_video_path'):
+        print("Note: Sharded mode does not encode an output video.")
+    # Resolved once, so every shard dates undated CCTV readings the same way
+    settings = dict(settings, recording_date=settings['recording_date'] or datetime.now().date().isoformat())
+
+    work_dir = tempfile.mkdtemp(prefix="office_tracking_shards_")
+    start_processing_time = time.time()
+    try:
+        if settings['detector_backend'] == 'onnx':
+            # Export (and quantize) once here, so the workers do not all do it at the same time
+            from models.onnx_backend import prepare_model
+            prepare_model(settings['model_path'], settings['imgsz'], int8=settings['onnx_int8'])
+        # Only the PyTorch model is worth preloading in the fork server
+        mp_context = _worker_context(settings['model_path'],
+                                     preload_model=WORKER_PRELOAD_MODEL and settings['detector_backend'] == 'torch')
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(threads_per_worker,)) as executor:
+            futures = [executor.submit(_process_shard, shard, settings, overlap_frames, work_dir) for shard in shards]
+            results = []
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                print(f"Shard {result['index'] + 1}/{len(shards)} done: {result['frames_processed']} frames processed, "
+                      f"started in {sum(result['startup_sec'].values()):.2f}s.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    events, person_states = merge_shard_results(results)
+    last_video_time_sec = max(r['last_video_time_sec'] for r in results)
+
+    event_store = None
+    if settings['event_store_path']:
+        event_store = SQLiteEventStore(settings['event_store_path'], settings['camera_id'], settings['recording_date'])
+    data_logger = DataLogger(settings['log_file_path'], settings['csv_export_path'],
+                             report_formats=settings['report_formats'], event_store=event_store)
+    data_logger.import_events(events)
+
+    # Rebuild the persons still tracked at the end so the usual finalization and report apply
+    tracked_persons = []
+    for global_id, state in person_states.items():
+        person = TrackedPerson(global_id, state['bbox'])
+        for key, value in state.items():
+            setattr(person, key, value)
+        tracked_persons.append(person)
+    pipeline = TrackingPipeline(None, None, None, data_logger)
+    pipeline.tracked_persons = tracked_persons
+    pipeline.finalize(last_video_time_sec)
+    data_logger.close()
+
+    total_processing_duration = time.time() - start_processing_time
+    print("\n--- Sharded Processing Finished ---")
+    print(f"Total frames processed: {sum(r['frames_processed'] for r in results)} in {total_processing_duration:.2f} seconds.")
+    print(f"Events merged: {len(events)}, persons tracked at end: {len(tracked_persons)}")
+    frames_processed = sum(r['frames_processed'] for r in results)
+    if settings['motion_gate'] and frames_processed:
+        frames_gated = sum(r['frames_gated'] for r in results)
+        print(f"Motion gate: skipped detection on {frames_gated}/{frames_processed} frames ({frames_gated / frames_processed:.1%} gated).")
+    components = sorted({name for r in results for name in r['startup_sec']})
+    print("Shard startup (mean): " + ", ".join(
+        f"{name} {sum(r['startup_sec'].get(name, 0.0) for r in results) / len(results):.2f}s" for name in components))
@@ -0,0 +1,359 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import (
+    YOLO_MODEL_PATH, OCR_ROI, IN_ZONE, OUT_ZONE, IN_TIME_WINDOW_END_SEC, OUT_TIME_WINDOW_START_SEC,
+    LOGS_DIR, LOG_FILE_PATH, CSV_EXPORT_PATH, OUTPUT_VIDEO_PATH, FRAME_SKIP, PREFETCH_QUEUE_SIZE,
+    DETECTION_BATCH_SIZE, CONFIDENCE_THRESHOLD, NMS_THRESHOLD, MAX_DIST_PERSON, MAX_MISSING_FRAMES,
+    SITTING_THRESHOLD_HEIGHT_RATIO, OCR_ENGINE, REPORT_FORMATS, EVENT_STORE_PATH, INFERENCE_MAX_WAIT_MS,
+    SUPERVISOR_REPORT_INTERVAL_SEC, VIDEO_WRITER_BACKEND, VIDEO_WRITER_QUEUE_SIZE, WRITE_SKIPPED_FRAMES,
+    MOTION_GATE_ENABLED, METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH, DETECTOR_WARMUP, DETECTOR_BACKEND, ONNX_INT8,
+    DETECTION_IMGSZ
+)
+from models.yolo_detector import create_detector
+from models.inference_worker import SharedInferenceWorker
+from models.motion_gate import MotionGate
+from models.tracker import PersonTracker
+from models.activity_classifier import ActivityClassifier
+from utils.ocr_extractor import OCRExtractor
+from utils.video_processor import VideoProcessor
+from utils.frame_prefetcher import FramePrefetcher
+from utils.live_source import LiveFrameSource, is_stream_url
+from utils.data_logger import DataLogger
+from utils.metrics import PipelineMetrics, MetricsExporter
+from utils.event_store import SQLiteEventStore
+from pipeline import TrackingPipeline
+
+def load_camera_configs(path):
+    """
+    Loads the camera list for the multi-camera supervisor from a JSON file.
+
+    The file holds `{"cameras": [...]}` (or just the list). Each camera needs an `id` and a
+    `video_path`; `in_zone`, `out_zone`, `ocr_roi`, `in_time_window_end_sec`,
+    `out_time_window_start_sec`, `output_video_path`, `log_file_path`, `csv_export_path`,
+    `recording_date` and `live` are optional. Zones and ROI default to `config.py`, outputs to `logs/<id>/`. Set
+    `output_video_path` to null to skip encoding for a camera. `video_path` may be an RTSP/HTTP URL,
+    which is always processed live; `"live": true` replays a file as a live feed (see `LiveFrameSource`).
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        list: One settings dict per camera with all defaults filled in.
+
+    Raises:
+        ValueError: If a camera lacks `id` or `video_path`, or an `id` is repeated.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    cameras = data["cameras"] if isinstance(data, dict) else data
+
+    camera_configs = []
+    seen_ids = set()
+    for camera in cameras:
+        if "id" not in camera or "video_path" not in camera:
+            raise ValueError(f"Camera entry needs 'id' and 'video_path': {camera}")
+        camera_id = str(camera["id"])
+        if camera_id in seen_ids:
+            raise ValueError(f"Duplicate camera id: '{camera_id}'")
+        seen_ids.add(camera_id)
+
+        camera_dir = os.path.join(LOGS_DIR, camera_id)
+        camera_configs.append({
+            "id": camera_id,
+            "video_path": camera["video_path"],
+            "in_zone": tuple(camera.get("in_zone", IN_ZONE)),
+            "out_zone": tuple(camera.get("out_zone", OUT_ZONE)),
+            "ocr_roi": tuple(camera.get("ocr_roi", OCR_ROI)),
+            "in_time_window_end_sec": camera.get("in_time_window_end_sec", IN_TIME_WINDOW_END_SEC),
+            "out_time_window_start_sec": camera.get("out_time_window_start_sec", OUT_TIME_WINDOW_START_SEC),
+            "output_video_path": camera.get("output_video_path", os.path.join(camera_dir, os.path.basename(OUTPUT_VIDEO_PATH))),
+            "log_file_path": camera.get("log_file_path", os.path.join(camera_dir, os.path.basename(LOG_FILE_PATH))),
+            "csv_export_path": camera.get("csv_export_path", os.path.join(camera_dir, os.path.basename(CSV_EXPORT_PATH))),
+            "recording_date": camera.get("recording_date"),
+            "live": bool(camera.get("live", False)) or is_stream_url(camera["video_path"]),
+        })
+    return camera_configs
+
+class CameraWorker:
+    """
+    Runs the full tracking pipeline for one camera on its own thread. Detection is delegated
+    to a `SharedInferenceWorker`, so all cameras share one model.
+    """
+    def __init__(self, camera_config, detector, frame_skip=FRAME_SKIP, batch_size=DETECTION_BATCH_SIZE,
+                 max_dist_person=MAX_DIST_PERSON, max_missing_frames=MAX_MISSING_FRAMES,
+                 sitting_threshold=SITTING_THRESHOLD_HEIGHT_RATIO, ocr_engine=OCR_ENGINE,
+                 report_formats=REPORT_FORMATS, event_store_path=EVENT_STORE_PATH, recording_date=None,
+                 video_writer_backend=VIDEO_WRITER_BACKEND, write_skipped_frames=WRITE_SKIPPED_FRAMES,
+                 motion_gate=MOTION_GATE_ENABLED, annotate=True):
+        """
+        Builds the camera's own video, OCR, tracking and logging components.
+
+        Args:
+            camera_config (dict): One entry from `load_camera_configs`.
+            detector (SharedInferenceWorker): The shared detector.
+            frame_skip (int): Process every N-th frame.
+            batch_size (int): Frames this camera submits per detection request.
+            max_dist_person (float): Tracker association gate in pixels.
+            max_missing_frames (int): Frames a track may go undetected before it is dropped.
+            sitting_threshold (float): Height/width ratio below which a person counts as working.
+            ocr_engine (str): "tesseract" or "glyph".
+            report_formats (tuple): Report outputs, "csv" and/or "parquet".
+            event_store_path (str): SQLite event store shared by all cameras. None disables it.
+            recording_date (str): ISO date of the footage, unless the camera entry sets its own.
+            video_writer_backend (str): "opencv" or "ffmpeg" encoder for the output video.
+            write_skipped_frames (bool): With `frame_skip > 1`, also write unprocessed frames.
+            motion_gate (bool): Skip detection on frames without significant motion.
+            annotate (bool): Draw annotations on the written video.
+        """
+        self.camera_id = camera_config["id"]
+        self.detector = detector
+        self.frame_skip = frame_skip
+        self.batch_size = batch_size
+        self.write_skipped_frames = write_skipped_frames
+        self.metrics = PipelineMetrics(self.camera_id)
+
+        output_video_path = camera_config["output_video_path"]
+        if output_video_path:
+            os.makedirs(os.path.dirname(os.path.abspath(output_video_path)), exist_ok=True)
+        with self.metrics.startup_timer("video"):
+            self.video_processor = VideoProcessor(
+                camera_config["video_path"], output_video_path,
+                camera_config["in_zone"], camera_config["out_zone"], camera_config["ocr_roi"],
+                writer_backend=video_writer_backend,
+                output_frame_step=1 if write_skipped_frames else max(1, frame_skip),
+                metrics=self.metrics
+            )
+        recording_date = camera_config["recording_date"] or recording_date or datetime.now().date().isoformat()
+        with self.metrics.startup_timer("ocr"):
+            self.ocr_extractor = OCRExtractor(ocr_engine, camera_config["ocr_roi"], recording_date)
+        with self.metrics.startup_timer("logger"):
+            event_store = None
+            if event_store_path:
+                event_store = SQLiteEventStore(event_store_path, self.camera_id, recording_date)
+            self.data_logger = DataLogger(camera_config["log_file_path"], camera_config["csv_export_path"],
+                                          report_formats=report_formats, event_store=event_store)
+        self.pipeline = TrackingPipeline(
+            PersonTracker(max_dist_person, max_missing_frames),
+            ActivityClassifier(sitting_threshold),
+            self.ocr_extractor,
+            self.data_logger,
+            camera_config["in_zone"], camera_config["out_zone"],
+            camera_config["in_time_window_end_sec"], camera_config["out_time_window_start_sec"],
+            metrics=self.metrics,
+        )
+        keeps_skipped_frames = self.video_processor.writer and write_skipped_frames
+        frames_held_per_batch = batch_size * (max(1, frame_skip) if keeps_skipped_frames else 1)
+        frames_held_by_writer = VIDEO_WRITER_QUEUE_SIZE + 1 if self.video_processor.writer else 0
+        self.live = camera_config.get("live", False)
+        if self.live:
+            self.frame_prefetcher = LiveFrameSource(
+                self.video_processor, pool_size=frames_held_per_batch + frames_held_by_writer + 2, metrics=self.metrics
+            )
+        else:
+            self.frame_prefetcher = FramePrefetcher(
+                self.video_processor, PREFETCH_QUEUE_SIZE,
+                pool_size=PREFETCH_QUEUE_SIZE + frames_held_per_batch + frames_held_by_writer + 1,
+                metrics=self.metrics
+            )
+        self.render_annotations = annotate and self.video_processor.writer is not None
+        self.motion_gate = None
+        if motion_gate:
+            self.motion_gate = MotionGate((self.video_processor.width, self.video_processor.height),
+                                          ignore_regions=(camera_config["ocr_roi"],))
+
+        self.stop_event = threading.Event()
+        self._thread = None
+        self.error = None
+
+        # --- Statistics ---
+        self.start_time = None
+        self.end_time = None
+        self.frames_processed = 0
+        self.last_video_time_sec = 0.0
+
+    def start(self):
+        """Starts the camera thread."""
+        if self._thread is None:
+            self.start_time = time.time()
+            self._thread = threading.Thread(target=self._run, name=f"Camera-{self.camera_id}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _on_frame_processed(self, frame_idx, video_time_sec):
+        """Progress callback from the frame loop."""
+        self.frames_processed += 1
+        self.last_video_time_sec = video_time_sec
+
+    def _run(self):
+        """Camera thread body: processes the whole stream, then finalizes the report."""
+        from main import process_stream # Deferred: main imports this module for its CLI
+        try:
+            self.frame_prefetcher.start()
+            _, last_video_time_sec = process_stream(
+                self.frame_prefetcher, self.video_processor, self.detector, self.pipeline,
+                self.frame_skip, self.batch_size, self.render_annotations, headless=True,
+                on_frame_processed=self._on_frame_processed, stop_event=self.stop_event,
+                write_skipped_frames=self.write_skipped_frames, motion_gate=self.motion_gate,
+                metrics=self.metrics, latency_clock=self.frame_prefetcher.clock if self.live else None
+            )
+            self.pipeline.finalize(last_video_time_sec)
+        except Exception as e:
+            self.error = e
+            print(f"ERROR: Camera '{self.camera_id}' stopped: {e}")
+        finally:
+            self.frame_prefetcher.stop()
+            self.data_logger.close()
+            self.video_processor.release()
+            self.end_time = time.time()
+
+    def is_alive(self):
+        """Returns True while the camera thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout=None):
+        """Waits for the camera thread to finish."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_stats(self):
+        """
+        Returns throughput statistics for this camera.
+
+        Returns:
+            dict: Frames processed, processing FPS, video seconds processed, lag, the fraction of
+                  frames the motion gate kept away from the detector and, for live feeds, the frames
+                  dropped to keep up. Lag is the wall-clock time elapsed minus the video time reached,
+                  i.e. how far the camera trails a real-time feed (negative while running faster than
+                  real time).
+        """
+        elapsed = ((self.end_time or time.time()) - self.start_time) if self.start_time else 0.0
+        return {
+            "frames_processed": self.frames_processed,
+            "fps": (self.frames_processed / elapsed) if elapsed > 0 else 0.0,
+            "video_time_sec": self.last_video_time_sec,
+            "lag_sec": elapsed - self.last_video_time_sec,
+            "gated_fraction": self.motion_gate.get_stats()["gated_fraction"] if self.motion_gate else 0.0,
+            "frames_dropped": self.frame_prefetcher.get_stats()["frames_dropped"] if self.live else 0,
+        }
+
+class MultiCameraSupervisor:
+    """
+    Runs one `CameraWorker` per camera concurrently in this process, with a single YOLO model
+    served to all of them by a `SharedInferenceWorker`, and periodically reports per-camera
+    FPS and lag.
+    """
+    def __init__(self, camera_configs, model_path=YOLO_MODEL_PATH, confidence_threshold=CONFIDENCE_THRESHOLD,
+                 nms_threshold=NMS_THRESHOLD, batch_size=DETECTION_BATCH_SIZE,
+                 report_interval_sec=SUPERVISOR_REPORT_INTERVAL_SEC, metrics_json_path=METRICS_JSON_PATH,
+                 metrics_prometheus_path=METRICS_PROMETHEUS_PATH, detector_backend=DETECTOR_BACKEND,
+                 onnx_int8=ONNX_INT8, imgsz=DETECTION_IMGSZ, **camera_options):
+        """
+        Loads the shared model and builds every camera.
+
+        Args:
+            camera_configs (list): Camera settings from `load_camera_configs`.
+            model_path (str): YOLO weights path.
+            confidence_threshold (float): YOLO detection confidence threshold.
+            nms_threshold (float): YOLO NMS IoU threshold.
+            batch_size (int): Frames each camera submits per detection request.
+            report_interval_sec (float): Seconds between per-camera progress reports.
+            metrics_json_path (str): Periodic JSON snapshot of every camera's stage timings. None disables it.
+            metrics_prometheus_path (str): Periodic Prometheus text file of the same metrics. None disables it.
+            detector_backend (str): "torch" or "onnx" (see `models.yolo_detector.create_detector`).
+            onnx_int8 (bool): With the ONNX backend, run the INT8 quantized model.
+            imgsz (int): Detection inference size (longest side); boxes come back in each camera's frame pixels.
+            **camera_options: Further `CameraWorker` arguments shared by all cameras.
+        """
+        self.report_interval_sec = report_interval_sec
+        yolo_detector = create_detector(detector_backend, model_path, confidence_threshold, nms_threshold, imgsz=imgsz, int8=onnx_int8)
+        # Room for one request from every camera in a single inference call
+        self.inference_worker = SharedInferenceWorker(
+            yolo_detector, max_batch_size=batch_size * len(camera_configs), max_wait_ms=INFERENCE_MAX_WAIT_MS
+        )
+        self.cameras = [
+            CameraWorker(camera_config, self.inference_worker, batch_size=batch_size, **camera_options)
+            for camera_config in camera_configs
+        ]
+        if DETECTOR_WARMUP and self.cameras:
+            # The detector is shared: it is loaded and warmed up once, not once per camera
+            first_camera = self.cameras[0].video_processor
+            yolo_detector.warmup((first_camera.width, first_camera.height))
+        self.metrics_exporter = MetricsExporter([camera.metrics for camera in self.cameras],
+                                                metrics_json_path, metrics_prometheus_path)
+
+    def report(self):
+        """Prints one progress line per camera and the shared inference statistics."""
+        for camera in self.cameras:
+            stats = camera.get_stats()
+            state = "running" if camera.is_alive() else ("failed" if camera.error else "done")
+            print(f"[{camera.camera_id}] {state}: {stats['frames_processed']} frames, {stats['fps']:.1f} FPS, "
+                  f"video time {stats['video_time_sec']:.1f}s, lag {stats['lag_sec']:+.1f}s, "
+                  f"{stats['gated_fraction']:.0%} gated" + (f", {stats['frames_dropped']} dropped" if camera.live else ""))
+        inference_stats = self.inference_worker.get_stats()
+        print(f"[inference] {inference_stats['inference_calls']} calls, avg batch {inference_stats['avg_batch_size']:.1f} frames, "
+              f"avg {inference_stats['avg_inference_ms']:.1f} ms/call, {inference_stats['pending_requests']} requests waiting")
+
+    def run(self):
+        """Runs all cameras until every stream has ended (Ctrl+C stops them early)."""
+        print(f"\n--- Starting Multi-Camera Supervisor: {len(self.cameras)} cameras ---")
+        self.inference_worker.start()
+        self.metrics_exporter.start()
+        for camera in self.cameras:
+            camera.start()
+
+        try:
+            while any(camera.is_alive() for camera in self.cameras):
+                for camera in self.cameras:
+                    camera.join(timeout=self.report_interval_sec / len(self.cameras))
+                self.report()
+        except KeyboardInterrupt:
+            print("Stop requested. Finishing current frames on all cameras...")
+            for camera in self.cameras:
+                camera.stop_event.set()
+                if camera.live:
+                    # Also unblocks a camera that is waiting for its stream to reconnect
+                    camera.frame_prefetcher.interrupt()
+            for camera in self.cameras:
+                camera.join()
+
+        self.inference_worker.stop()
+        self.metrics_exporter.stop()
+        print("\n--- Multi-Camera Supervisor Finished ---")
+        self.report()
+        for camera in self.cameras:
+            print(f"[{camera.camera_id}] ", end="")
+            camera.metrics.print_summary()
+
+def run_multi_camera(cameras_path, model_path=YOLO_MODEL_PATH, frame_skip=FRAME_SKIP,
+                     batch_size=DETECTION_BATCH_SIZE, confidence_threshold=CONFIDENCE_THRESHOLD,
+                     nms_threshold=NMS_THRESHOLD, max_dist_person=MAX_DIST_PERSON,
+                     max_missing_frames=MAX_MISSING_FRAMES, sitting_threshold=SITTING_THRESHOLD_HEIGHT_RATIO,
+                     ocr_engine=OCR_ENGINE, report_formats=REPORT_FORMATS, event_store_path=EVENT_STORE_PATH,
+                     recording_date=None, video_writer_backend=VIDEO_WRITER_BACKEND,
+                     write_skipped_frames=WRITE_SKIPPED_FRAMES, motion_gate=MOTION_GATE_ENABLED,
+                     metrics_json_path=METRICS_JSON_PATH, metrics_prometheus_path=METRICS_PROMETHEUS_PATH,
+                     detector_backend=DETECTOR_BACKEND, onnx_int8=ONNX_INT8, imgsz=DETECTION_IMGSZ, annotate=True):
+    """
+    Runs the tracking system on every camera listed in `cameras_path` (see `load_camera_configs`).
+    Cameras always run headless; each writes its own video, log and CSV report.
+    """
+    try:
+        camera_configs = load_camera_configs(cameras_path)
+        supervisor = MultiCameraSupervisor(
+            camera_configs, model_path, confidence_threshold, nms_threshold, batch_size,
+            metrics_json_path=metrics_json_path, metrics_prometheus_path=metrics_prometheus_path,
+            detector_backend=detector_backend, onnx_int8=onnx_int8, imgsz=imgsz,
+            frame_skip=frame_skip, max_dist_person=max_dist_person, max_missing_frames=max_missing_frames,
+            sitting_threshold=sitting_threshold, ocr_engine=ocr_engine, report_formats=report_formats,
+            event_store_path=event_store_path, recording_date=recording_date,
+            video_writer_backend=video_writer_backend, write_skipped_frames=write_skipped_frames,
+            motion_gate=motion_gate, annotate=annotate
+        )
+    except Exception as e:
+        print(f"CRITICAL ERROR: Failed to initialize the multi-camera supervisor. Details: {e}")
+        return
+    supervisor.run()
@@ -0,0 +1,118 @@
+import re
+from datetime import date, timedelta
+
+SECONDS_PER_DAY = 24 * 3600
+
+_EPOCH = date(1970, 1, 1)
+
+# "16/08/2025 02:41:08 PM" (the full overlay), "02:41:08 PM", "02:41 PM" or 24-hour "14:41:08"
+_TIME_PATTERN = re.compile(
+    r'^\s*(?:(\d{2})/(\d{2})/(\d{4})\s+)?(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(AM|PM)?\s*$', re.IGNORECASE
+)
+
+def parse_cctv_time(time_str):
+    """
+    Converts an OCR reading to an integer CCTV time. This is the only place CCTV time strings
+    are parsed; the tracker, pipeline and logger carry the integer and only `format_cctv_time`
+    and `cctv_date` turn it back into text for labels, logs, reports and the event store.
+
+    A reading with the overlay's `DD/MM/YYYY` date becomes seconds since 1970-01-01 00:00 on
+    the camera's clock, so intervals across midnight or longer than a day come out right. A
+    reading without a date becomes seconds since midnight, i.e. a value below
+    `SECONDS_PER_DAY`; `OCRExtractor` dates it with `attach_cctv_date` before it goes anywhere
+    else, so every CCTV time outside this module has a date.
+
+    Args:
+        time_str (str): A reading such as "16/08/2025 02:41:08 PM", "02:41:08 PM", "02:41 PM"
+                        or "14:41:08".
+
+    Returns:
+        int: The CCTV time, or None if the text is not a valid date and time.
+    """
+    match = _TIME_PATTERN.match(time_str) if isinstance(time_str, str) else None
+    if not match:
+        return None
+    day, month, year = match.group(1), match.group(2), match.group(3)
+    hours, minutes, seconds = int(match.group(4)), int(match.group(5)), int(match.group(6) or 0)
+    if minutes > 59 or seconds > 59:
+        return None
+    suffix = match.group(7)
+    if suffix:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if suffix.upper() == 'PM' else 0)
+    elif hours > 23:
+        return None
+    time_of_day = hours * 3600 + minutes * 60 + seconds
+    if day is None:
+        return time_of_day
+    try:
+        days = (date(int(year), int(month), int(day)) - _EPOCH).days
+    except ValueError: # A misread date such as 39/08/2025
+        return None
+    return days * SECONDS_PER_DAY + time_of_day if days > 0 else None
+
+def cctv_day_start(iso_date=None):
+    """
+    Returns the CCTV time of midnight at the start of `iso_date` (YYYY-MM-DD), or of today.
+    Used as the reference date for readings taken before any date was read.
+
+    Raises:
+        ValueError: If `iso_date` is not a valid ISO date.
+    """
+    day = date.fromisoformat(iso_date) if iso_date else date.today()
+    return (day - _EPOCH).days * SECONDS_PER_DAY
+
+def attach_cctv_date(cctv_time, reference_time):
+    """
+    Gives a reading without a date the date of an earlier dated reading, moving it to the next
+    day when the clock went back by more than half a day (it passed midnight in between).
+
+    Args:
+        cctv_time (int): A CCTV time, or None.
+        reference_time (int): The last dated CCTV time, or None.
+
+    Returns:
+        int: `cctv_time` with a date if it had none and `reference_time` has one, else unchanged.
+    """
+    if cctv_time is None or cctv_time >= SECONDS_PER_DAY or reference_time is None or reference_time < SECONDS_PER_DAY:
+        return cctv_time
+    dated = reference_time - reference_time % SECONDS_PER_DAY + cctv_time
+    if dated < reference_time - SECONDS_PER_DAY // 2:
+        dated += SECONDS_PER_DAY
+    return dated
+
+def format_cctv_time(cctv_time, missing="N/A"):
+    """
+    Formats the time of day of a CCTV time as the overlay shows it, e.g. "02:41:08 PM".
+
+    Args:
+        cctv_time (int): A CCTV time, or None.
+        missing (str): Returned when `cctv_time` is None.
+
+    Returns:
+        str: The formatted time.
+    """
+    if cctv_time is None:
+        return missing
+    hours, remainder = divmod(int(cctv_time) % SECONDS_PER_DAY, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours % 12 or 12:02d}:{minutes:02d}:{seconds:02d} {'PM' if hours >= 12 else 'AM'}"
+
+def cctv_date(cctv_time, default=None):
+    """
+    Returns the ISO date (YYYY-MM-DD) of a CCTV time, or `default` if it has no date.
+    """
+    if cctv_time is None or cctv_time < SECONDS_PER_DAY:
+        return default
+    return (_EPOCH + timedelta(days=int(cctv_time) // SECONDS_PER_DAY)).isoformat()
+
+def cctv_time_difference(start_time, end_time):
+    """
+    Seconds from `start_time` to `end_time` (dated CCTV times): the plain difference, however
+    many days apart. An end before the start can only come from readings dated from the
+    recording date that passed midnight before the overlay's date was read, and is taken to
+    be on the next day. Works element-wise on NumPy arrays as well.
+    """
+    difference = end_time - start_time
+    return difference + (difference < 0) * SECONDS_PER_DAY
@@ -0,0 +1,125 @@
+import gzip
+import os
+import pickle
+import time
+from datetime import datetime
+from config import CHECKPOINT_INTERVAL_SEC
+
+CHECKPOINT_VERSION = 2 # Bumped whenever the saved state changes shape; older checkpoints are refused
+
+class Checkpointer:
+    """
+    Periodically saves the state of a single-video job, so a run that dies hours in can be
+    continued with `--resume` instead of starting over.
+
+    A checkpoint holds the tracker (track store and tracked persons), the logger's events and
+    working-period index, the OCR change cache and glyph templates, and the number of frames
+    read. It is taken between detection batches, when every frame read so far has been fully
+    processed, and written as a gzip-compressed pickle through a temporary file, so a crash
+    while saving leaves the previous checkpoint intact. Only load checkpoints this program wrote.
+
+    On resume the video is seeked past the frames already done, so they are neither decoded
+    through the pipeline nor run through detection again. Text log lines and event-store rows
+    written after the checkpoint are discarded, since the resumed run logs them again.
+
+    A run that finishes deletes its checkpoint with `discard()`, so `--resume` never picks up a
+    job that already completed.
+    """
+    def __init__(self, path, video_path, person_tracker, ocr_extractor, data_logger, interval_sec=CHECKPOINT_INTERVAL_SEC):
+        """
+        Args:
+            path (str): Checkpoint file.
+            video_path (str): The input video; a checkpoint is only resumed on the same video.
+            person_tracker (PersonTracker): Tracker whose state is saved.
+            ocr_extractor (OCRExtractor): OCR extractor whose cache and templates are saved.
+            data_logger (DataLogger): Logger whose events are saved.
+            interval_sec (float): Wall-clock seconds between checkpoints.
+        """
+        self.path = path
+        self.video_path = os.path.abspath(video_path)
+        self.person_tracker = person_tracker
+        self.ocr_extractor = ocr_extractor
+        self.data_logger = data_logger
+        self.interval_sec = interval_sec
+        self._last_save_time = time.monotonic()
+        self.saves = 0
+        print(f"Checkpointer initialized. File: '{self.path}', every {self.interval_sec:.0f}s")
+
+    def maybe_save(self, frame_idx, last_video_time_sec):
+        """Saves a checkpoint if `interval_sec` has passed since the last one. Call between batches."""
+        if time.monotonic() - self._last_save_time >= self.interval_sec:
+            self.save(frame_idx, last_video_time_sec)
+
+    def save(self, frame_idx, last_video_time_sec):
+        """
+        Writes a checkpoint.
+
+        Args:
+            frame_idx (int): Number of frames read and fully processed.
+            last_video_time_sec (float): Video time of the last of them.
+        """
+        save_start = time.perf_counter()
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "video_path": self.video_path,
+            "saved_at": datetime.now().isoformat(),
+            "frame_idx": frame_idx,
+            "last_video_time_sec": last_video_time_sec,
+            "tracker": self.person_tracker.get_state(),
+            "ocr": self.ocr_extractor.get_state(),
+            "logger": self.data_logger.get_state(),
+        }
+        checkpoint_dir = os.path.dirname(self.path)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with gzip.open(temp_path, 'wb', compresslevel=1) as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except (IOError, OSError) as e:
+            print(f"Error writing checkpoint {self.path}: {e}")
+            return
+        self._last_save_time = time.monotonic()
+        self.saves += 1
+        print(f"Checkpoint saved at frame {frame_idx} (video {last_video_time_sec:.2f}s) "
+              f"in {(time.perf_counter() - save_start) * 1000.0:.0f} ms.")
+
+    def discard(self):
+        """Deletes the checkpoint once the job has finished."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"Warning: Could not delete checkpoint {self.path}: {e}")
+            return
+        print(f"Job finished; checkpoint {self.path} deleted.")
+
+    def restore(self):
+        """
+        Loads the checkpoint and puts the tracker, OCR extractor and logger back into its state.
+        Call before any frame is processed or anything is logged.
+
+        Returns:
+            tuple: (frame_idx, last_video_time_sec) to continue from.
+
+        Raises:
+            FileNotFoundError: If there is no checkpoint.
+            ValueError: If the checkpoint is from another version or another video.
+        """
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No checkpoint to resume from at: {self.path}")
+        with gzip.open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint {self.path} has version {state.get('version')}, expected {CHECKPOINT_VERSION}.")
+        if state["video_path"] != self.video_path:
+            raise ValueError(f"Checkpoint {self.path} belongs to '{state['video_path']}', not '{self.video_path}'.")
+
+        self.person_tracker.set_state(state["tracker"])
+        self.ocr_extractor.set_state(state["ocr"])
+        self.data_logger.set_state(state["logger"])
+        print(f"Resuming from checkpoint saved {state['saved_at']}: frame {state['frame_idx']} "
+              f"(video {state['last_video_time_sec']:.2f}s), {len(self.person_tracker.tracked_persons)} tracked persons.")
+        return state["frame_idx"], state["last_video_time_sec"]
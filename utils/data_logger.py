@@ -1,52 +1,184 @@
+import atexit
 import os
-import pandas as pd
+import queue
+import threading
+import time
+import numpy as np
 from datetime import datetime
+from config import LOG_QUEUE_SIZE, LOG_FLUSH_EVERY, LOG_FLUSH_INTERVAL_SEC, REPORT_FORMATS
+from utils.cctv_time import SECONDS_PER_DAY, format_cctv_time, cctv_date
 
 class DataLogger:
     """
     Manages the storage of event data (IN, OUT, WORKING_START, WORKING_END, ACTIVITY_CHANGE)
     for each person and provides functionality to export this data to a comprehensive CSV file.
     It focuses on logging distinct events and then compiling a final report.
+
+    Text log lines and console messages are handed to a background writer thread through a
+    bounded queue, so logging never performs file or console I/O on the caller's thread. The
+    writer keeps the log file open and flushes it in batches. Call `close()` when done; it is
+    also registered to run at interpreter exit so pending lines are written after a crash.
+
+    With an `event_store`, events are also inserted into it in batches on the writer thread and
+    are no longer kept in `self.events`, so memory stays flat over long runs.
     """
-    def __init__(self, log_file_path, csv_export_path):
+    def __init__(self, log_file_path, csv_export_path, queue_size=LOG_QUEUE_SIZE,
+                 flush_every=LOG_FLUSH_EVERY, flush_interval_sec=LOG_FLUSH_INTERVAL_SEC,
+                 report_formats=REPORT_FORMATS, event_store=None):
         """
         Initializes the DataLogger with paths for a text log file and a CSV export file.
 
         Args:
             log_file_path (str): Path to the text log file for raw event logging.
             csv_export_path (str): Path to the CSV file for exporting the final aggregated report.
+            queue_size (int): Maximum log lines waiting for the writer thread.
+            flush_every (int): Flush the log file after this many lines.
+            flush_interval_sec (float): Flush at least this often while lines are pending.
+            report_formats (tuple): Report outputs written by `export_to_csv`: "csv" and/or "parquet".
+                                    Parquet files are written next to the CSV path.
+            event_store (SQLiteEventStore, optional): Persistent store receiving every event. The
+                                                      logger closes it in `close()`.
         """
         self.log_file_path = log_file_path
         self.csv_export_path = csv_export_path
-        self.events = [] # Stores all raw event data as dictionaries
+        self.event_store = event_store
+        self.events = [] # Stores all raw event data as dictionaries (only without an event store)
+        # Per-person index maintained as events arrive, so the report never rescans `self.events`
+        self._working_periods = {} # person_id -> [(start, end), ...] closed working periods, in CCTV seconds
+        self._open_working_start = {} # person_id -> CCTV seconds of the last unmatched WORKING_START
+        self.flush_every = max(1, flush_every)
+        self.flush_interval_sec = flush_interval_sec
+        self.report_formats = tuple(report_formats)
         
-        # Ensure the directory for logs exists
-        log_dir = os.path.dirname(log_file_path)
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
-        # Clear previous log content on initialization
-        with open(self.log_file_path, 'w') as f:
-            f.write(f"--- Office Tracking Log Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---\n")
+        # The log file is opened (and any previous log cleared) by the writer thread when the
+        # first line is written or the logger is closed, so constructing a logger touches no files
+        self._log_file = None
+        self._started_at = datetime.now()
+        self._resume_log_size = None # Set by `set_state`: length the previous log is cut back to and continued from
+
+        # (log line, console message, event) tuples; None = stop, threading.Event = flush request
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self.queue_full_waits = 0 # Times a caller had to wait because the queue was full
+        self._closed = False
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="DataLoggerWriter", daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
 
         print(f"Data Logger initialized. Text log: '{self.log_file_path}', CSV report: '{self.csv_export_path}'")
 
-    def _write_to_txt_log(self, message):
-        """Internal method to append a timestamped message to the text log file."""
+    def _open_log_file(self):
+        """
+        Creates the log directory if needed, clears the previous log and writes the header.
+        A resumed logger instead keeps the previous log up to the checkpoint and appends to it.
+        """
         try:
-            with open(self.log_file_path, 'a') as f:
-                f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n")
-        except IOError as e:
-            print(f"Error writing to text log file {self.log_file_path}: {e}")
+            log_dir = os.path.dirname(self.log_file_path)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            if self._resume_log_size is not None and os.path.exists(self.log_file_path):
+                self._log_file = open(self.log_file_path, 'r+')
+                self._log_file.truncate(self._resume_log_size)
+                self._log_file.seek(self._resume_log_size)
+                self._log_file.write(f"--- Office Tracking Log Resumed: {self._started_at.strftime('%Y-%m-%d %H:%M:%S')} ---\n")
+                return
+            self._log_file = open(self.log_file_path, 'w')
+            self._log_file.write(f"--- Office Tracking Log Started: {self._started_at.strftime('%Y-%m-%d %H:%M:%S')} ---\n")
+        except (IOError, OSError) as e:
+            print(f"Error opening text log file {self.log_file_path}: {e}")
 
-    def log_event(self, person_id, event_type, cctv_time_str, video_frame_time_sec, details=""):
+    def _writer_loop(self):
+        """Writer thread body: writes queued lines and flushes by count and by interval."""
+        log_opened = False
+        unflushed_lines = 0
+        pending_events = [] # Events waiting for a batched insert into the event store
+        last_flush_time = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval_sec)
+            except queue.Empty:
+                item = False # Nothing new; only check whether a flush is due
+
+            if item is None: # Stop sentinel from `close()`
+                break
+            if isinstance(item, threading.Event): # Flush request from `flush()`
+                self._flush(pending_events)
+                pending_events = []
+                unflushed_lines = 0
+                last_flush_time = time.monotonic()
+                item.set()
+                continue
+            if item:
+                log_line, console_message, event = item
+                if not log_opened:
+                    self._open_log_file()
+                    log_opened = True
+                if self._log_file is not None:
+                    try:
+                        self._log_file.write(log_line)
+                    except (IOError, ValueError) as e:
+                        print(f"Error writing to text log file {self.log_file_path}: {e}")
+                if console_message:
+                    print(console_message)
+                if event is not None and self.event_store is not None:
+                    pending_events.append(event)
+                unflushed_lines += 1
+
+            if unflushed_lines and (unflushed_lines >= self.flush_every or
+                                    time.monotonic() - last_flush_time >= self.flush_interval_sec):
+                self._flush(pending_events)
+                pending_events = []
+                unflushed_lines = 0
+                last_flush_time = time.monotonic()
+
+        if not log_opened: # Nothing was logged; still leave a fresh log for this run
+            self._open_log_file()
+        self._flush(pending_events)
+
+    def _flush(self, pending_events):
+        """Flushes buffered log lines to disk and inserts pending events into the event store."""
+        if self._log_file is not None:
+            try:
+                self._log_file.flush()
+            except (IOError, ValueError) as e:
+                print(f"Error flushing text log file {self.log_file_path}: {e}")
+        if pending_events:
+            try:
+                self.event_store.add_events(pending_events)
+            except Exception as e:
+                print(f"Error writing {len(pending_events)} events to the event store: {e}")
+
+    def _enqueue(self, log_line, console_message=None, event=None):
+        """Hands a log line (and optional console message and event) to the writer thread."""
+        if self._closed:
+            return
+        item = (log_line, console_message, event)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.queue_full_waits += 1
+            self._queue.put(item)
+
+    def flush(self):
+        """Blocks until everything logged so far is written to the log file and the event store."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def _write_to_txt_log(self, message, console_message=None, event=None):
+        """Internal method to append a timestamped message to the text log file."""
+        self._enqueue(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n", console_message, event)
+
+    def log_event(self, person_id, event_type, cctv_seconds, video_frame_time_sec, details=""):
         """
         Records a significant event for a specific person.
 
         Args:
             person_id (str): Unique identifier for the person (e.g., "Person 1").
             event_type (str): Type of event ("IN", "OUT", "WORKING_START", "WORKING_END", "ACTIVITY_CHANGE").
-            cctv_time_str (str): The CCTV timestamp extracted via OCR (e.g., "14:30:05").
+            cctv_seconds (int): The CCTV time extracted via OCR (see `utils.cctv_time`; None if unknown).
+                                It is only formatted as text in the log line and the exports.
             video_frame_time_sec (float): The actual video frame time in seconds when the event occurred.
             details (str, optional): Additional context or details about the event.
         """
@@ -54,16 +186,104 @@ class DataLogger:
             "timestamp_utc": datetime.now().isoformat(), # Timestamp when the event was logged by the system
             "person_id": person_id,
             "event_type": event_type,
-            "cctv_time_str": cctv_time_str,
+            "cctv_seconds": cctv_seconds,
             "video_frame_time_sec": video_frame_time_sec,
             "details": details
         }
-        self.events.append(event_entry)
+        if self.event_store is None:
+            self.events.append(event_entry)
+        self._index_event(event_entry)
+        cctv_time_str = format_cctv_time(cctv_seconds)
         self._write_to_txt_log(
             f"Person {person_id}: Event='{event_type}', CCTV Time='{cctv_time_str}', "
-            f"Video Time='{video_frame_time_sec:.2f}s', Details='{details}'"
+            f"Video Time='{video_frame_time_sec:.2f}s', Details='{details}'",
+            f"Logged Event: Person {person_id}, Type: {event_type}, CCTV Time: {cctv_time_str}",
+            event_entry
         )
-        print(f"Logged Event: Person {person_id}, Type: {event_type}, CCTV Time: {cctv_time_str}")
+
+    def _index_event(self, event):
+        """Updates the per-person working-period index with one event, in logging order."""
+        person_id = event["person_id"]
+        if event["event_type"] == "WORKING_START":
+            self._open_working_start[person_id] = event["cctv_seconds"]
+        elif event["event_type"] == "WORKING_END":
+            start = self._open_working_start.pop(person_id, None)
+            if start is not None:
+                self._working_periods.setdefault(person_id, []).append((start, event["cctv_seconds"]))
+
+    def import_events(self, events):
+        """
+        Appends events recorded by another logger (e.g. a shard worker) and writes them
+        to the text log, keeping their original fields.
+
+        Args:
+            events (list): Event dictionaries in the format produced by `log_event`.
+        """
+        if self.event_store is None:
+            self.events.extend(events)
+        for event in events:
+            self._index_event(event)
+            self._enqueue(
+                f"{datetime.fromisoformat(event['timestamp_utc']).strftime('%Y-%m-%d %H:%M:%S')} - Person {event['person_id']}: "
+                f"Event='{event['event_type']}', CCTV Time='{format_cctv_time(event['cctv_seconds'])}', "
+                f"Video Time='{event['video_frame_time_sec']:.2f}s', Details='{event['details']}'\n",
+                event=event
+            )
+
+    def get_state(self):
+        """
+        Flushes everything logged so far and returns what a resumed logger needs to continue:
+        the events kept in memory, the working-period index, the length of the text log and,
+        with an event store, the run and the last stored event (see `utils.checkpoint`). The
+        state shares objects with the logger, so it must be serialized right away.
+        """
+        self.flush()
+        log_size = None
+        if self._log_file is not None:
+            log_size = self._log_file.tell()
+        state = {
+            "events": self.events,
+            "working_periods": self._working_periods,
+            "open_working_start": self._open_working_start,
+            "log_size": log_size,
+            "event_store_run_id": None,
+            "event_store_last_id": None,
+        }
+        if self.event_store is not None:
+            state["event_store_run_id"] = self.event_store.run_id
+            state["event_store_last_id"] = self.event_store.last_event_id()
+        return state
+
+    def set_state(self, state):
+        """
+        Continues from a state returned by `get_state`. Lines and stored events written after it
+        was taken are discarded, since the resumed run logs them again. Call before logging.
+        """
+        self.events = state["events"]
+        self._working_periods = state["working_periods"]
+        self._open_working_start = state["open_working_start"]
+        self._resume_log_size = state["log_size"]
+        if self.event_store is not None and state["event_store_run_id"] is not None:
+            self.event_store.run_id = state["event_store_run_id"]
+            discarded = self.event_store.discard_events_after(state["event_store_last_id"])
+            if discarded:
+                print(f"Event store: discarded {discarded} events logged after the checkpoint.")
+
+    def close(self):
+        """
+        Writes every pending log line, flushes and closes the log file (and the event store),
+        and stops the writer thread. Safe to call more than once.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer_thread.join()
+        if self._log_file is not None:
+            self._log_file.close()
+        if self.event_store is not None:
+            self.event_store.close()
+        atexit.unregister(self.close)
 
     def export_to_csv(self, tracked_persons):
         """
@@ -71,46 +291,85 @@ class DataLogger:
         information for each person, including their IN/OUT times and total working hours.
         This method takes the final state of `tracked_persons` to ensure up-to-date working times.
 
+        Working periods come from the per-person index built while logging, so the report is
+        built in a single pass over `tracked_persons`. When "parquet" is in `report_formats`,
+        the report and the raw events are also written as Parquet files.
+
         Args:
             tracked_persons (list): The final list of `TrackedPerson` objects from the tracker.
         """
-        data_for_df = []
-        for person in tracked_persons:
-            # Format total working seconds into HH:MM:SS
-            hours, remainder = divmod(int(person.total_working_seconds), 3600)
-            minutes, seconds = divmod(remainder, 60)
-            total_working_formatted = f"{hours:02}:{minutes:02}:{seconds:02}"
-            
-            # Gather all working periods from the raw events for this person
-            working_periods_details = []
-            current_start = None
-            for event in self.events:
-                if event["person_id"] == person.id:
-                    if event["event_type"] == "WORKING_START":
-                        current_start = event["cctv_time_str"]
-                    elif event["event_type"] == "WORKING_END" and current_start is not None:
-                        working_periods_details.append(f"{current_start}-{event['cctv_time_str']}")
-                        current_start = None
-            
-            # If a working session was ongoing when the video ended, add it as 'Ongoing'
-            if person.is_working and person.current_working_session_start_time:
-                 working_periods_details.append(f"{person.current_working_session_start_time}-Ongoing (Video End)")
-
-            data_for_df.append({
-                "Person ID": person.id,
-                "IN Time (CCTV)": person.in_time if person.in_time else "N/A",
-                "OUT Time (CCTV)": person.out_time if person.out_time else "N/A",
-                "Total Working Hours": total_working_formatted,
-                "Working Periods (Start-End)": "; ".join(working_periods_details) if working_periods_details else "N/A"
-            })
-        
-        if not data_for_df:
+        if not tracked_persons:
             print("No data available to export to CSV.")
             return
 
-        df = pd.DataFrame(data_for_df)
+        # Format total working seconds into HH:MM:SS for all persons at once
+        total_seconds = np.array([int(person.total_working_seconds) for person in tracked_persons])
+        hours, remainder = np.divmod(total_seconds, 3600)
+        minutes, seconds = np.divmod(remainder, 60)
+
+        working_periods = []
+        for person in tracked_persons:
+            periods = [f"{format_cctv_time(start)}-{format_cctv_time(end)}"
+                       for start, end in self._working_periods.get(person.id, ())]
+            # If a working session was ongoing when the video ended, add it as 'Ongoing'
+            if person.is_working and person.current_working_session_start_time is not None:
+                periods.append(f"{format_cctv_time(person.current_working_session_start_time)}-Ongoing (Video End)")
+            working_periods.append("; ".join(periods) if periods else "N/A")
+
+        import pandas as pd # Deferred: only needed for the report, not while logging
+
+        df = pd.DataFrame({
+            "Person ID": [person.id for person in tracked_persons],
+            "IN Time (CCTV)": [format_cctv_time(person.in_time) for person in tracked_persons],
+            "OUT Time (CCTV)": [format_cctv_time(person.out_time) for person in tracked_persons],
+            "Total Working Hours": [f"{h:02}:{m:02}:{sec:02}" for h, m, sec in zip(hours, minutes, seconds)],
+            "Working Periods (Start-End)": working_periods,
+        })
+
+        if "csv" in self.report_formats:
+            try:
+                csv_dir = os.path.dirname(self.csv_export_path)
+                if csv_dir:
+                    os.makedirs(csv_dir, exist_ok=True)
+                df.to_csv(self.csv_export_path, index=False)
+                print(f"Aggregated report successfully exported to CSV: '{self.csv_export_path}'")
+            except IOError as e:
+                print(f"Error exporting data to CSV file {self.csv_export_path}: {e}")
+        if "parquet" in self.report_formats:
+            self._export_parquet(df)
+
+    def _export_parquet(self, report_df):
+        """
+        Writes the report and the raw events as Parquet next to the CSV path
+        (`<name>.parquet` and `<name>_events.parquet`). Events carry the overlay date in
+        `cctv_date` and the time of day in `cctv_seconds`. Requires pyarrow.
+        """
+        base_path = os.path.splitext(self.csv_export_path)[0]
+        report_path = f"{base_path}.parquet"
+        events_path = f"{base_path}_events.parquet"
+        if self.event_store is not None:
+            # Events are not kept in memory; read this run's events back from the store, which
+            # already splits each CCTV time into its date and time of day
+            self.flush()
+            events = self.event_store.query_events(camera_id=self.event_store.camera_id, run_id=self.event_store.run_id)
+        else:
+            # Split the same way as the store, so `cctv_seconds` is always the time of day
+            events = [
+                dict(event, cctv_date=cctv_date(event["cctv_seconds"]),
+                     cctv_seconds=None if event["cctv_seconds"] is None else event["cctv_seconds"] % SECONDS_PER_DAY)
+                for event in self.events
+            ]
+        import pandas as pd # Deferred, as in `export_to_csv`
+
+        events_df = pd.DataFrame(events, columns=[
+            "timestamp_utc", "person_id", "event_type", "cctv_date", "cctv_seconds", "video_frame_time_sec", "details"
+        ])
+        events_df.insert(5, "cctv_time_str", [format_cctv_time(event["cctv_seconds"]) for event in events])
         try:
-            df.to_csv(self.csv_export_path, index=False)
-            print(f"Aggregated report successfully exported to CSV: '{self.csv_export_path}'")
-        except IOError as e:
-            print(f"Error exporting data to CSV file {self.csv_export_path}: {e}")
+            report_df.to_parquet(report_path, index=False)
+            events_df.to_parquet(events_path, index=False)
+            print(f"Report and events exported to Parquet: '{report_path}', '{events_path}'")
+        except ImportError:
+            print("Warning: Parquet export requires pyarrow (pip install pyarrow). Skipping Parquet output.")
+        except (IOError, ValueError) as e:
+            print(f"Error exporting Parquet files next to {self.csv_export_path}: {e}")
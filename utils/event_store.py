@@ -0,0 +1,214 @@
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from utils.cctv_time import SECONDS_PER_DAY, parse_cctv_time, format_cctv_time, cctv_date
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    camera_id TEXT NOT NULL,
+    person_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    cctv_date TEXT NOT NULL,
+    cctv_seconds INTEGER,
+    cctv_time_str TEXT,
+    video_frame_time_sec REAL,
+    details TEXT,
+    timestamp_utc TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_camera_type_time ON events (camera_id, event_type, cctv_date, cctv_seconds);
+CREATE INDEX IF NOT EXISTS idx_events_person ON events (run_id, person_id);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (cctv_date, cctv_seconds);
+"""
+
+_EVENT_COLUMNS = (
+    "run_id", "camera_id", "person_id", "event_type", "cctv_date", "cctv_seconds",
+    "cctv_time_str", "video_frame_time_sec", "details", "timestamp_utc"
+)
+
+class SQLiteEventStore:
+    """
+    Persistent event store backed by a local SQLite file.
+
+    Events from every run and camera go into one indexed `events` table, so questions such as
+    "all WORKING_START events for camera X on date Y" are answered by an index lookup instead
+    of re-processing footage or re-parsing text logs. The database runs in WAL mode so readers
+    can query it while a run is writing, and events are inserted in batches (see
+    `DataLogger`, which calls `add_events` from its writer thread).
+
+    Events are filed under the date the overlay showed (`cctv_date`) and their time of day
+    (`cctv_seconds`), so a run past midnight files later events under the next day. Events
+    whose reading had no date fall back to the store's `recording_date`.
+    """
+    def __init__(self, db_path, camera_id="default", recording_date=None, run_id=None, read_only=False):
+        """
+        Opens (or creates) the database.
+
+        Args:
+            db_path (str): SQLite database file.
+            camera_id (str): Camera the events of this store belong to.
+            recording_date (str, optional): ISO date (YYYY-MM-DD) for events whose CCTV time has
+                                            no date. Defaults to today.
+            run_id (str, optional): Identifier of this processing run. Person IDs restart with
+                                    every run, so person queries are scoped by run. Defaults to
+                                    the current local time.
+            read_only (bool): Open an existing database for queries only.
+        """
+        self.db_path = db_path
+        self.camera_id = camera_id
+        self.recording_date = recording_date or datetime.now().date().isoformat()
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d-%H%M%S')
+
+        # Used from the logger's writer thread as well as the thread that created it
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        if read_only:
+            return
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+        print(f"Event Store initialized: '{db_path}' (camera '{self.camera_id}', date {self.recording_date}, run {self.run_id})")
+
+    def add_events(self, events):
+        """
+        Inserts a batch of events in a single transaction.
+
+        Args:
+            events (list): Event dictionaries in the format produced by `DataLogger.log_event`.
+        """
+        if not events:
+            return
+        rows = [
+            (
+                self.run_id, self.camera_id, event["person_id"], event["event_type"],
+                cctv_date(event["cctv_seconds"], self.recording_date),
+                None if event["cctv_seconds"] is None else event["cctv_seconds"] % SECONDS_PER_DAY,
+                format_cctv_time(event["cctv_seconds"]),
+                event["video_frame_time_sec"], event["details"], event["timestamp_utc"],
+            )
+            for event in events
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO events ({', '.join(_EVENT_COLUMNS)}) VALUES ({', '.join('?' * len(_EVENT_COLUMNS))})",
+                    rows
+                )
+
+    def last_event_id(self):
+        """Returns the id of the newest event of this run and camera, or 0 if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM events WHERE run_id = ? AND camera_id = ?", (self.run_id, self.camera_id)
+            ).fetchone()
+        return row[0] or 0
+
+    def discard_events_after(self, event_id):
+        """
+        Deletes the events of this run and camera stored after `event_id`, e.g. the ones logged
+        after the checkpoint a run is resumed from, which the resumed run logs again.
+
+        Returns:
+            int: Number of deleted events.
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "DELETE FROM events WHERE run_id = ? AND camera_id = ? AND id > ?", (self.run_id, self.camera_id, event_id)
+                )
+        return cursor.rowcount
+
+    def query_events(self, camera_id=None, event_type=None, date=None, person_id=None, run_id=None,
+                     start_time=None, end_time=None, limit=None):
+        """
+        Returns stored events matching every given filter, in CCTV time order.
+
+        Args:
+            camera_id (str, optional): Camera to match.
+            event_type (str, optional): Event type to match, e.g. "WORKING_START".
+            date (str, optional): ISO date (from the overlay) to match.
+            person_id (str, optional): Person to match (combine with `run_id`).
+            run_id (str, optional): Run to match.
+            start_time (str, optional): Earliest CCTV time, e.g. "09:00:00 AM".
+            end_time (str, optional): Latest CCTV time.
+            limit (int, optional): Maximum number of rows.
+
+        Returns:
+            list: Event dictionaries with the stored columns.
+
+        Raises:
+            ValueError: If `start_time` or `end_time` is not a valid CCTV time.
+        """
+        conditions, params = [], []
+        for column, value in (("camera_id", camera_id), ("event_type", event_type), ("cctv_date", date),
+                              ("person_id", person_id), ("run_id", run_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        for operator, bound in ((">=", start_time), ("<=", end_time)):
+            if bound is None:
+                continue
+            bound_seconds = parse_cctv_time(bound)
+            if bound_seconds is None:
+                raise ValueError(f"Invalid CCTV time '{bound}'. Expected e.g. '09:00:00 AM'.")
+            # Stored as the time of day; a bound's date is dropped (filter dates with `date`)
+            conditions.append(f"cctv_seconds {operator} ?")
+            params.append(bound_seconds % SECONDS_PER_DAY)
+
+        sql = "SELECT * FROM events"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY cctv_date, cctv_seconds, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def main(argv=None):
+    """Command-line lookup: `python -m utils.event_store logs/events.db --camera X --date Y --type WORKING_START`."""
+    parser = argparse.ArgumentParser(description="Query the office tracking event store.")
+    parser.add_argument("db_path", help="SQLite event store file.")
+    parser.add_argument("--camera", dest="camera_id", help="Camera id.")
+    parser.add_argument("--type", dest="event_type", help="Event type, e.g. WORKING_START.")
+    parser.add_argument("--date", help="Recording date (YYYY-MM-DD).")
+    parser.add_argument("--person", dest="person_id", help="Person id, e.g. 'Person 3'.")
+    parser.add_argument("--run", dest="run_id", help="Run id.")
+    parser.add_argument("--from", dest="start_time", help="Earliest CCTV time, e.g. '09:00:00 AM'.")
+    parser.add_argument("--to", dest="end_time", help="Latest CCTV time.")
+    parser.add_argument("--limit", type=int, help="Maximum number of events.")
+    args = vars(parser.parse_args(argv))
+
+    store = SQLiteEventStore(args.pop("db_path"), read_only=True)
+    try:
+        events = store.query_events(**args)
+    except ValueError as e:
+        parser.error(str(e))
+    for event in events:
+        print(f"{event['cctv_date']} {event['cctv_time_str']} [{event['camera_id']}] {event['person_id']}: "
+              f"{event['event_type']} (run {event['run_id']}, video {event['video_frame_time_sec']:.2f}s) {event['details']}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+
+class FramePrefetcher:
+    """
+    Decodes frames from a `VideoProcessor` on a background thread so that decoding
+    overlaps with OCR and YOLO inference in the main loop.
+
+    Frames are decoded into a fixed pool of preallocated buffers instead of a fresh
+    ndarray per frame. A buffer handed to the consumer stays valid until it is given
+    back with `recycle()`, after which the decode thread reuses it for a later frame.
+    """
+    def __init__(self, video_processor, queue_size=4, pool_size=None, metrics=None):
+        """
+        Initializes the prefetcher. Call `start()` to launch the decode thread.
+
+        Args:
+            video_processor (VideoProcessor): An opened video processor to read frames from.
+            queue_size (int): Maximum number of decoded frames waiting for the consumer.
+            pool_size (int, optional): Number of frame buffers in the pool. Defaults to
+                                       `queue_size + 2` so the decoder can keep working while
+                                       the consumer holds a frame.
+            metrics (PipelineMetrics, optional): Receives the "decode" stage timings.
+        """
+        self.video_processor = video_processor
+        self.queue_size = max(1, queue_size)
+        self.pool_size = max(self.queue_size + 1, pool_size or self.queue_size + 2)
+        self.metrics = metrics
+
+        shape = (video_processor.height, video_processor.width, 3)
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.pool_size)]
+        self._slot_by_buffer_id = {id(buf): slot for slot, buf in enumerate(self._buffers)}
+
+        self._free_slots = queue.Queue()
+        for slot in range(self.pool_size):
+            self._free_slots.put(slot)
+        self._ready = queue.Queue(maxsize=self.queue_size)
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._error = None # Exception that ended the decode thread, re-raised by `read()`
+
+        # --- Statistics ---
+        self.frames_decoded = 0
+        self.total_decode_time_sec = 0.0
+        self.total_wait_time_sec = 0.0 # Time the consumer spent blocked waiting for a frame
+        self._queue_depth_sum = 0
+        self._reads = 0
+
+        print(f"Frame Prefetcher initialized. Queue size: {self.queue_size}, Buffer pool size: {self.pool_size}")
+
+    def start(self):
+        """Starts the background decode thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._decode_loop, name="FramePrefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _decode_loop(self):
+        """
+        Decode thread body: fills free buffers and hands them to the consumer queue. However
+        it exits, it queues the end-of-stream marker so `read()` never waits forever; an
+        exception raised while decoding is kept and re-raised by `read()`.
+        """
+        try:
+            self._decode_frames()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put_ready((False, None, None))
+
+    def _decode_frames(self):
+        """Decodes frames until the stream ends or the prefetcher is stopped."""
+        cap = self.video_processor.cap
+        while not self._stop_event.is_set():
+            try:
+                slot = self._free_slots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            decode_start = time.perf_counter()
+            ret, frame = cap.read(self._buffers[slot])
+            decode_duration = time.perf_counter() - decode_start
+
+            if not ret:
+                self._free_slots.put(slot)
+                return
+
+            # `cap.read` writes into the buffer in place when shape and dtype match.
+            # If the stream changes size mid-way, adopt the new array for this slot.
+            if frame is not self._buffers[slot]:
+                del self._slot_by_buffer_id[id(self._buffers[slot])]
+                self._buffers[slot] = frame
+                self._slot_by_buffer_id[id(frame)] = slot
+
+            frame_time_sec = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            self.frames_decoded += 1
+            self.total_decode_time_sec += decode_duration
+            if self.metrics is not None:
+                self.metrics.record("decode", decode_duration)
+            self._put_ready((True, frame, frame_time_sec))
+
+    def _put_ready(self, item):
+        """Blocks until `item` fits in the ready queue or the prefetcher is stopped."""
+        while not self._stop_event.is_set():
+            try:
+                self._ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self):
+        """
+        Returns the next decoded frame, blocking until one is available.
+
+        Returns:
+            tuple: (ret, frame, frame_time_sec). `ret` is False at the end of the stream.
+                   `frame` is a pooled buffer that must be handed back with `recycle()`.
+                   `frame_time_sec` is the video time of the frame in seconds.
+
+        Raises:
+            Exception: Whatever stopped the decode thread, once the frames decoded before it
+                       have been read.
+        """
+        self._queue_depth_sum += self._ready.qsize()
+        self._reads += 1
+        wait_start = time.perf_counter()
+        ret, frame, frame_time_sec = self._ready.get()
+        self.total_wait_time_sec += time.perf_counter() - wait_start
+        if not ret:
+            # Keep reporting end-of-stream to any further reads
+            self._ready.put((False, None, None))
+            if self._error is not None:
+                raise self._error
+        return ret, frame, frame_time_sec
+
+    def recycle(self, frame):
+        """
+        Returns a frame buffer obtained from `read()` to the pool so it can be reused.
+
+        Args:
+            frame (numpy.ndarray): The buffer to recycle. Arrays not owned by the pool are ignored.
+        """
+        if frame is None:
+            return
+        slot = self._slot_by_buffer_id.get(id(frame))
+        if slot is not None:
+            self._free_slots.put(slot)
+
+    def get_stats(self):
+        """
+        Returns decode statistics.
+
+        Returns:
+            dict: Frames decoded, average decode time per frame (ms), current and average
+                  ready-queue depth, and total time the consumer waited on the decoder (s).
+        """
+        return {
+            "frames_decoded": self.frames_decoded,
+            "avg_decode_ms": (self.total_decode_time_sec / self.frames_decoded * 1000.0) if self.frames_decoded else 0.0,
+            "queue_depth": self._ready.qsize(),
+            "avg_queue_depth": (self._queue_depth_sum / self._reads) if self._reads else 0.0,
+            "consumer_wait_sec": self.total_wait_time_sec,
+        }
+
+    def stop(self):
+        """Stops the decode thread and waits for it to exit."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
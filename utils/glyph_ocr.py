@@ -0,0 +1,231 @@
+import re
+import cv2
+import numpy as np
+
+# Normalized size (width, height) every character cell is resampled to before matching
+TEMPLATE_SIZE = (12, 16)
+
+# The overlay always reads `DD/MM/YYYY HH:MM:SS AM/PM`
+_FULL_TIMESTAMP_PATTERN = re.compile(r'^\d{2}/\d{2}/\d{4} \d{1,2}:\d{2}:\d{2} (?:AM|PM)$')
+
+class GlyphTemplateOCR:
+    """
+    In-process OCR engine for the fixed-font CCTV timestamp overlay.
+
+    The overlay is drawn with a single font, so once each glyph has been seen it can be
+    recognised by template matching instead of running Tesseract. Templates are learned
+    from frames that Tesseract has already read (`learn`), after which `read` segments the
+    binarized ROI into character cells and matches all cells against all templates in one
+    vectorized NumPy operation. No subprocess is involved.
+    """
+    def __init__(self, match_threshold=0.25, min_cell_pixels=3, aspect_weight=0.5):
+        """
+        Initializes an empty template set.
+
+        Args:
+            match_threshold (float): Maximum mean absolute difference (0-1) between a cell and its
+                                     best template for the match to be accepted.
+            min_cell_pixels (int): Column runs with fewer text pixels are treated as noise.
+            aspect_weight (float): Weight of the cell aspect ratio feature, which keeps narrow glyphs
+                                   such as '1' and ':' apart from wide ones after resampling.
+        """
+        self.match_threshold = match_threshold
+        self.min_cell_pixels = min_cell_pixels
+        self.aspect_weight = aspect_weight
+
+        self._template_sums = {} # char -> summed feature vectors
+        self._template_counts = {} # char -> number of samples
+        self._template_chars = []
+        self._template_matrix = None # (num_chars, feature_len), rebuilt when templates change
+
+    def is_ready(self):
+        """Returns True once templates exist for every digit, so any timestamp can be read."""
+        return all(digit in self._template_sums for digit in "0123456789")
+
+    def known_characters(self):
+        """Returns the characters that currently have a template."""
+        return "".join(sorted(self._template_sums))
+
+    def _segment(self, mask):
+        """
+        Splits a binarized text line into character cells using column projection.
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of text pixels (H, W).
+
+        Returns:
+            tuple: (cells, gaps) where `cells` is a list of (x1, x2) column ranges and `gaps`
+                   holds the blank width between consecutive cells.
+        """
+        column_counts = np.count_nonzero(mask, axis=0)
+        occupied = np.concatenate(([False], column_counts > 0, [False]))
+        edges = np.flatnonzero(np.diff(occupied.astype(np.int8)))
+        starts, ends = edges[0::2], edges[1::2]
+
+        cells = [
+            (start, end) for start, end in zip(starts, ends)
+            if column_counts[start:end].sum() >= self.min_cell_pixels
+        ]
+        cells = self._split_touching_cells(cells, column_counts)
+        gaps = [cells[i + 1][0] - cells[i][1] for i in range(len(cells) - 1)]
+        return cells, gaps
+
+    def _split_touching_cells(self, cells, column_counts):
+        """
+        Splits cells that are much wider than a typical character, which happens when
+        neighbouring glyphs touch (e.g. '/0' or 'PM'). Each cut is placed at the emptiest
+        column near its evenly spaced position.
+        """
+        if len(cells) < 3:
+            return cells
+        typical_width = float(np.median([end - start for start, end in cells]))
+        split_cells = []
+        for start, end in cells:
+            parts = int(round((end - start) / typical_width))
+            if (end - start) < 1.5 * typical_width or parts < 2:
+                split_cells.append((start, end))
+                continue
+            cuts = []
+            for k in range(1, parts):
+                ideal = start + k * (end - start) // parts
+                lo, hi = max(start + 1, ideal - 2), min(end - 1, ideal + 3)
+                cuts.append(lo + int(np.argmin(column_counts[lo:hi])) if hi > lo else ideal)
+            bounds = [start] + cuts + [end]
+            split_cells.extend((bounds[i], bounds[i + 1]) for i in range(parts))
+        return split_cells
+
+    def _words(self, mask):
+        """Segments the mask and groups its cells into words, split at the wide gaps."""
+        cells, gaps = self._segment(mask)
+        if not cells:
+            return []
+        words = [[cells[0]]]
+        median_gap = np.median(gaps) if gaps else 0
+        for cell, gap in zip(cells[1:], gaps):
+            if gap > 2 * median_gap:
+                words.append([])
+            words[-1].append(cell)
+        return words
+
+    def seconds_columns(self, mask):
+        """
+        Locates the two seconds digits of the overlay. Only segments the mask, so it works
+        before any template has been learned.
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of text pixels for the ROI.
+
+        Returns:
+            tuple: (x1, x2) column range of the seconds digits, or None if the mask does not
+                   segment into `DD/MM/YYYY H[H]:MM:SS AM/PM`.
+        """
+        if not mask.any():
+            return None
+        words = self._words(mask)
+        if len(words) != 3 or len(words[0]) != 10 or len(words[1]) not in (7, 8) or len(words[2]) != 2:
+            return None
+        seconds = words[1][-2:]
+        return int(seconds[0][0]), int(seconds[1][1])
+
+    def _cell_features(self, mask, cells):
+        """
+        Resamples every cell to `TEMPLATE_SIZE` and stacks them into a feature matrix.
+        All cells share the vertical extent of the whole text line so that the position of
+        '/' and ':' within the line is preserved.
+
+        Returns:
+            numpy.ndarray: (num_cells, feature_len) float32 matrix.
+        """
+        rows = np.flatnonzero(mask.any(axis=1))
+        y1, y2 = rows[0], rows[-1] + 1
+        line = mask[y1:y2].astype(np.float32)
+        line_height = float(y2 - y1)
+
+        features = np.empty((len(cells), TEMPLATE_SIZE[0] * TEMPLATE_SIZE[1] + 1), dtype=np.float32)
+        for i, (x1, x2) in enumerate(cells):
+            cell = cv2.resize(line[:, x1:x2], TEMPLATE_SIZE, interpolation=cv2.INTER_AREA)
+            features[i, :-1] = cell.ravel()
+            features[i, -1] = self.aspect_weight * (x2 - x1) / line_height
+        return features
+
+    def learn(self, mask, text):
+        """
+        Learns glyph templates from a frame whose text is already known (e.g. read by Tesseract).
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of text pixels for the ROI.
+            text (str): The full overlay text, e.g. "16/08/2025 02:41:08 PM".
+
+        Returns:
+            bool: True if the frame segmented into exactly one cell per character and was learned.
+        """
+        if not text or not _FULL_TIMESTAMP_PATTERN.match(text) or not mask.any():
+            return False
+        chars = text.replace(" ", "")
+        cells, _ = self._segment(mask)
+        if len(cells) != len(chars):
+            return False
+
+        features = self._cell_features(mask, cells)
+        for char, feature in zip(chars, features):
+            if char in self._template_sums:
+                self._template_sums[char] += feature
+                self._template_counts[char] += 1
+            else:
+                self._template_sums[char] = feature.copy()
+                self._template_counts[char] = 1
+        self._template_matrix = None
+        return True
+
+    def get_state(self):
+        """Returns the learned templates, for `set_state` (see `utils.checkpoint`)."""
+        return {"sums": dict(self._template_sums), "counts": dict(self._template_counts)}
+
+    def set_state(self, state):
+        """Restores templates saved with `get_state`."""
+        self._template_sums = dict(state["sums"])
+        self._template_counts = dict(state["counts"])
+        self._template_matrix = None
+
+    def _templates(self):
+        """Returns the (chars, matrix) pair of averaged templates, rebuilding it if needed."""
+        if self._template_matrix is None:
+            self._template_chars = sorted(self._template_sums)
+            self._template_matrix = np.stack([
+                self._template_sums[char] / self._template_counts[char] for char in self._template_chars
+            ])
+        return self._template_chars, self._template_matrix
+
+    def read(self, mask):
+        """
+        Reads the overlay text by matching every character cell against the learned templates.
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of text pixels for the ROI.
+
+        Returns:
+            str: The full overlay text (e.g. "16/08/2025 02:41:08 PM"), or None if a cell has no
+                 confident match or the result does not form a valid timestamp.
+        """
+        if not self._template_sums or not mask.any():
+            return None
+        cells, gaps = self._segment(mask)
+        if not cells:
+            return None
+
+        chars, templates = self._templates()
+        features = self._cell_features(mask, cells)
+        # Mean absolute difference of every cell against every template: (num_cells, num_templates)
+        distances = np.abs(features[:, None, :] - templates[None, :, :]).mean(axis=2)
+        best = distances.argmin(axis=1)
+        if distances[np.arange(len(cells)), best].max() > self.match_threshold:
+            return None
+
+        # Word breaks are the gaps clearly wider than the spacing between characters
+        space_after = np.zeros(len(cells), dtype=bool)
+        if gaps:
+            gaps = np.asarray(gaps)
+            space_after[:-1] = gaps > 2 * np.median(gaps)
+
+        text = "".join(chars[b] + (" " if space else "") for b, space in zip(best, space_after))
+        return text if _FULL_TIMESTAMP_PATTERN.match(text) else None
@@ -0,0 +1,240 @@
+import threading
+import time
+import cv2
+import numpy as np
+from config import LIVE_RECONNECT_DELAY_SEC, LIVE_RECONNECT_MAX_DELAY_SEC
+
+def is_stream_url(video_path):
+    """Returns True if `video_path` is a camera URL (rtsp://, http://, ...) rather than a local file."""
+    return isinstance(video_path, str) and "://" in video_path
+
+class LiveFrameSource:
+    """
+    Captures a live stream on a background thread and always hands the processing loop the
+    newest frame, so latency stays bounded when processing is slower than the camera.
+
+    Only one captured frame waits for the consumer; when a newer one arrives first, the waiting
+    frame is dropped (latest frame wins). Frames are stamped with their arrival time, in seconds
+    since `start()` on the monotonic clock, which the pipeline uses as the video time; the
+    wall-clock arrival time is `started_at + frame_time_sec`. A stream that stops delivering
+    frames is reopened with exponential backoff until `stop()` is called.
+
+    With `replay=True` a local video file stands in for a camera: frames are released at the
+    file's native frame rate, independent of how fast they are consumed, and the end of the
+    file ends the stream.
+
+    Has the same interface as `FramePrefetcher` (`start`, `read`, `recycle`, `get_stats`,
+    `stop`); buffers come from a fixed pool and go back to it with `recycle()`.
+    """
+    def __init__(self, video_processor, pool_size=4, replay=None, metrics=None,
+                 reconnect_delay_sec=LIVE_RECONNECT_DELAY_SEC, reconnect_max_delay_sec=LIVE_RECONNECT_MAX_DELAY_SEC):
+        """
+        Initializes the source. Call `start()` to launch the capture thread.
+
+        Args:
+            video_processor (VideoProcessor): An opened video processor; its capture is replaced
+                                              on reconnect.
+            pool_size (int): Number of frame buffers; must cover every frame the consumer holds
+                             at once plus the waiting and the capturing frame.
+            replay (bool, optional): Pace a local file at its native fps. Defaults to True unless
+                                     the video path is a stream URL.
+            metrics (PipelineMetrics, optional): Receives the "decode" stage timings.
+            reconnect_delay_sec (float): First wait before reopening a dropped stream.
+            reconnect_max_delay_sec (float): Upper bound of the doubling reconnect wait.
+        """
+        self.video_processor = video_processor
+        self.replay = not is_stream_url(video_processor.video_path) if replay is None else replay
+        self.pool_size = max(3, pool_size)
+        self.metrics = metrics
+        self.reconnect_delay_sec = reconnect_delay_sec
+        self.reconnect_max_delay_sec = reconnect_max_delay_sec
+
+        shape = (video_processor.height, video_processor.width, 3)
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.pool_size)]
+        self._slot_by_buffer_id = {id(buf): slot for slot, buf in enumerate(self._buffers)}
+        self._free_slots = list(range(self.pool_size))
+        self._scratch = np.empty(shape, dtype=np.uint8) # Captured into when the consumer holds every buffer
+
+        self._latest = None # (slot, frame, frame_time_sec) waiting for the consumer
+        self._ended = False
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_monotonic = None
+        self.started_at = None # Wall-clock time of `start()`
+
+        # --- Statistics ---
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.total_decode_time_sec = 0.0
+        self.total_wait_time_sec = 0.0 # Time the consumer spent blocked waiting for a frame
+
+        mode = "file replay at native fps" if self.replay else "live stream"
+        print(f"Live Frame Source initialized ({mode}). Buffer pool size: {self.pool_size}")
+
+    def start(self):
+        """Starts the capture thread; frame times count from now."""
+        if self._thread is None:
+            self._start_monotonic = time.monotonic()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._capture_loop, name="LiveFrameSource", daemon=True)
+            self._thread.start()
+        return self
+
+    def clock(self):
+        """Seconds since `start()`, on the clock the frame times are stamped with."""
+        return time.monotonic() - self._start_monotonic
+
+    def _take_slot(self):
+        """Returns a free buffer slot, or None if the consumer holds every buffer."""
+        with self._condition:
+            return self._free_slots.pop() if self._free_slots else None
+
+    def _capture_loop(self):
+        """Capture thread body: reads frames as they arrive and publishes the newest one."""
+        replay_position_sec = None # Video time of the first replayed frame
+        while not self._stop_event.is_set():
+            slot = self._take_slot()
+            buffer = self._scratch if slot is None else self._buffers[slot]
+
+            decode_start = time.perf_counter()
+            ret, frame = self.video_processor.cap.read(buffer)
+            decode_duration = time.perf_counter() - decode_start
+
+            if not ret:
+                if slot is not None:
+                    with self._condition:
+                        self._free_slots.append(slot)
+                if self.replay or not self._reconnect():
+                    break
+                continue
+
+            self.frames_captured += 1
+            self.total_decode_time_sec += decode_duration
+            if self.metrics is not None:
+                self.metrics.record("decode", decode_duration)
+
+            if self.replay:
+                # Hold the frame until its time in the file has come, like a camera would
+                position_sec = self.video_processor.get_current_time_seconds()
+                if replay_position_sec is None:
+                    replay_position_sec = position_sec
+                if self._stop_event.wait(max(0.0, position_sec - replay_position_sec - self.clock())):
+                    break
+            frame_time_sec = self.clock()
+
+            if slot is None:
+                # Nowhere to keep it: the consumer is still holding every buffer
+                with self._condition:
+                    self.frames_dropped += 1
+                continue
+
+            # `cap.read` writes into the buffer in place when shape and dtype match.
+            # If the stream changes size mid-way, adopt the new array for this slot.
+            if frame is not self._buffers[slot]:
+                del self._slot_by_buffer_id[id(self._buffers[slot])]
+                self._buffers[slot] = frame
+                self._slot_by_buffer_id[id(frame)] = slot
+                self._scratch = np.empty_like(frame)
+
+            with self._condition:
+                if self._latest is not None:
+                    # The previous frame was never picked up; the newer one replaces it
+                    self._free_slots.append(self._latest[0])
+                    self.frames_dropped += 1
+                self._latest = (slot, frame, frame_time_sec)
+                self._condition.notify()
+
+        with self._condition:
+            self._ended = True
+            self._condition.notify_all()
+
+    def _reconnect(self):
+        """
+        Reopens the stream with exponential backoff.
+
+        Returns:
+            bool: True once reconnected, False if the source was stopped first.
+        """
+        delay = self.reconnect_delay_sec
+        video_path = self.video_processor.video_path
+        while True:
+            print(f"Warning: Lost stream '{video_path}'. Reconnecting in {delay:.1f}s...")
+            self.video_processor.cap.release()
+            if self._stop_event.wait(delay):
+                return False
+            cap = cv2.VideoCapture(video_path)
+            if cap.isOpened():
+                self.video_processor.cap = cap
+                self.reconnects += 1
+                print(f"Reconnected to '{video_path}' (reconnect #{self.reconnects}).")
+                return True
+            cap.release()
+            delay = min(delay * 2, self.reconnect_max_delay_sec)
+
+    def read(self):
+        """
+        Returns the newest captured frame, blocking until one arrives.
+
+        Returns:
+            tuple: (ret, frame, frame_time_sec). `ret` is False once the stream has ended or the
+                   source was stopped or interrupted. `frame` is a pooled buffer that must be handed back with
+                   `recycle()`. `frame_time_sec` is its arrival time in seconds since `start()`.
+        """
+        wait_start = time.perf_counter()
+        with self._condition:
+            while self._latest is None and not self._ended and not self._stop_event.is_set():
+                self._condition.wait(0.1)
+            latest, self._latest = self._latest, None
+        self.total_wait_time_sec += time.perf_counter() - wait_start
+        if latest is None or self._stop_event.is_set():
+            self.recycle(latest[1] if latest else None)
+            return False, None, None
+        _, frame, frame_time_sec = latest
+        return True, frame, frame_time_sec
+
+    def recycle(self, frame):
+        """
+        Returns a frame buffer obtained from `read()` to the pool so it can be reused.
+
+        Args:
+            frame (numpy.ndarray): The buffer to recycle. Arrays not owned by the pool are ignored.
+        """
+        if frame is None:
+            return
+        slot = self._slot_by_buffer_id.get(id(frame))
+        if slot is not None:
+            with self._condition:
+                self._free_slots.append(slot)
+
+    def get_stats(self):
+        """
+        Returns capture statistics.
+
+        Returns:
+            dict: Frames captured and dropped, the drop rate, reconnects, average decode time per
+                  frame (ms) and total time the consumer waited for a new frame (s).
+        """
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_dropped": self.frames_dropped,
+            "drop_rate": (self.frames_dropped / self.frames_captured) if self.frames_captured else 0.0,
+            "reconnects": self.reconnects,
+            "avg_decode_ms": (self.total_decode_time_sec / self.frames_captured * 1000.0) if self.frames_captured else 0.0,
+            "consumer_wait_sec": self.total_wait_time_sec,
+        }
+
+    def interrupt(self):
+        """
+        Ends the stream for the consumer: the next `read()` returns end-of-stream, even while the
+        source is waiting to reconnect. Does not block, so it can be called from a signal handler.
+        """
+        self._stop_event.set()
+
+    def stop(self):
+        """Stops the capture thread and waits for it to exit."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
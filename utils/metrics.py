@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from config import METRICS_WINDOW, METRICS_FPS_WINDOW_SEC, METRICS_EXPORT_INTERVAL_SEC
+
+# Pipeline stages in processing order, used to order reports
+STAGES = ("decode", "motion_gate", "ocr", "detection", "tracking", "classification", "zones", "annotation", "encode",
+          "latency") # "latency": live feeds only, frame arrival to end of processing
+
+class _StageStats:
+    """Recent durations of one stage plus its all-time count and total."""
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total_sec = 0.0
+
+class PipelineMetrics:
+    """
+    Collects per-stage timings and the processed frame rate of one camera.
+
+    Stages record their durations with `record`, from any thread.
+    Percentiles are computed over the most recent `window` samples of each stage, the rolling FPS
+    over the last `fps_window_sec` seconds. Counts and totals cover the whole run.
+    One-off component startup times are kept separately (see `startup_timer`).
+    """
+    def __init__(self, camera_id="default", window=METRICS_WINDOW, fps_window_sec=METRICS_FPS_WINDOW_SEC):
+        """
+        Args:
+            camera_id (str): Camera name reported with every metric.
+            window (int): Samples kept per stage for the percentiles.
+            fps_window_sec (float): Time span of the rolling FPS.
+        """
+        self.camera_id = camera_id
+        self.window = max(1, window)
+        self.fps_window_sec = fps_window_sec
+        self._stages = {}
+        self._frame_times = deque()
+        self.startup = {} # component -> seconds spent constructing / loading it
+        self.frames_processed = 0
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, stage, duration_sec):
+        """Adds one duration (seconds) to `stage`."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats(self.window)
+            stats.recent.append(duration_sec)
+            stats.count += 1
+            stats.total_sec += duration_sec
+
+    @contextmanager
+    def startup_timer(self, component):
+        """Times the enclosed block as the startup of `component` (e.g. `with metrics.startup_timer("detector"):`)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_startup(component, time.perf_counter() - start)
+
+    def record_startup(self, component, duration_sec):
+        """Adds `duration_sec` to the startup time of `component`."""
+        with self._lock:
+            self.startup[component] = self.startup.get(component, 0.0) + duration_sec
+
+    def frame_done(self):
+        """Marks one frame as fully processed, for the frame counter and the rolling FPS."""
+        now = time.monotonic()
+        with self._lock:
+            self.frames_processed += 1
+            self._frame_times.append(now)
+            while self._frame_times and now - self._frame_times[0] > self.fps_window_sec:
+                self._frame_times.popleft()
+
+    def rolling_fps(self):
+        """Frames per second over the last `fps_window_sec` seconds."""
+        with self._lock:
+            if len(self._frame_times) < 2:
+                return 0.0
+            span = self._frame_times[-1] - self._frame_times[0]
+            return (len(self._frame_times) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """
+        Returns the current metrics.
+
+        Returns:
+            dict: Camera ID, frames processed, rolling FPS, per-component startup seconds and, per
+                  stage, the sample count, total seconds, mean and p50/p95/p99 durations (ms) over
+                  the recent window.
+        """
+        with self._lock:
+            startup = dict(self.startup)
+            stages = {name: (np.array(stats.recent, dtype=np.float64), stats.count, stats.total_sec)
+                      for name, stats in self._stages.items()}
+        stage_report = {}
+        for name in sorted(stages, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s)):
+            recent, count, total_sec = stages[name]
+            p50, p95, p99 = np.percentile(recent, (50, 95, 99)) * 1000.0 if len(recent) else (0.0, 0.0, 0.0)
+            stage_report[name] = {
+                "count": count,
+                "total_sec": total_sec,
+                "mean_ms": float(recent.mean() * 1000.0) if len(recent) else 0.0,
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+            }
+        return {
+            "camera_id": self.camera_id,
+            "frames_processed": self.frames_processed,
+            "rolling_fps": self.rolling_fps(),
+            "uptime_sec": time.time() - self.start_time,
+            "startup_sec": startup,
+            "stages": stage_report,
+        }
+
+    def print_summary(self):
+        """Prints one line per stage with its percentiles."""
+        snapshot = self.snapshot()
+        if snapshot["startup_sec"]:
+            print(f"Startup ({sum(snapshot['startup_sec'].values()):.2f}s): " +
+                  ", ".join(f"{name} {sec:.2f}s" for name, sec in snapshot["startup_sec"].items()))
+        print(f"Stage timings ({snapshot['frames_processed']} frames, rolling {snapshot['rolling_fps']:.1f} FPS):")
+        for name, stage in snapshot["stages"].items():
+            print(f"  {name:<15} n={stage['count']:<7} mean {stage['mean_ms']:7.2f} ms  p50 {stage['p50_ms']:7.2f}  "
+                  f"p95 {stage['p95_ms']:7.2f}  p99 {stage['p99_ms']:7.2f}  total {stage['total_sec']:.2f}s")
+
+def _escape_label(value):
+    """Escapes a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def to_prometheus(snapshots):
+    """
+    Renders metric snapshots (from `PipelineMetrics.snapshot`) in the Prometheus text format.
+    Stage durations are a summary: quantiles over the recent window, sum and count over the run.
+
+    Args:
+        snapshots (list): One snapshot per camera.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines = [
+        "# HELP cctv_stage_duration_seconds Processing time per pipeline stage.",
+        "# TYPE cctv_stage_duration_seconds summary",
+    ]
+    for snapshot in snapshots:
+        camera = _escape_label(snapshot["camera_id"])
+        for name, stage in snapshot["stages"].items():
+            labels = f'camera="{camera}",stage="{_escape_label(name)}"'
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'cctv_stage_duration_seconds{{{labels},quantile="{quantile}"}} {stage[key] / 1000.0:.6f}')
+            lines.append(f"cctv_stage_duration_seconds_sum{{{labels}}} {stage['total_sec']:.6f}")
+            lines.append(f"cctv_stage_duration_seconds_count{{{labels}}} {stage['count']}")
+    lines += ["# HELP cctv_fps Processed frames per second over the recent window.", "# TYPE cctv_fps gauge"]
+    lines += [f'cctv_fps{{camera="{_escape_label(s["camera_id"])}"}} {s["rolling_fps"]:.3f}' for s in snapshots]
+    lines += ["# HELP cctv_startup_seconds Time spent starting each pipeline component.", "# TYPE cctv_startup_seconds gauge"]
+    lines += [f'cctv_startup_seconds{{camera="{_escape_label(s["camera_id"])}",component="{_escape_label(name)}"}} {sec:.6f}'
+              for s in snapshots for name, sec in s["startup_sec"].items()]
+    lines += ["# HELP cctv_frames_processed_total Frames processed since start.",
+              "# TYPE cctv_frames_processed_total counter"]
+    lines += [f'cctv_frames_processed_total{{camera="{_escape_label(s["camera_id"])}"}} {s["frames_processed"]}'
+              for s in snapshots]
+    return "\n".join(lines) + "\n"
+
+def _write_atomically(path, text):
+    """Writes `text` to `path` through a temporary file, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+class MetricsExporter:
+    """
+    Periodically writes the metrics of one or more cameras as a JSON snapshot and/or a
+    Prometheus text file (e.g. into node-exporter's textfile collector directory).
+    """
+    def __init__(self, metrics_list, json_path=None, prometheus_path=None, interval_sec=METRICS_EXPORT_INTERVAL_SEC):
+        """
+        Args:
+            metrics_list (list): `PipelineMetrics` objects to export.
+            json_path (str, optional): JSON snapshot file.
+            prometheus_path (str, optional): Prometheus text file; node-exporter only reads `*.prom` files.
+            interval_sec (float): Seconds between two writes.
+        """
+        self.metrics_list = list(metrics_list)
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.interval_sec = interval_sec
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the export thread (no-op without any output path)."""
+        if self._thread is None and (self.json_path or self.prometheus_path):
+            self._thread = threading.Thread(target=self._export_loop, name="MetricsExporter", daemon=True)
+            self._thread.start()
+            print(f"Metrics export every {self.interval_sec:.0f}s: "
+                  f"{', '.join(p for p in (self.json_path, self.prometheus_path) if p)}")
+        return self
+
+    def _export_loop(self):
+        """Export thread body."""
+        while not self._stop_event.wait(self.interval_sec):
+            self.export()
+
+    def export(self):
+        """Writes the current metrics to every configured file."""
+        snapshots = [metrics.snapshot() for metrics in self.metrics_list]
+        try:
+            if self.json_path:
+                _write_atomically(self.json_path, json.dumps({"timestamp": time.time(), "cameras": snapshots}, indent=2))
+            if self.prometheus_path:
+                _write_atomically(self.prometheus_path, to_prometheus(snapshots))
+        except (IOError, OSError) as e:
+            print(f"Error writing metrics: {e}")
+
+    def stop(self):
+        """Stops the thread and writes a final export."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        if self.json_path or self.prometheus_path:
+            self.export()
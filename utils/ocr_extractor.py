@@ -1,23 +1,66 @@
 import cv2
-import pytesseract
 import re
-from PIL import Image
 import numpy as np # Import numpy for array operations
-from config import OCR_ROI, TESSERACT_CMD
+from config import (
+    OCR_ROI, TESSERACT_CMD, OCR_CACHE_ENABLED, OCR_CACHE_DIFF_THRESHOLD,
+    OCR_CACHE_MAX_TICK_CHANGE, OCR_CACHE_RESYNC_TICKS, OCR_ENGINE, OCR_GLYPH_VALIDATE_EVERY
+)
+from utils.glyph_ocr import GlyphTemplateOCR
+from utils.cctv_time import SECONDS_PER_DAY, parse_cctv_time, attach_cctv_date, cctv_day_start
+
+# Matches a complete 12-hour clock reading such as "16/08/2025 02:41:08 PM" or "02:41:08 PM"
+_TIME_WITH_SECONDS_PATTERN = re.compile(r'^(?:\d{2}/\d{2}/\d{4} )?(\d{1,2}):(\d{2}):(\d{2}) (AM|PM)$')
 
 class OCRExtractor:
     """
     Handles the extraction of timestamp text from a specified region of interest (ROI)
     in a video frame using OCR (Pytesseract).
     """
-    def __init__(self):
+    def __init__(self, engine=OCR_ENGINE, roi=OCR_ROI, recording_date=None):
         """
-        Initializes the OCRExtractor with the predefined OCR_ROI from config.py
-        and sets the tesseract command path.
+        Initializes the OCRExtractor with the predefined OCR_ROI from config.py.
+        pytesseract is imported and pointed at TESSERACT_CMD on the first Tesseract read.
+
+        Args:
+            engine (str): "tesseract" to read every changed overlay with Tesseract, or "glyph" to
+                          use the in-process glyph-template engine, with Tesseract bootstrapping,
+                          validating and backing it up.
+            roi (tuple): (x1, y1, x2, y2) region holding the timestamp overlay.
+            recording_date (str, optional): ISO date of the footage (defaults to today). Readings
+                                            taken before the overlay's date was first read are
+                                            dated from it.
         """
-        self.roi = OCR_ROI
-        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-        print(f"OCR Extractor initialized. ROI: {self.roi}, Tesseract CMD: {TESSERACT_CMD}")
+        if engine not in ("tesseract", "glyph"):
+            raise ValueError(f"Unknown OCR engine '{engine}'. Expected 'tesseract' or 'glyph'.")
+        self.roi = tuple(roi)
+        self.engine = engine
+
+        # --- OCR engines ---
+        self.glyph_engine = GlyphTemplateOCR() if engine == "glyph" else None
+        self._segmenter = self.glyph_engine or GlyphTemplateOCR() # Locates the seconds digits; needs no templates
+        self._glyph_reads_since_validation = 0
+        self._glyph_announced = False
+        self.glyph_reads = 0
+        self.tesseract_reads = 0
+        self.glyph_mismatches = 0 # Validation reads where Tesseract disagreed with the glyph engine
+
+        # --- Change-detection cache ---
+        # The overlay only changes once a second, so the last OCR result is reused while
+        # the binarized ROI stays the same.
+        self.cache_enabled = OCR_CACHE_ENABLED
+        self._cached_fingerprint = None
+        self._cached_time = None
+        self._last_tick_frame_time_sec = None # Video time at which the cached reading first appeared
+        self._last_tick_is_exact = False # False until a change in the overlay has been observed
+        self._seconds_columns = None # (x1, x2) of the seconds digits in the cached reading
+        self._ticks_since_full_ocr = 0
+        # Last reading with a date (at first midnight of the recording date); dates readings without one
+        self._last_dated_time = cctv_day_start(recording_date)
+
+        self.cache_hits = 0 # Overlay unchanged, cached time returned
+        self.predicted_hits = 0 # Overlay ticked, cached time + 1s accepted without OCR
+        self.cache_misses = 0 # Full OCR run (glyph engine or Tesseract)
+        print(f"OCR Extractor initialized. ROI: {self.roi}, Engine: {self.engine}, Tesseract CMD: {TESSERACT_CMD}, Change cache: {'on' if self.cache_enabled else 'off'}")
 
     def _preprocess_image_for_ocr(self, image_roi):
         """
@@ -47,23 +90,233 @@ class OCRExtractor:
 
         return thresh
 
-    def extract_time(self, frame):
+    def _text_mask(self, image_roi, smooth=True):
         """
-        Extracts the timestamp string from the specified ROI in the given frame using OCR.
-        It specifically looks for a `DD/MM/YYYY HH:MM:SS AM/PM` pattern and then extracts
-        the `HH:MM:SS AM/PM` portion.
+        Cheaply binarizes the ROI into a mask of text pixels with a single Otsu threshold,
+        skipping the expensive denoising used for Tesseract.
+
+        Args:
+            image_roi (numpy.ndarray): The cropped ROI.
+            smooth (bool): Apply a small median blur first. This keeps sensor noise from flipping
+                           pixels between otherwise identical frames, but can erase thin strokes,
+                           so the glyph engine reads the unsmoothed mask.
+
+        Returns:
+            numpy.ndarray: Boolean mask of the text pixels.
+        """
+        gray = cv2.cvtColor(image_roi, cv2.COLOR_BGR2GRAY)
+        if smooth:
+            gray = cv2.medianBlur(gray, 3)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        mask = binary > 0
+        # Text covers less of the ROI than the background, whichever polarity the overlay uses
+        if np.count_nonzero(mask) > mask.size // 2:
+            mask = ~mask
+        return mask
+
+    def _fingerprint_roi(self, image_roi):
+        """Computes the binarized fingerprint of the ROI used for change detection."""
+        return self._text_mask(image_roi, smooth=True)
+
+    def _fingerprint_change(self, fingerprint):
+        """
+        Returns the fraction of text pixels that differ from the cached fingerprint.
+        Measured against the text area rather than the whole ROI, so a single changed
+        digit is clearly visible above sensor noise.
+        """
+        if self._cached_fingerprint is None or self._cached_fingerprint.shape != fingerprint.shape:
+            return 1.0
+        text_pixels = np.count_nonzero(fingerprint | self._cached_fingerprint)
+        return np.count_nonzero(fingerprint ^ self._cached_fingerprint) / max(1, text_pixels)
+
+    def _seconds_span(self):
+        """Returns the (x1, x2) columns of the cached seconds digits, padded because smoothing can move a stroke edge by a pixel."""
+        x1, x2 = self._seconds_columns
+        return max(0, x1 - 1), x2 + 1
+
+    def _seconds_change(self, fingerprint):
+        """
+        Returns the fraction of the seconds digits' text pixels that differ from the cached
+        fingerprint. A tick redraws one or two of the ~20 glyphs, which is only a few percent of
+        the whole overlay and can drown in the `_fingerprint_change` noise allowance; measured
+        on the seconds digits alone it is a large change.
+        """
+        if self._seconds_columns is None or self._cached_fingerprint is None or self._cached_fingerprint.shape != fingerprint.shape:
+            return 1.0
+        x1, x2 = self._seconds_span()
+        current, cached = fingerprint[:, x1:x2], self._cached_fingerprint[:, x1:x2]
+        return np.count_nonzero(current ^ cached) / max(1, np.count_nonzero(current | cached))
+
+    def _verify_advanced_guess(self, fingerprint, change_fraction, frame_time_sec):
+        """
+        Decides whether a change in the overlay can be accepted as a plain one-second tick.
+
+        The guess is accepted when the change is small, it happened about one second of video
+        after the previous tick, a full OCR resync is not yet due, and the changed pixels lie
+        in the seconds digits of the cached reading (`GlyphTemplateOCR.seconds_columns`). A
+        minute or hour rollover, or anything else drawn over the overlay, changes pixels
+        elsewhere and is read with full OCR. This checks where the overlay changed, not which
+        digit it now shows; with the glyph engine, `_glyph_confirms` also reads the new time.
+        """
+        if frame_time_sec is None or self._last_tick_frame_time_sec is None or self._seconds_columns is None:
+            return False
+        if change_fraction > OCR_CACHE_MAX_TICK_CHANGE:
+            return False
+        if self._ticks_since_full_ocr >= OCR_CACHE_RESYNC_TICKS:
+            return False
+        elapsed = frame_time_sec - self._last_tick_frame_time_sec
+        # Right after a full OCR the reading may have been taken anywhere inside the second
+        min_elapsed = 0.5 if self._last_tick_is_exact else 0.0
+        if not min_elapsed < elapsed <= 1.5:
+            return False
+
+        changed = fingerprint ^ self._cached_fingerprint
+        x1, x2 = self._seconds_span()
+        changed_outside = np.count_nonzero(changed[:, :x1]) + np.count_nonzero(changed[:, x2:])
+        text_pixels = np.count_nonzero(fingerprint | self._cached_fingerprint)
+        return (self._seconds_change(fingerprint) > OCR_CACHE_DIFF_THRESHOLD
+                and changed_outside <= OCR_CACHE_DIFF_THRESHOLD * text_pixels)
+
+    def _update_cache(self, fingerprint, cctv_time, frame_time_sec, tick_is_exact, seconds_columns=None):
+        """
+        Stores a new cached reading (a CCTV time), or clears the cache if it is None.
+        `seconds_columns` is given after a full OCR; predicted ticks keep the known position.
+        """
+        if cctv_time is not None:
+            self._cached_fingerprint = fingerprint
+            self._cached_time = cctv_time
+            self._last_tick_frame_time_sec = frame_time_sec
+            self._last_tick_is_exact = tick_is_exact
+            if seconds_columns is not None:
+                self._seconds_columns = seconds_columns
+        else:
+            self._cached_fingerprint = None
+            self._cached_time = None
+            self._last_tick_frame_time_sec = None
+            self._last_tick_is_exact = False
+            self._seconds_columns = None
+
+    # Attributes saved by `get_state`: the change cache, glyph validation progress and statistics
+    _STATE_ATTRIBUTES = (
+        "_cached_fingerprint", "_cached_time", "_last_tick_frame_time_sec", "_last_tick_is_exact",
+        "_seconds_columns", "_ticks_since_full_ocr", "_last_dated_time", "_glyph_reads_since_validation", "_glyph_announced", "glyph_reads",
+        "tesseract_reads", "glyph_mismatches", "cache_hits", "predicted_hits", "cache_misses",
+    )
+
+    def get_state(self):
+        """
+        Returns the change cache, the learned glyph templates and the statistics, so a resumed
+        run neither re-bootstraps the glyph engine nor loses its cached reading (see `utils.checkpoint`).
+        """
+        state = {name: getattr(self, name) for name in self._STATE_ATTRIBUTES}
+        state["glyph_engine"] = self.glyph_engine.get_state() if self.glyph_engine is not None else None
+        return state
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`."""
+        for name in self._STATE_ATTRIBUTES:
+            setattr(self, name, state[name])
+        if self.glyph_engine is not None and state["glyph_engine"] is not None:
+            self.glyph_engine.set_state(state["glyph_engine"])
+
+    def get_cache_stats(self):
+        """
+        Returns change-detection cache counters.
+
+        Returns:
+            dict: Unchanged-overlay hits, predicted one-second ticks, full OCR misses and hit rate,
+                  plus how the misses were served (glyph engine vs Tesseract).
+        """
+        total = self.cache_hits + self.predicted_hits + self.cache_misses
+        return {
+            "cache_hits": self.cache_hits,
+            "predicted_hits": self.predicted_hits,
+            "cache_misses": self.cache_misses,
+            "hit_rate": ((self.cache_hits + self.predicted_hits) / total) if total else 0.0,
+            "glyph_reads": self.glyph_reads,
+            "tesseract_reads": self.tesseract_reads,
+            "glyph_mismatches": self.glyph_mismatches,
+        }
+
+    def extract_time(self, frame, frame_time_sec=None):
+        """
+        Extracts the CCTV time from the specified ROI in the given frame using OCR.
+        It specifically looks for a `DD/MM/YYYY HH:MM:SS AM/PM` pattern and parses it once
+        into an integer CCTV time that keeps the date (see `utils.cctv_time`). A reading whose
+        date could not be read gets the date of the last reading that had one, or the recording
+        date before any had.
+
+        While the overlay is unchanged the cached reading is returned without running OCR.
+        When it changes by what looks like a one-second tick, the cached time is advanced by
+        one second instead. Full OCR only runs when neither shortcut applies.
 
         Args:
             frame (numpy.ndarray): The current video frame.
+            frame_time_sec (float, optional): The video time of the frame in seconds. Needed to
+                                              verify predicted ticks; without it every change
+                                              in the overlay triggers a full OCR.
 
         Returns:
-            str: The extracted time string (e.g., "02:41:08 PM"), 
-                 or "N/A" if extraction fails or is invalid.
+            int: The CCTV time (seconds since 1970-01-01 on the camera's clock; see
+                 `utils.cctv_time`), or None if extraction fails or is invalid.
+        """
+        image_roi = self._crop_roi(frame)
+        if image_roi is None:
+            return None
+
+        if not self.cache_enabled:
+            self.cache_misses += 1
+            return self._read_time(self._ocr_roi(image_roi))
+
+        fingerprint = self._fingerprint_roi(image_roi)
+        change_fraction = self._fingerprint_change(fingerprint)
+
+        if self._cached_time is not None:
+            # Unchanged only if the seconds digits are unchanged too; a tick is a small share of the whole overlay
+            if change_fraction <= OCR_CACHE_DIFF_THRESHOLD and self._seconds_change(fingerprint) <= OCR_CACHE_DIFF_THRESHOLD:
+                self.cache_hits += 1
+                return self._cached_time
+
+            if self._verify_advanced_guess(fingerprint, change_fraction, frame_time_sec):
+                advanced_time = self._cached_time + 1
+                if self._glyph_confirms(image_roi, advanced_time):
+                    self.predicted_hits += 1
+                    self._ticks_since_full_ocr += 1
+                    self._update_cache(fingerprint, advanced_time, frame_time_sec, tick_is_exact=True)
+                    return advanced_time
+
+        self.cache_misses += 1
+        time_str = self._ocr_roi(image_roi)
+        cctv_time = self._read_time(time_str)
+        # A full OCR that lands on a new reading right after a change marks an exact tick
+        tick_is_exact = self._cached_time is not None and cctv_time != self._cached_time
+        self._ticks_since_full_ocr = 0
+        # Only readings down to the second, whose seconds digits can be located, are advanced by predicted ticks
+        seconds_columns = None
+        if _TIME_WITH_SECONDS_PATTERN.match(time_str):
+            seconds_columns = self._segmenter.seconds_columns(self._text_mask(image_roi, smooth=False))
+        self._update_cache(fingerprint, cctv_time if seconds_columns is not None else None,
+                           frame_time_sec, tick_is_exact, seconds_columns)
+        return cctv_time
+
+    def _read_time(self, time_str):
+        """Parses a full OCR reading, dating it from the last dated reading if it has no date."""
+        parsed_time = parse_cctv_time(time_str)
+        if parsed_time is not None and parsed_time >= SECONDS_PER_DAY:
+            self._last_dated_time = parsed_time
+        return attach_cctv_date(parsed_time, self._last_dated_time)
+
+    def _crop_roi(self, frame):
+        """
+        Validates the configured ROI and crops it out of the frame.
+
+        Returns:
+            numpy.ndarray: The cropped ROI, or None if the ROI is invalid or empty.
         """
         # Validate OCR_ROI configuration
         if not (isinstance(self.roi, tuple) and len(self.roi) == 4 and all(isinstance(x, int) for x in self.roi)):
             print(f"Error: OCR_ROI is not correctly defined as (x1, y1, x2, y2) in config.py. Current: {self.roi}")
-            return "N/A"
+            return None
 
         x1, y1, x2, y2 = self.roi
         
@@ -72,18 +325,87 @@ class OCRExtractor:
         x1 = max(0, x1)
         y1 = max(0, y1)
         x2 = min(w, x2)
-        y2 = min(h, h) # Ensure y2 is within frame height
+        y2 = min(h, y2) # Ensure y2 is within frame height
 
         if x2 <= x1 or y2 <= y1:
             print(f"Warning: Invalid OCR_ROI coordinates: {self.roi}. Ensure x2 > x1 and y2 > y1 and within frame bounds (W:{w}, H:{h}).")
-            return "N/A"
+            return None
 
         # Crop the frame to the defined ROI for targeted OCR
         image_roi = frame[y1:y2, x1:x2]
 
         if image_roi.size == 0:
             print(f"Warning: Cropped image ROI is empty for coordinates: {self.roi}. Skipping OCR.")
-            return "N/A"
+            return None
+
+        return image_roi
+
+    def _ocr_roi(self, image_roi):
+        """
+        Reads the time from a cropped ROI with the configured OCR engine.
+
+        With the glyph engine, a confident template match is returned directly and Tesseract
+        is only run while templates are still being learned, when the match fails, or every
+        `OCR_GLYPH_VALIDATE_EVERY` reads to validate the templates.
+
+        Args:
+            image_roi (numpy.ndarray): The cropped ROI.
+
+        Returns:
+            str: The extracted time string, or "N/A" if extraction fails.
+        """
+        glyph_text = None
+        if self.glyph_engine is not None:
+            mask = self._text_mask(image_roi, smooth=False)
+            if self.glyph_engine.is_ready():
+                glyph_text = self.glyph_engine.read(mask)
+                if glyph_text is not None:
+                    self.glyph_reads += 1
+                    self._glyph_reads_since_validation += 1
+                    if self._glyph_reads_since_validation < OCR_GLYPH_VALIDATE_EVERY:
+                        return self._time_from_text(glyph_text)
+
+        self.tesseract_reads += 1
+        cleaned_text = self._run_tesseract(image_roi)
+        if cleaned_text is None:
+            # A failed validation read does not discard the glyph read; validation is retried next read
+            return self._time_from_text(glyph_text) if glyph_text is not None else "N/A"
+
+        if self.glyph_engine is not None:
+            self._glyph_reads_since_validation = 0
+            if glyph_text is not None and glyph_text != cleaned_text:
+                self.glyph_mismatches += 1
+            # Tesseract is the reference: every read refines the templates
+            if self.glyph_engine.learn(mask, cleaned_text) and not self._glyph_announced and self.glyph_engine.is_ready():
+                self._glyph_announced = True
+                print(f"Glyph OCR engine ready after {self.tesseract_reads} Tesseract reads. Known characters: '{self.glyph_engine.known_characters()}'")
+        return self._time_from_text(cleaned_text)
+
+    def _glyph_confirms(self, image_roi, cctv_time):
+        """
+        Checks a predicted CCTV time against the glyph engine, when it is available.
+
+        Returns:
+            bool: False only if the glyph engine read the overlay and disagrees with `cctv_time`.
+        """
+        if self.glyph_engine is None or not self.glyph_engine.is_ready():
+            return True
+        glyph_text = self.glyph_engine.read(self._text_mask(image_roi, smooth=False))
+        if glyph_text is None:
+            return True
+        return attach_cctv_date(parse_cctv_time(self._time_from_text(glyph_text)), self._last_dated_time) == cctv_time
+
+    def _run_tesseract(self, image_roi):
+        """
+        Runs the full preprocessing and Tesseract OCR on a cropped ROI.
+
+        Returns:
+            str: The cleaned OCR text (possibly empty), or None if Tesseract failed.
+        """
+        # Deferred: with the glyph engine and the change cache, many runs never need Tesseract
+        import pytesseract
+        from PIL import Image
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 
         # Preprocess the cropped image to optimize for OCR
         preprocessed_image = self._preprocess_image_for_ocr(image_roi)
@@ -102,29 +424,38 @@ class OCRExtractor:
             full_text = pytesseract.image_to_string(pil_image, config=tesseract_config)
             
             # Clean up the extracted text: remove newlines, extra spaces, and leading/trailing whitespace
-            cleaned_text = full_text.replace('\n', ' ').strip()
-            
-            # Use a robust regular expression to find the full date and time pattern:
-            # DD/MM/YYYY HH:MM:SS AM/PM
-            # Then extract only the time part (HH:MM:SS AM/PM)
-            # Regex breakdown:
-            # \d{2}/\d{2}/\d{4} : Matches DD/MM/YYYY
-            # \s             : Matches a single space
-            # \d{1,2}:\d{2}:\d{2} : Matches HH:MM:SS (1 or 2 digits for hour)
-            # \s             : Matches a single space
-            # (?:AM|PM)      : Matches AM or PM (non-capturing group)
-            full_timestamp_match = re.search(r'\d{2}/\d{2}/\d{4}\s(\d{1,2}:\d{2}:\d{2}\s(?:AM|PM))', cleaned_text)
-            
-            if full_timestamp_match:
-                return full_timestamp_match.group(1) # Return only the time part
-            else:
-                # If the full pattern isn't found, try to find just a robust time pattern (HH:MM:SS AM/PM or HH:MM AM/PM)
-                time_only_match = re.search(r'(\d{1,2}:\d{2}:\d{2}|\d{1,2}:\d{2})\s(?:AM|PM)', cleaned_text)
-                if time_only_match:
-                    return time_only_match.group(0) # Return the full time string including AM/PM
-                else:
-                    return cleaned_text if cleaned_text else "N/A" # Fallback
+            return full_text.replace('\n', ' ').strip()
         except Exception as e:
             # Catch any exceptions during OCR (e.g., Tesseract not found, image issues)
             print(f"Error during OCR extraction: {e}")
-            return "N/A"
\ No newline at end of file
+            return None
+
+    def _time_from_text(self, cleaned_text):
+        """
+        Extracts the `DD/MM/YYYY HH:MM:SS AM/PM` timestamp from OCR text, or only its
+        `HH:MM:SS AM/PM` portion if the date was not read.
+
+        Returns:
+            str: The timestamp or time string, the raw text if no time pattern is found, or "N/A"
+                 if the text is empty.
+        """
+        # Use a robust regular expression to find the full date and time pattern:
+        # DD/MM/YYYY HH:MM:SS AM/PM
+        # The date is kept, so times stay ordered across midnight (see `utils.cctv_time`)
+        # Regex breakdown:
+        # \d{2}/\d{2}/\d{4} : Matches DD/MM/YYYY
+        # \s             : Matches a single space
+        # \d{1,2}:\d{2}:\d{2} : Matches HH:MM:SS (1 or 2 digits for hour)
+        # \s             : Matches a single space
+        # (?:AM|PM)      : Matches AM or PM (non-capturing group)
+        full_timestamp_match = re.search(r'(\d{2}/\d{2}/\d{4})\s(\d{1,2}:\d{2}:\d{2})\s(AM|PM)', cleaned_text)
+        
+        if full_timestamp_match:
+            return " ".join(full_timestamp_match.groups()) # Date and time, single-spaced
+        else:
+            # If the full pattern isn't found, try to find just a robust time pattern (HH:MM:SS AM/PM or HH:MM AM/PM)
+            time_only_match = re.search(r'(\d{1,2}:\d{2}:\d{2}|\d{1,2}:\d{2})\s(?:AM|PM)', cleaned_text)
+            if time_only_match:
+                return time_only_match.group(0) # Return the full time string including AM/PM
+            else:
+                return cleaned_text if cleaned_text else "N/A" # Fallback
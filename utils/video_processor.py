@@ -1,24 +1,52 @@
 import cv2
 import numpy as np
 import os
-from config import OCR_ROI, IN_ZONE, OUT_ZONE, DRAW_BBOX, DRAW_LABELS, DRAW_TIME, DRAW_DEBUG_ZONES
-# Import the helper function from the tracker module
-from models.tracker import _calculate_time_difference_in_seconds 
+from config import (
+    OCR_ROI, IN_ZONE, OUT_ZONE, DRAW_BBOX, DRAW_LABELS, DRAW_TIME, DRAW_DEBUG_ZONES,
+    VIDEO_WRITER_BACKEND, VIDEO_WRITER_QUEUE_SIZE, FFMPEG_PATH, FFMPEG_PRESET, FFMPEG_CRF, LIVE_DEFAULT_FPS
+)
+from utils.video_writer import AsyncVideoWriter, OpenCVBackend, FFmpegPipeBackend
+from utils.cctv_time import cctv_time_difference, format_cctv_time
+from utils.live_source import is_stream_url
 
 class VideoProcessor:
     """
     Provides utility functions for loading videos, drawing annotations on frames,
     and saving processed videos. This class is responsible for all visual output.
     """
-    def __init__(self, video_path, output_path=None):
+    def __init__(self, video_path, output_path=None, in_zone=IN_ZONE, out_zone=OUT_ZONE, ocr_roi=OCR_ROI,
+                 writer_backend=VIDEO_WRITER_BACKEND, output_frame_step=1, metrics=None):
         """
-        Initializes the VideoProcessor by opening the video file.
+        Initializes the VideoProcessor by opening the video file or camera stream.
 
         Args:
-            video_path (str): Path to the input video file.
+            video_path (str): Path to the input video file, or an RTSP/HTTP camera URL.
             output_path (str, optional): Path to save the processed video. If None, video won't be saved.
+            in_zone (tuple): (x1, y1, x2, y2) IN zone drawn as a debug overlay.
+            out_zone (tuple): (x1, y1, x2, y2) OUT zone drawn as a debug overlay.
+            ocr_roi (tuple): (x1, y1, x2, y2) timestamp region; the CCTV time label is drawn above it.
+            writer_backend (str): "opencv" (mp4v) or "ffmpeg" (libx264 through an ffmpeg pipe).
+            output_frame_step (int): Only every N-th input frame is written (frame skip without
+                                     writing skipped frames); the output frame rate is divided
+                                     by N so the video keeps its duration.
+            metrics (PipelineMetrics, optional): Receives the "encode" stage timings.
         """
-        if not os.path.exists(video_path):
+        self.in_zone = tuple(in_zone)
+        self.out_zone = tuple(out_zone)
+        self.ocr_roi = tuple(ocr_roi)
+        self.metrics = metrics
+
+        # --- Annotation rendering state (see `draw_annotations`) ---
+        self._render_buffer = None # Reused output buffer when not drawing in place
+        self._overlay_shape = None # Frame shape the static overlay was built for
+        self._overlay_index = None
+        self._overlay_colors = None
+        self._overlay_blend_index = None
+        self._overlay_blend_colors = None
+        self._overlay_background_weight = None
+
+        self.video_path = video_path
+        if not is_stream_url(video_path) and not os.path.exists(video_path):
             raise FileNotFoundError(f"Error: Video file not found at: {video_path}")
         
         self.cap = cv2.VideoCapture(video_path)
@@ -27,23 +55,50 @@ class VideoProcessor:
 
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        # Some camera streams report no frame rate
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or LIVE_DEFAULT_FPS
         self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
         print(f"Video loaded: '{video_path}'")
         print(f"Resolution: {self.width}x{self.height}, FPS: {self.fps}, Frames: {self.frame_count}")
 
         self.writer = None
+        self.writer_backend = None
         if output_path:
-            # Define the codec for the output video (e.g., MP4V for .mp4, XVID for .avi)
-            # 'mp4v' is a good cross-platform choice for .mp4 files.
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
-            self.writer = cv2.VideoWriter(output_path, fourcc, self.fps, (self.width, self.height))
-            if not self.writer.isOpened():
+            # Skipped frames may be left out of the output; keep its duration by lowering the rate
+            output_fps = self.fps / max(1, output_frame_step)
+            self.writer = self._open_writer(output_path, output_fps, writer_backend)
+            if self.writer is None:
                 print(f"Warning: Could not open video writer for {output_path}. Output video will not be saved.")
-                self.writer = None # Reset writer if it failed to open
             else:
-                print(f"Output video writer initialized for: '{output_path}'")
+                print(f"Output video writer initialized for: '{output_path}' (backend: {self.writer_backend}, {output_fps:.2f} FPS)")
+
+    def _open_writer(self, output_path, output_fps, backend):
+        """
+        Opens an `AsyncVideoWriter` with the requested backend, falling back to OpenCV if
+        ffmpeg is unavailable.
+
+        Returns:
+            AsyncVideoWriter: The writer, or None if no backend could be opened.
+        """
+        frame_size = (self.width, self.height)
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        if backend == 'ffmpeg':
+            try:
+                encoder = FFmpegPipeBackend(output_path, output_fps, frame_size, FFMPEG_PRESET, FFMPEG_CRF, FFMPEG_PATH)
+                self.writer_backend = 'ffmpeg'
+                return AsyncVideoWriter(encoder, VIDEO_WRITER_QUEUE_SIZE, self.metrics)
+            except IOError as e:
+                print(f"Warning: {e}. Falling back to the OpenCV video writer.")
+        try:
+            # 'mp4v' is a good cross-platform choice for .mp4 files.
+            encoder = OpenCVBackend(output_path, output_fps, frame_size, 'mp4v')
+        except IOError:
+            return None
+        self.writer_backend = 'opencv'
+        return AsyncVideoWriter(encoder, VIDEO_WRITER_QUEUE_SIZE, self.metrics)
 
     def read_frame(self):
         """
@@ -55,6 +110,18 @@ class VideoProcessor:
         """
         return self.cap.read()
 
+    def seek_frame(self, frame_number):
+        """
+        Positions the video so the next read returns the given frame.
+
+        Args:
+            frame_number (int): 0-based index of the next frame to read.
+
+        Returns:
+            bool: True if the capture backend accepted the new position.
+        """
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+
     def get_current_frame_number(self):
         """Returns the current frame number (1-indexed)."""
         return int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
@@ -63,43 +130,90 @@ class VideoProcessor:
         """Returns the current video time in seconds."""
         return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
 
-    def draw_annotations(self, frame, tracked_persons, ocr_time):
+    def _build_static_overlay(self, frame_shape):
+        """
+        Renders the parts of the annotation that never change (IN/OUT zones with their labels
+        and the OCR ROI box) once, and stores them as flat pixel indices, premultiplied colours
+        and per-pixel background weights so they can be blended onto each frame without redrawing.
+        """
+        # Drawing on black and on white recovers each pixel's coverage, so anti-aliased
+        # label edges blend with the frame exactly as if they were drawn on it
+        on_black = np.zeros(frame_shape, dtype=np.uint8)
+        on_white = np.full(frame_shape, 255, dtype=np.uint8)
+        for layer in (on_black, on_white):
+            if DRAW_TIME and DRAW_DEBUG_ZONES:
+                # Rectangle around the OCR ROI
+                cv2.rectangle(layer, (self.ocr_roi[0], self.ocr_roi[1]), (self.ocr_roi[2], self.ocr_roi[3]), (0, 255, 255), 1)
+            if DRAW_DEBUG_ZONES:
+                # IN_ZONE
+                cv2.rectangle(layer, (self.in_zone[0], self.in_zone[1]), (self.in_zone[2], self.in_zone[3]), (0, 255, 0), 2)
+                cv2.putText(layer, "IN Zone", (self.in_zone[0] + 5, self.in_zone[1] + 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1, cv2.LINE_AA)
+
+                # OUT_ZONE
+                cv2.rectangle(layer, (self.out_zone[0], self.out_zone[1]), (self.out_zone[2], self.out_zone[3]), (0, 0, 255), 2)
+                cv2.putText(layer, "OUT Zone", (self.out_zone[0] + 5, self.out_zone[1] + 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1, cv2.LINE_AA)
+
+        flat_black = on_black.reshape(-1, 3)
+        flat_white = on_white.reshape(-1, 3)
+        covered = (flat_black != 0).any(axis=1) | (flat_white != 255).any(axis=1)
+        opaque = covered & (flat_black == flat_white).all(axis=1)
+        # Fully covered pixels are copied; only anti-aliased edge pixels need blending
+        self._overlay_index = np.flatnonzero(opaque)
+        self._overlay_colors = flat_black[self._overlay_index]
+        self._overlay_blend_index = np.flatnonzero(covered & ~opaque)
+        self._overlay_blend_colors = flat_black[self._overlay_blend_index].astype(np.uint16)
+        # Weight of the underlying frame at each blended pixel, scaled to 0-255
+        self._overlay_background_weight = (
+            flat_white[self._overlay_blend_index].astype(np.uint16) - self._overlay_blend_colors
+        )
+        self._overlay_shape = frame_shape
+
+    def draw_annotations(self, frame, tracked_persons, ocr_time, in_place=False):
         """
         Draws all necessary annotations on the frame:
         - OCR-extracted CCTV time
         - Debug zones (IN_ZONE, OUT_ZONE, OCR_ROI) if enabled
         - Bounding boxes, IDs, activity, IN/OUT times, and accumulated working time for each person.
 
+        The constant zones and ROI box come from a precomputed overlay, and nothing is allocated
+        per frame: drawing happens on `frame` itself (`in_place=True`) or on a reusable buffer
+        that is overwritten by the next call.
+
         Args:
             frame (numpy.ndarray): The frame to draw on.
             tracked_persons (list): List of `TrackedPerson` objects currently being tracked.
-            ocr_time (str): The current CCTV timestamp extracted via OCR.
+            ocr_time (int): The current CCTV time (see `utils.cctv_time`), or None if OCR failed.
+            in_place (bool): Draw directly on `frame`. Use when the raw frame is not needed afterwards.
+
+        Returns:
+            numpy.ndarray: The annotated frame (`frame` itself, or the reusable buffer).
         """
-        # Create a copy to draw on, so the original frame remains untouched
-        annotated_frame = frame.copy()
+        if in_place and frame.flags.c_contiguous:
+            annotated_frame = frame
+        else:
+            # Copy into the reusable buffer, so the original frame remains untouched
+            if self._render_buffer is None or self._render_buffer.shape != frame.shape:
+                self._render_buffer = np.empty_like(frame)
+            np.copyto(self._render_buffer, frame)
+            annotated_frame = self._render_buffer
 
         # --- Draw OCR extracted time ---
         if DRAW_TIME:
-            # Position the OCR time label slightly above the OCR_ROI or at a fixed position
-            text_pos = (OCR_ROI[0], OCR_ROI[1] - 10 if OCR_ROI[1] > 20 else 10)
-            cv2.putText(annotated_frame, f"CCTV Time: {ocr_time}", text_pos,
+            # Position the OCR time label slightly above the OCR ROI or at a fixed position
+            text_pos = (self.ocr_roi[0], self.ocr_roi[1] - 10 if self.ocr_roi[1] > 20 else 10)
+            cv2.putText(annotated_frame, f"CCTV Time: {format_cctv_time(ocr_time)}", text_pos,
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
-            # Draw a rectangle around the OCR_ROI for visualization if debug zones are enabled
-            if DRAW_DEBUG_ZONES:
-                cv2.rectangle(annotated_frame, (OCR_ROI[0], OCR_ROI[1]), (OCR_ROI[2], OCR_ROI[3]), (0, 255, 255), 1)
-
 
-        # --- Draw debug zones if enabled ---
-        if DRAW_DEBUG_ZONES:
-            # IN_ZONE
-            cv2.rectangle(annotated_frame, (IN_ZONE[0], IN_ZONE[1]), (IN_ZONE[2], IN_ZONE[3]), (0, 255, 0), 2)
-            cv2.putText(annotated_frame, "IN Zone", (IN_ZONE[0] + 5, IN_ZONE[1] + 20),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1, cv2.LINE_AA)
-            
-            # OUT_ZONE
-            cv2.rectangle(annotated_frame, (OUT_ZONE[0], OUT_ZONE[1]), (OUT_ZONE[2], OUT_ZONE[3]), (0, 0, 255), 2)
-            cv2.putText(annotated_frame, "OUT Zone", (OUT_ZONE[0] + 5, OUT_ZONE[1] + 20),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1, cv2.LINE_AA)
+        # --- Stamp the static zones / ROI overlay ---
+        if self._overlay_shape != annotated_frame.shape:
+            self._build_static_overlay(annotated_frame.shape)
+        flat_frame = annotated_frame.reshape(-1, 3)
+        flat_frame[self._overlay_index] = self._overlay_colors
+        if len(self._overlay_blend_index):
+            background = flat_frame[self._overlay_blend_index] * self._overlay_background_weight
+            flat_frame[self._overlay_blend_index] = self._overlay_blend_colors + (background + 127) // 255
 
         # --- Draw annotations for each tracked person ---
         for person in tracked_persons:
@@ -112,9 +226,9 @@ class VideoProcessor:
             color = (0, 255, 0) # Default green for tracked persons
             if person.is_working:
                 color = (0, 255, 128) # Orange for 'working' (sitting)
-            elif person.in_time and not person.out_time: 
+            elif person.in_time is not None and person.out_time is None:
                 color = (255, 0, 0) # Blue for persons who have entered but not yet exited
-            elif person.out_time:
+            elif person.out_time is not None:
                 color = (0, 0, 255) # Red for persons who have exited
 
             # Draw bounding box
@@ -126,18 +240,16 @@ class VideoProcessor:
                 label_lines = [f"ID: {person.id}"]
                 label_lines.append(f"Activity: {person.activity.upper()}") # Show current activity
 
-                if person.in_time:
-                    label_lines.append(f"IN: {person.in_time}")
-                if person.out_time:
-                    label_lines.append(f"OUT: {person.out_time}")
+                if person.in_time is not None:
+                    label_lines.append(f"IN: {format_cctv_time(person.in_time)}")
+                if person.out_time is not None:
+                    label_lines.append(f"OUT: {format_cctv_time(person.out_time)}")
                 
                 # Show accumulated working time if person has any
                 # Need to calculate current ongoing session duration for display if person is_working
                 display_total_working_seconds = person.total_working_seconds
-                if person.is_working and person.current_working_session_start_time and ocr_time != "N/A":
-                    current_session_duration = _calculate_time_difference_in_seconds(
-                        person.current_working_session_start_time, ocr_time
-                    )
+                if person.is_working and person.current_working_session_start_time is not None and ocr_time is not None:
+                    current_session_duration = cctv_time_difference(person.current_working_session_start_time, ocr_time)
                     display_total_working_seconds += current_session_duration # Add ongoing session duration for display
                     
                 if display_total_working_seconds > 0:
@@ -158,19 +270,25 @@ class VideoProcessor:
 
         return annotated_frame
 
-    def write_frame(self, frame):
+    def write_frame(self, frame, release=None):
         """
-        Writes the processed frame to the output video if a writer is initialized.
+        Queues the processed frame for the output video if a writer is initialized.
+        Encoding happens on the writer thread.
 
         Args:
-            frame (numpy.ndarray): The frame to write.
+            frame (numpy.ndarray): The frame to write. It must not be modified until `release` is called.
+            release (callable, optional): Called with the frame once it is no longer needed, i.e.
+                                          after encoding, or immediately when there is no writer.
         """
         if self.writer:
-            self.writer.write(frame)
+            self.writer.write(frame, release)
+        elif release is not None:
+            release(frame)
 
     def release(self):
         """
         Releases the video capture and writer objects to free up resources.
+        Frames still queued for encoding are written first.
         """
         if self.cap:
             self.cap.release()
@@ -0,0 +1,187 @@
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import cv2
+
+class OpenCVBackend:
+    """Encodes with `cv2.VideoWriter` (default codec 'mp4v')."""
+    def __init__(self, output_path, fps, frame_size, fourcc='mp4v'):
+        """
+        Args:
+            output_path (str): Output video path.
+            fps (float): Output frame rate.
+            frame_size (tuple): (width, height).
+            fourcc (str): Four-character codec code.
+
+        Raises:
+            IOError: If the writer cannot be opened.
+        """
+        self._writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+        if not self._writer.isOpened():
+            raise IOError(f"Could not open OpenCV video writer for {output_path}")
+
+    def write(self, frame):
+        self._writer.write(frame)
+
+    def close(self):
+        self._writer.release()
+
+class FFmpegPipeBackend:
+    """
+    Pipes raw BGR frames into a local `ffmpeg` process that encodes them with libx264.
+    Gives much smaller files than 'mp4v' at a similar CPU cost with a fast preset.
+    """
+    def __init__(self, output_path, fps, frame_size, preset='veryfast', crf=23, ffmpeg_path='ffmpeg'):
+        """
+        Args:
+            output_path (str): Output video path.
+            fps (float): Output frame rate.
+            frame_size (tuple): (width, height).
+            preset (str): x264 preset, from 'ultrafast' (fastest, largest) to 'veryslow'.
+            crf (int): x264 constant rate factor; lower is higher quality (18-28 is typical).
+            ffmpeg_path (str): ffmpeg executable.
+
+        Raises:
+            IOError: If ffmpeg cannot be found or started.
+        """
+        executable = shutil.which(ffmpeg_path)
+        if executable is None:
+            raise IOError(f"ffmpeg executable not found: '{ffmpeg_path}'")
+        width, height = frame_size
+        command = [
+            executable, '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{fps}', '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+            output_path,
+        ]
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        except OSError as e:
+            raise IOError(f"Could not start ffmpeg: {e}")
+
+    def write(self, frame):
+        # Pooled frames are C-contiguous, so this hands the buffer to the pipe without a copy
+        self._process.stdin.write(memoryview(frame).cast('B') if frame.flags.c_contiguous else frame.tobytes())
+
+    def close(self):
+        """
+        Raises:
+            IOError: If ffmpeg exited with an error, e.g. it could not write the output file.
+        """
+        try:
+            self._process.stdin.close()
+        finally:
+            self._process.wait()
+        if self._process.returncode != 0:
+            raise IOError(f"ffmpeg exited with code {self._process.returncode}; the output video may be incomplete")
+
+class AsyncVideoWriter:
+    """
+    Encodes frames on a dedicated writer thread so encoding does not block the frame loop.
+
+    Frames are queued by reference, not copied. `write` accepts a `release` callback that is
+    called once the frame has been encoded, so pooled buffers (see `FramePrefetcher.recycle`)
+    are only reused after the encoder is done with them.
+    """
+    def __init__(self, backend, queue_size=8, metrics=None):
+        """
+        Initializes the writer and starts its thread.
+
+        Args:
+            backend (OpenCVBackend | FFmpegPipeBackend): Encoder receiving the frames.
+            queue_size (int): Maximum frames waiting to be encoded. When full, `write` blocks.
+            metrics (PipelineMetrics, optional): Receives the "encode" stage timings.
+        """
+        self.backend = backend
+        self.metrics = metrics
+        self.queue_size = max(1, queue_size)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self.error = None
+
+        # --- Statistics ---
+        self.frames_written = 0 # Frames the backend accepted
+        self.frames_failed = 0 # Frames not written: the failed write and every frame dropped after it
+        self.total_encode_time_sec = 0.0
+        self.max_encode_time_sec = 0.0
+        self.total_wait_time_sec = 0.0 # Time the frame loop spent blocked on a full queue
+        self._queue_depth_sum = 0
+        self._writes = 0
+
+        self._thread = threading.Thread(target=self._writer_loop, name="AsyncVideoWriter", daemon=True)
+        self._thread.start()
+
+    def _writer_loop(self):
+        """Writer thread body: encodes queued frames in order until the stop sentinel."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, release = item
+            if self.error is None:
+                encode_start = time.perf_counter()
+                try:
+                    self.backend.write(frame)
+                except Exception as e:
+                    self.error = e
+                    print(f"Error encoding video frame: {e}. Further frames will be dropped.")
+                else:
+                    encode_duration = time.perf_counter() - encode_start
+                    self.frames_written += 1
+                    self.total_encode_time_sec += encode_duration
+                    self.max_encode_time_sec = max(self.max_encode_time_sec, encode_duration)
+                    if self.metrics is not None:
+                        self.metrics.record("encode", encode_duration)
+            if self.error is not None:
+                self.frames_failed += 1
+            if release is not None:
+                release(frame)
+
+    def write(self, frame, release=None):
+        """
+        Queues a frame for encoding.
+
+        Args:
+            frame (numpy.ndarray): The frame. It must not be modified until `release` is called.
+            release (callable, optional): Called with the frame after it has been encoded.
+        """
+        self._queue_depth_sum += self._queue.qsize()
+        self._writes += 1
+        try:
+            self._queue.put_nowait((frame, release))
+        except queue.Full:
+            wait_start = time.perf_counter()
+            self._queue.put((frame, release))
+            self.total_wait_time_sec += time.perf_counter() - wait_start
+
+    def get_stats(self):
+        """
+        Returns encoding statistics.
+
+        Returns:
+            dict: Frames written and failed, average and maximum encode time per written frame
+                  (ms), current and average queue depth, and time the frame loop waited on a
+                  full queue (s).
+        """
+        return {
+            "frames_written": self.frames_written,
+            "frames_failed": self.frames_failed,
+            "avg_encode_ms": (self.total_encode_time_sec / self.frames_written * 1000.0) if self.frames_written else 0.0,
+            "max_encode_ms": self.max_encode_time_sec * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "avg_queue_depth": (self._queue_depth_sum / self._writes) if self._writes else 0.0,
+            "producer_wait_sec": self.total_wait_time_sec,
+        }
+
+    def release(self):
+        """Encodes every queued frame, then stops the thread and closes the backend."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        try:
+            self.backend.close()
+        except Exception as e:
+            print(f"Error closing video encoder: {e}")